@@ -0,0 +1,87 @@
+"""
+API documentation routes.
+
+drf_yasg and its dependencies are only imported when a docs route is hit
+or the schema is built, so workers do not load them at startup. The schema
+itself is generated once (python manage.py build_openapi_schema) into
+OPENAPI_SCHEMA_DIR and served as a static file; the live generator is only a
+fallback for when the file has not been built.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse
+
+SCHEMA_FILES = {
+    '.json': ('swagger.json', 'application/json'),
+    '.yaml': ('swagger.yaml', 'application/yaml'),
+}
+
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Ecommerce API",
+        default_version='v1',
+        description="Api para gerenciamento de produtos em um ecommerce",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="joseeusebioeng@gmail.com"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+@lru_cache(maxsize=None)
+def schema_view():
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    return get_schema_view(api_info(), public=True, permission_classes=(permissions.AllowAny,))
+
+
+@lru_cache(maxsize=None)
+def ui_view(renderer):
+    # The UI pages load the spec from SPEC_URL (the prebuilt file), so
+    # rendering them does not introspect the API.
+    return schema_view().with_ui(renderer, cache_timeout=settings.OPENAPI_CACHE_TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def live_schema_view():
+    return schema_view().without_ui(cache_timeout=settings.OPENAPI_CACHE_TIMEOUT)
+
+
+def write_schema(directory=None):
+    """Generate the schema and write swagger.json and swagger.yaml; returns the paths written."""
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    directory = Path(directory or settings.OPENAPI_SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    schema = OpenAPISchemaGenerator(api_info()).get_schema(request=None, public=True)
+
+    paths = []
+    for codec, (name, _) in zip((OpenAPICodecJson([]), OpenAPICodecYaml([])), SCHEMA_FILES.values()):
+        path = directory / name
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        tmp_path.write_bytes(codec.encode(schema))
+        tmp_path.replace(path)
+        paths.append(path)
+    return paths
+
+
+def schema_file(request, format):
+    name, content_type = SCHEMA_FILES[format]
+    path = Path(settings.OPENAPI_SCHEMA_DIR) / name
+    if path.is_file():
+        return FileResponse(path.open('rb'), content_type=content_type)
+    return live_schema_view()(request, format=format)
+
+
+def swagger_ui(request):
+    return ui_view('swagger')(request)
+
+
+def redoc_ui(request):
+    return ui_view('redoc')(request)
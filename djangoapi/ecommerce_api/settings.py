@@ -13,7 +13,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 from django.core.management.utils import get_random_secret_key
-import os, sys
+import os, sys, json
+import importlib.util
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 # BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -46,11 +47,21 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'drf_yasg',
 ]
 
+# drf_yasg is deliberately not an installed app: importing it pulls in
+# pkg_resources and the whole schema tooling in every worker. The docs
+# routes import it on first use (ecommerce_api/docs.py) and its templates
+# and static files are found by path instead.
+DRF_YASG_DIR = Path(importlib.util.find_spec('drf_yasg').origin).parent
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'products.middleware.SlowQueryMiddleware',
+    'products.middleware.MetricsMiddleware',
+    'products.middleware.LoadSheddingMiddleware',
+    'products.middleware.ProfilingMiddleware',
+    'products.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,8 +78,52 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'products.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'products.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'products.throttling.UserTokenBucketThrottle',
+        'products.throttling.EndpointTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.getenv('THROTTLE_USER_RATE', '600/min'),
+        'endpoint': os.getenv('THROTTLE_ENDPOINT_RATE', '300/min'),
+    },
+}
+
+# Token buckets live in this process ('local') or in the shared cache ('cache').
+# Each request takes THROTTLE_COSTS[url_name] tokens (default 1).
+
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', 'local')
+
+THROTTLE_COSTS = {
+    'product-list': 10,
+    'stock-list': 10,
+    'category-list': 2,
+    'supplier-list': 2,
+    'product-batch': 3,
+    'product-reprice': 20,
+    'change-feed': 5,
 }
 
+# Load shedding (0 disables each check)
+
+LOAD_SHEDDING_MAX_CONCURRENCY = int(os.getenv('LOAD_SHEDDING_MAX_CONCURRENCY', 0))
+
+LOAD_SHEDDING_DB_LATENCY_MS = float(os.getenv('LOAD_SHEDDING_DB_LATENCY_MS', 0))
+
+LOAD_SHEDDING_DECAY_SECONDS = 5
+
+LOAD_SHEDDING_RETRY_AFTER = 2
+
+LOAD_SHEDDING_EXEMPT_PATHS = ['/admin/']
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -106,7 +161,7 @@ ROOT_URLCONF = 'ecommerce_api.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [DRF_YASG_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -137,6 +192,46 @@ DATABASES = {
     }
 }
 
+# Read replicas: one alias per host in DATABASE_REPLICA_HOSTS (replica_1, ...),
+# same credentials as default. Safe requests read from a replica whose lag is
+# under REPLICA_MAX_LAG_SECONDS; clients that just wrote stick to the primary
+# for REPLICA_STICKY_SECONDS (products.routers / ReplicaRoutingMiddleware),
+# which needs a shared CACHE_BACKEND. Cache versions and the change feed are
+# always read from the primary. Locally, pointing a replica at the default
+# host gives two working aliases.
+
+for index, host in enumerate(
+    (h.strip() for h in os.getenv('DATABASE_REPLICA_HOSTS', '').split(',') if h.strip()), start=1
+):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+
+REPLICA_ALIASES = [alias for alias in DATABASES if alias.startswith('replica_')]
+
+DATABASE_ROUTERS = ['products.routers.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 2))
+
+REPLICA_LAG_CHECK_INTERVAL = 1
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# List caches (products/list_cache.py) are only shared between workers when
+# this points at memcached/redis; with the default LocMemCache every worker
+# keeps its own copies. Cache version counters live in the database
+# (products/versioning.py) and are re-read every VERSION_CHECK_INTERVAL
+# seconds, so invalidation reaches every worker with either backend.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND') or 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+VERSION_CHECK_INTERVAL = float(os.getenv('VERSION_CHECK_INTERVAL', 1))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -175,6 +270,8 @@ STATIC_URL = 'static/'
 
 STATIC_ROOT = DATA_DIR / 'static'
 
+STATICFILES_DIRS = [DRF_YASG_DIR / 'static']
+
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = DATA_DIR / 'media'
@@ -183,3 +280,222 @@ MEDIA_ROOT = DATA_DIR / 'media'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Pagination (products.pagination). List endpoints paginate when ?page= or
+# ?page_size= is given. Above APPROXIMATE_COUNT_THRESHOLD rows the API and the
+# admin report PostgreSQL's planner estimate instead of running COUNT(*).
+
+API_PAGE_SIZE = 100
+
+API_MAX_PAGE_SIZE = 1000
+
+APPROXIMATE_COUNT_THRESHOLD = int(os.getenv('APPROXIMATE_COUNT_THRESHOLD', 100000))
+
+# List response cache (products.list_cache) for product/list/ and category/list/
+# Entries are served fresh for LIST_CACHE_SOFT_TTL seconds, then served stale
+# while one request recomputes them, and dropped after LIST_CACHE_HARD_TTL.
+# The refresh lock lives in the cache backend, so use a shared backend
+# (CACHE_BACKEND) to get one refresh per cluster rather than per process.
+
+LIST_CACHE_SOFT_TTL = int(os.getenv('LIST_CACHE_SOFT_TTL', 30))
+
+LIST_CACHE_HARD_TTL = int(os.getenv('LIST_CACHE_HARD_TTL', 600))
+
+LIST_CACHE_LOCK_TIMEOUT = 10
+
+# Product deletion (products.deletion). product/delete/ only flags the
+# product; python manage.py purge_deleted_products removes its dependents in
+# batches of PURGE_BATCH_SIZE rows, sleeping PURGE_BATCH_PAUSE seconds between
+# batches to leave room for other writers.
+
+PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', 1000))
+
+PURGE_BATCH_PAUSE = float(os.getenv('PURGE_BATCH_PAUSE', 0))
+
+# Related products (python manage.py build_related_products)
+# The job keeps the RELATED_PRODUCTS_K most similar products per product and
+# sizes its similarity chunks so they stay under RELATED_PRODUCTS_MEMORY_MB.
+
+RELATED_PRODUCTS_K = int(os.getenv('RELATED_PRODUCTS_K', 20))
+
+RELATED_PRODUCTS_MEMORY_MB = int(os.getenv('RELATED_PRODUCTS_MEMORY_MB', 512))
+
+# Leaderboards (product/top/, products.ranking)
+# Scores are the Bayesian average of a product's reviews with a prior of
+# RANKING_PRIOR_WEIGHT reviews of RANKING_PRIOR_MEAN (ratings go from 0 to
+# 10). Run python manage.py rebuild_ranking_scores after changing either.
+
+RANKING_PRIOR_MEAN = float(os.getenv('RANKING_PRIOR_MEAN', 5))
+
+RANKING_PRIOR_WEIGHT = int(os.getenv('RANKING_PRIOR_WEIGHT', 10))
+
+TOP_PRODUCTS_LIMIT = 10
+
+TOP_PRODUCTS_MAX_LIMIT = 100
+
+# Typeahead (product/typeahead/?q=)
+# Served from an in-process prefix index of SKUs and name words built when
+# the worker starts (TYPEAHEAD_WARM_ON_START) or on first use. Other workers'
+# changes arrive through the change feed every TYPEAHEAD_SYNC_INTERVAL
+# seconds. Names contribute at most TYPEAHEAD_MAX_WORDS words of up to
+# TYPEAHEAD_MAX_WORD_LENGTH characters, which bounds the index size.
+
+TYPEAHEAD_WARM_ON_START = bool(int(os.getenv('TYPEAHEAD_WARM_ON_START', 1)))
+
+TYPEAHEAD_SYNC_INTERVAL = 1.0
+
+TYPEAHEAD_LIMIT = 10
+
+TYPEAHEAD_MAX_LIMIT = 50
+
+TYPEAHEAD_MAX_WORDS = 8
+
+TYPEAHEAD_MAX_WORD_LENGTH = 24
+
+# Reordering (stock/low/, python manage.py emit_reorder_batches)
+# Threshold for products whose own and category thresholds are unset.
+# Reorder batches are queued as "reorder.requested" outbox events.
+
+REORDER_LEVEL_DEFAULT = int(os.getenv('REORDER_LEVEL_DEFAULT', 0))
+
+# Maximum number of SKUs accepted by product/batch/
+
+PRODUCT_BATCH_MAX_SKUS = int(os.getenv('PRODUCT_BATCH_MAX_SKUS', 100))
+
+# Maximum number of SKUs accepted by product/reprice/ (category and supplier selectors are unbounded)
+
+REPRICE_MAX_SKUS = int(os.getenv('REPRICE_MAX_SKUS', 5000))
+
+# Change feed (changes/?since=<token>)
+# Writers take a PostgreSQL advisory lock until they commit, so ids appear in
+# order and readers can follow the feed with no settle delay
+# (products.changes.lock_feed); python manage.py purge_change_log removes
+# entries older than CHANGE_FEED_RETENTION_DAYS.
+
+CHANGE_FEED_PAGE_SIZE = 500
+
+CHANGE_FEED_RETENTION_DAYS = int(os.getenv('CHANGE_FEED_RETENTION_DAYS', 7))
+
+# Live stock streaming (stock/stream/, Server-Sent Events)
+# Serve ecommerce_api.asgi with an ASGI server (uvicorn, daphne) so idle
+# subscribers hold no thread. STOCK_STREAM_CHANNEL feeds each process's
+# broker: LocalChannel only sees saves made by the same process,
+# ChangeFeedChannel polls the change log so every worker sees every save.
+
+STOCK_STREAM_CHANNEL = os.getenv('STOCK_STREAM_CHANNEL', 'products.streaming.ChangeFeedChannel')
+
+STOCK_STREAM_POLL_INTERVAL = 1.0
+
+STOCK_STREAM_HEARTBEAT = 15
+
+STOCK_STREAM_MAX_SKUS = 100
+
+# API docs (ecommerce_api/docs.py)
+# python manage.py build_openapi_schema writes swagger.json/.yaml into
+# OPENAPI_SCHEMA_DIR; the swagger/ and redoc/ pages load that file.
+
+OPENAPI_SCHEMA_DIR = DATA_DIR / 'openapi'
+
+OPENAPI_CACHE_TIMEOUT = 60 * 60
+
+SWAGGER_SETTINGS = {'SPEC_URL': '/swagger.json'}
+
+REDOC_SETTINGS = {'SPEC_URL': '/swagger.json'}
+
+# Catalog snapshots (python manage.py publish_catalog_snapshot)
+# Set CATALOG_SNAPSHOT_SENDFILE_HEADER (e.g. X-Accel-Redirect) to hand the
+# file transfer off to the front proxy instead of the app server.
+
+CATALOG_SNAPSHOT_DIR = MEDIA_ROOT / 'catalog'
+
+CATALOG_SNAPSHOT_SENDFILE_HEADER = os.getenv('CATALOG_SNAPSHOT_SENDFILE_HEADER', '')
+
+CATALOG_SNAPSHOT_SENDFILE_PREFIX = os.getenv('CATALOG_SNAPSHOT_SENDFILE_PREFIX', '/protected/catalog/')
+
+# On-demand profiling (products.middleware.ProfilingMiddleware)
+# Requests carrying a signed PROFILING_HEADER token (manage.py profiling_token)
+# or picked by PROFILING_SAMPLE_RATE are profiled into PROFILING_DIR.
+
+PROFILING_ENABLED = bool(int(os.getenv('PROFILING_ENABLED', 0)))
+
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+
+PROFILING_HEADER = 'X-Profile'
+
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+PROFILING_DIR = DATA_DIR / 'profiles'
+
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 200))
+
+# Metrics (/metrics, Prometheus text format)
+# With several worker processes set METRICS_DIR to a directory shared by them
+# (emptied on deploy); each worker dumps its registry there every
+# METRICS_FLUSH_INTERVAL seconds and /metrics merges all of them.
+
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+
+METRICS_FLUSH_INTERVAL = 1.0
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Slow query capture (products.middleware.SlowQueryMiddleware, 0 disables)
+# Plans use EXPLAIN (ANALYZE, BUFFERS) on PostgreSQL reads and
+# EXPLAIN QUERY PLAN on SQLite, stored in the SlowQuery table.
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 500))
+
+SLOW_QUERY_EXPLAINS_PER_MINUTE = 10
+
+SLOW_QUERY_FINGERPRINT_INTERVAL = 10 * 60
+
+# Idempotency-Key support (products.idempotency)
+# Responses are kept for IDEMPOTENCY_TTL seconds. A retry that arrives while
+# the first request is still running waits up to IDEMPOTENCY_WAIT_TIMEOUT
+# seconds for its response; an in-flight marker older than
+# IDEMPOTENCY_LOCK_TIMEOUT is treated as abandoned.
+
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 24 * 60 * 60))
+
+IDEMPOTENCY_WAIT_TIMEOUT = 10.0
+
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Transactional outbox (python manage.py dispatch_outbox)
+# OUTBOX_DESTINATIONS is a JSON object: {"<name>": {"url": "...", "events":
+# ["price.changed", "stock.changed"], "headers": {...}}}. Events are written in
+# the same transaction as the change and delivered in batches per destination;
+# failed batches are retried with exponential backoff up to OUTBOX_MAX_ATTEMPTS.
+
+OUTBOX_DESTINATIONS = json.loads(os.getenv('OUTBOX_DESTINATIONS') or '{}')
+
+OUTBOX_BATCH_SIZE = 100
+
+OUTBOX_LEASE_SECONDS = 60
+
+OUTBOX_TIMEOUT = 5
+
+OUTBOX_MAX_ATTEMPTS = 10
+
+OUTBOX_BACKOFF_BASE = 2
+
+OUTBOX_BACKOFF_MAX = 10 * 60
+
+# Background jobs (python manage.py run_workers)
+# Jobs are rows of products.Job claimed with SELECT ... FOR UPDATE SKIP LOCKED,
+# so workers need nothing but the database. A running job is leased for
+# JOBS_LEASE_SECONDS, renewed every third of that by a heartbeat thread while
+# the task runs and whenever it reports progress; failed attempts
+# are retried with exponential backoff up to the job's max_attempts.
+
+JOBS_WORKER_PROCESSES = int(os.getenv('JOBS_WORKER_PROCESSES', 2))
+
+JOBS_POLL_INTERVAL = 1.0
+
+JOBS_LEASE_SECONDS = 10 * 60
+
+JOBS_MAX_ATTEMPTS = 3
+
+JOBS_BACKOFF_BASE = 4
+
+JOBS_BACKOFF_MAX = 60 * 60
@@ -1,15 +1,97 @@
 from django.contrib import admin
-from .models import Product, Category, Supplier
+from django.db.models import Q
+from .models import Product, Category, Supplier, Review, PriceHistory, SlowQuery, OutboxEvent, Job
+from . import jobs
+from .outbox import requeue
+from .pagination import ApproximateCountPaginator
+
+# Large tables: planner-estimated counts, no second unfiltered COUNT(*),
+# related rows joined instead of fetched per line, and searches limited to
+# lookups an index can answer.
+
+class IndexedSearchMixin:
+    # The admin's own search lookups are case-insensitive (UPPER(...) LIKE),
+    # which plain B-tree indexes cannot serve; these are exact and prefix.
+    indexed_search_lookups = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = Q()
+        for lookup in self.indexed_search_lookups:
+            condition |= Q(**{lookup: search_term})
+        return queryset.filter(condition), False
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
-    pass
+class ProductAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ['name', 'sku', 'price', 'supplier', 'category']
+    list_filter = [('deleted_at', admin.EmptyFieldListFilter)]
+    list_select_related = ['supplier', 'category']
+    search_fields = ['sku', 'name']
+    indexed_search_lookups = ['sku', 'name__startswith']
+    raw_id_fields = ['supplier', 'category']
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+@admin.register(Review)
+class ReviewAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ['product', 'user', 'rating', 'review_date']
+    list_select_related = ['product', 'user']
+    search_fields = ['product__sku']
+    indexed_search_lookups = ['product__sku']
+    raw_id_fields = ['product', 'user']
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+@admin.register(PriceHistory)
+class PriceHistoryAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ['product', 'old_price', 'new_price', 'user', 'change_date']
+    list_select_related = ['product', 'user']
+    search_fields = ['product__sku']
+    indexed_search_lookups = ['product__sku']
+    raw_id_fields = ['product', 'user']
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'parent']
+    list_select_related = ['parent']
     search_fields = ['name']
 
 @admin.register(Supplier)
 class SupplierAdmin(admin.ModelAdmin):
-    pass
\ No newline at end of file
+    pass
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['fingerprint', 'view', 'duration_ms', 'database', 'created_at']
+    list_filter = ['view', 'database']
+    search_fields = ['=fingerprint']
+    readonly_fields = ['fingerprint', 'normalized_sql', 'sql', 'duration_ms', 'plan', 'view', 'database', 'created_at']
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'destination', 'attempts', 'available_at', 'failed_at']
+    list_filter = ['destination', 'event_type', ('failed_at', admin.EmptyFieldListFilter)]
+    readonly_fields = ['destination', 'event_type', 'payload', 'created_at', 'attempts', 'last_error', 'failed_at']
+    actions = ['requeue_events']
+
+    @admin.action(description='Reenfileirar eventos selecionados')
+    def requeue_events(self, request, queryset):
+        self.message_user(request, f'{requeue(queryset)} evento(s) reenfileirado(s).')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'progress', 'progress_total', 'created_at', 'duration']
+    list_filter = ['status', 'task']
+    readonly_fields = [
+        'status', 'attempts', 'worker', 'progress', 'progress_total', 'result', 'last_error',
+        'created_at', 'started_at', 'finished_at', 'duration',
+    ]
+    actions = ['requeue_jobs']
+
+    @admin.action(description='Reenfileirar jobs com falha selecionados')
+    def requeue_jobs(self, request, queryset):
+        self.message_user(request, f'{jobs.requeue(queryset)} job(s) reenfileirado(s).')
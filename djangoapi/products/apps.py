@@ -5,4 +5,5 @@ class ProductsConfig(AppConfig):
     name = 'products'
 
     def ready(self):
-        import products.signals
\ No newline at end of file
+        import products.signals
+        import products.tasks
\ No newline at end of file
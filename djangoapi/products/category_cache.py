@@ -0,0 +1,111 @@
+import threading
+
+from .metrics import record_cache
+from .models import Category
+from .versioning import get_version, is_pending
+
+
+class CategoryCache:
+    """
+    In-process name -> id, id -> parent and id -> reorder level maps of the
+    Category table.
+
+    The whole table is loaded with one query and kept until the shared
+    'category' version (bumped on Category save/delete) changes. Other
+    workers notice the bump within VERSION_CHECK_INTERVAL and reload lazily
+    on their next lookup; a name they do not know yet is checked in the
+    database, and found there, reloads the table at once.
+    """
+    namespace = 'category'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.ids = {}
+        self.parents = {}
+        self.children = {}
+        self.reorder_levels = {}
+
+    def refresh(self, force=False):
+        if is_pending(self.namespace):
+            # This transaction changed categories: read them as it sees them,
+            # and reload again once it has committed or rolled back.
+            version = None
+        else:
+            version = get_version(self.namespace)
+        if version is not None and version == self.version and not force:
+            record_cache(self.namespace, 'hit')
+            return
+        record_cache(self.namespace, 'miss')
+
+        ids = {}
+        parents = {}
+        children = {}
+        reorder_levels = {}
+        for pk, name, parent_id, reorder_level in Category.objects.values_list('id', 'name', 'parent_id', 'reorder_level'):
+            ids[name] = pk
+            parents[pk] = parent_id
+            children.setdefault(parent_id, []).append(pk)
+            if reorder_level is not None:
+                reorder_levels[pk] = reorder_level
+
+        with self.lock:
+            self.ids, self.parents, self.children, self.reorder_levels = ids, parents, children, reorder_levels
+            self.version = version
+
+    def get_id(self, name):
+        return self.resolve([name])[name]
+
+    def resolve(self, names):
+        self.refresh()
+        missing = {name.lower() for name in names if name.lower() not in self.ids}
+        if missing and Category.objects.filter(name__in=missing).exists():
+            # Created by another worker whose version bump has not reached this one yet.
+            self.refresh(force=True)
+        ids = self.ids
+        return {name: ids.get(name.lower()) for name in names}
+
+    def refresh_for(self, pk):
+        """refresh(), reloading at once if ``pk`` is a category this worker has not seen yet."""
+        self.refresh()
+        if pk is not None and pk not in self.parents and Category.objects.filter(pk=pk).exists():
+            self.refresh(force=True)
+
+    def get_parent_id(self, pk):
+        self.refresh_for(pk)
+        return self.parents.get(pk)
+
+    def ancestors(self, pk):
+        self.refresh_for(pk)
+        parents = self.parents
+        result = []
+        parent_id = parents.get(pk)
+        while parent_id is not None and parent_id not in result:
+            result.append(parent_id)
+            parent_id = parents.get(parent_id)
+        return result
+
+    def reorder_level(self, pk):
+        """The reorder level set on ``pk`` or its nearest ancestor, or None."""
+        self.refresh_for(pk)
+        levels = self.reorder_levels
+        for category_id in (pk, *self.ancestors(pk)):
+            if category_id in levels:
+                return levels[category_id]
+        return None
+
+    def descendants(self, pk):
+        """Return ``pk`` and every category below it."""
+        self.refresh_for(pk)
+        children = self.children
+        result = [pk]
+        seen = {pk}
+        for category_id in result:
+            for child in children.get(category_id, ()):
+                if child not in seen:
+                    seen.add(child)
+                    result.append(child)
+        return result
+
+
+category_cache = CategoryCache()
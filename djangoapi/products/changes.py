@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import outbox
+from .models import ChangeLog, ChangeLogPurge
+from .rollups import to_decimal
+
+
+# Change kinds that other systems are notified about through the outbox.
+EVENT_TYPES = {'price': 'price.changed', 'stock': 'stock.changed'}
+
+# pg_advisory_xact_lock() key held by every transaction that writes to the change log.
+FEED_LOCK_ID = 0x6368616E67656C6F
+
+
+def lock_feed(using):
+    """
+    Take the change log lock until the current transaction ends.
+
+    Ids are assigned at insert but rows appear at commit. Because every
+    writer holds this lock from its first insert to its commit, ids are
+    handed out in commit order: a reader that sees an id has already seen
+    every smaller one, however long the writing transactions ran. Every
+    ChangeLog insert must come after this call. SQLite needs nothing, as it
+    allows a single writer at a time.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [FEED_LOCK_ID])
+
+
+def record(kind, product_id, sku, deleted=False, **data):
+    using = router.db_for_write(ChangeLog)
+    # In autocommit, the lock would be released before the insert.
+    with transaction.atomic(using=using, savepoint=False):
+        lock_feed(using)
+        entry = ChangeLog.objects.using(using).create(kind=kind, product_id=product_id, sku=sku, deleted=deleted, data=data)
+        if kind in EVENT_TYPES:
+            outbox.publish(EVENT_TYPES[kind], event_payload(entry))
+    return entry
+
+
+def event_payload(entry):
+    return {'change_id': entry.id, 'product_id': entry.product_id, 'sku': entry.sku, **entry.data}
+
+
+def product_data(product):
+    return {
+        'name': product.name,
+        'description': product.description,
+        'price': str(to_decimal(product.price)),
+        'supplier': product.supplier_id,
+        'category': product.category_id,
+    }
+
+
+# Signal handlers (wired in products/signals.py)
+
+def track_product(instance):
+    instance._feed_price = instance.__dict__.get('price')
+
+
+def product_saved(instance, created):
+    record('product', instance.pk, instance.sku, **product_data(instance))
+    old_price = instance._feed_price
+    if not created and old_price is not None and to_decimal(old_price) != to_decimal(instance.price):
+        record('price', instance.pk, instance.sku, old_price=str(to_decimal(old_price)), new_price=str(to_decimal(instance.price)))
+    track_product(instance)
+
+
+def product_deleted(instance):
+    record('product', instance.pk, instance.sku, deleted=True)
+
+
+def track_stock(instance):
+    instance._feed_quantity = instance.__dict__.get('quantity')
+
+
+def stock_saved(instance, created):
+    if created or instance.quantity != instance._feed_quantity:
+        record('stock', instance.product_id, instance.product.sku, quantity=instance.quantity)
+    track_stock(instance)
+
+
+def rating_saved(instance):
+    record(
+        'rating', instance.product_id, instance.product.sku,
+        average_rating=str(to_decimal(instance.average_rating)), ratings_count=instance.ratings_count,
+    )
+
+
+# Reading the feed
+
+def head():
+    """Token of the newest change that readers may already see."""
+    return visible().order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def visible():
+    """Entries readers may see; see lock_feed() for why they never skip one."""
+    return ChangeLog.objects.all()
+
+
+def is_expired(since):
+    """True when changes right after ``since`` may already have been purged."""
+    # Gaps in the ids (rolled back inserts, sequence caching) are not purges.
+    purged_through = ChangeLogPurge.objects.filter(pk=1).values_list('purged_through', flat=True).first() or 0
+    return since < purged_through
+
+
+def purge(days=None):
+    days = settings.CHANGE_FEED_RETENTION_DAYS if days is None else days
+    with transaction.atomic():
+        last = ChangeLog.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).aggregate(last=Max('id'))['last']
+        if last is None:
+            return 0
+        # Record the watermark before deleting, so no reader sees the gap without it.
+        ChangeLogPurge.objects.get_or_create(pk=1)
+        ChangeLogPurge.objects.filter(pk=1).update(purged_through=Greatest('purged_through', last))
+        return ChangeLog.objects.filter(id__lte=last).delete()[0]
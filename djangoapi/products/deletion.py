@@ -0,0 +1,100 @@
+import time
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from . import changes, rollups, typeahead
+from .models import Product
+from .versioning import bump_version_on_commit
+
+
+def soft_delete(product):
+    """
+    Hide ``product`` from every read path without touching its dependents.
+
+    The product row is flagged and its one-to-one dependents (stock, rating)
+    are deleted right away, so tables read without a join to Product never
+    show it; the many-side history is left to purge_product. The cost does
+    not depend on how much history the product has. Rollups, the change feed,
+    the typeahead index and the catalog version are updated here as a real
+    delete would through signals.
+    """
+    with transaction.atomic():
+        # Flag first: the UPDATE locks the row, so of two concurrent deletes
+        # only the one that flagged it subtracts the product from the rollups.
+        if not Product.objects.filter(pk=product.pk).update(deleted_at=timezone.now()):
+            return False
+        rollups.product_removed(product.pk)
+        for table, pk_column, fk_column, one_to_one in dependents():
+            if one_to_one:
+                _delete_batch(table, pk_column, fk_column, product.pk, 1)
+        changes.product_deleted(product)
+        typeahead.product_removed(product.pk)
+        bump_version_on_commit('catalog')
+    return True
+
+
+def dependents():
+    """(table, pk column, fk column, one_to_one) of every model removed in cascade with a product."""
+    return [
+        (relation.related_model._meta.db_table, relation.related_model._meta.pk.column, relation.field.column, relation.one_to_one)
+        for relation in Product._meta.related_objects
+        if relation.on_delete is models.CASCADE
+    ]
+
+
+def _delete_batch(table, pk_column, fk_column, product_id, batch_size):
+    quote = connection.ops.quote_name
+    table, pk_column, fk_column = quote(table), quote(pk_column), quote(fk_column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {pk_column} IN '
+            f'(SELECT {pk_column} FROM {table} WHERE {fk_column} = %s LIMIT %s)',
+            [product_id, batch_size],
+        )
+        return cursor.rowcount
+
+
+def purge_product(product_id, batch_size=None):
+    """
+    Delete a soft-deleted product's dependents with plain DELETE statements
+    of at most ``batch_size`` rows each, every one in its own transaction so
+    no lock is held for long, then the product itself. Signals are not sent:
+    soft_delete already accounted for the product. Returns the rows deleted.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    deleted = 0
+    for table, pk_column, fk_column, _ in dependents():
+        while True:
+            with transaction.atomic():
+                count = _delete_batch(table, pk_column, fk_column, product_id, batch_size)
+            deleted += count
+            if count < batch_size:
+                break
+            if settings.PURGE_BATCH_PAUSE:
+                time.sleep(settings.PURGE_BATCH_PAUSE)
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(Product._meta.db_table)} WHERE {quote("id")} = %s AND {quote("deleted_at")} IS NOT NULL',
+            [product_id],
+        )
+        deleted += cursor.rowcount
+    return deleted
+
+
+def purge_deleted(batch_size=None, limit=None, progress=None):
+    """
+    Purge soft-deleted products, oldest first; returns (products, rows)
+    deleted. ``progress(done, total)`` is called after each product.
+    """
+    pending = Product.all_objects.filter(deleted_at__isnull=False).order_by('deleted_at').values_list('pk', flat=True)
+    pending = list(pending[:limit] if limit else pending)
+    products = rows = 0
+    for product_id in pending:
+        rows += purge_product(product_id, batch_size)
+        products += 1
+        if progress:
+            progress(products, len(pending))
+    return products, rows
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .metrics import registry
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+POLL_INTERVAL = 0.05
+
+
+def request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def claim(user, key, digest):
+    """
+    Insert the in-flight marker for ``key``. Returns None when this request
+    owns the key, otherwise the existing record (expired records and markers
+    left behind by a crashed worker are discarded first).
+    """
+    while True:
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    user=user, key=key, request_hash=digest,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL),
+                )
+            return None
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            continue
+        abandoned = record.status_code is None and now - record.created_at > timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+        if record.expires_at <= now or abandoned:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            continue
+        return record
+
+
+def wait_for_response(record):
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while record is not None and record.status_code is None and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+    return record
+
+
+def replay(record, digest):
+    if record.request_hash != digest:
+        return 'conflict', Response(
+            {"error": "Idempotency-Key já utilizada com outra requisição."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    record = wait_for_response(record)
+    if record is None or record.status_code is None:
+        response = Response(
+            {"error": "Requisição com esta Idempotency-Key ainda em processamento."},
+            status=status.HTTP_409_CONFLICT,
+        )
+        response['Retry-After'] = '1'
+        return 'in_flight', response
+    response = Response(record.response, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return 'replayed', response
+
+
+def idempotent(handler):
+    """
+    Make a view handler safe to retry with an ``Idempotency-Key`` header.
+
+    The first request stores its response; retries with the same key and
+    payload get it back without running the handler, and a retry that arrives
+    while the first is still running waits for its response. 5xx responses and
+    exceptions are not stored, so the client can try again.
+    """
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"error": "Idempotency-Key deve ter no máximo 255 caracteres."}, status=status.HTTP_400_BAD_REQUEST)
+
+        labels = (('view', type(self).__name__),)
+        digest = request_hash(request)
+        record = claim(request.user, key, digest)
+        if record is not None:
+            result, response = replay(record, digest)
+            registry.inc('idempotency_requests_total', labels + (('result', result),))
+            return response
+
+        marker = IdempotencyKey.objects.filter(user=request.user, key=key)
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except BaseException:
+            marker.delete()
+            raise
+        if response.status_code >= 500:
+            marker.delete()
+        else:
+            marker.update(status_code=response.status_code, response=response.data)
+        registry.inc('idempotency_requests_total', labels + (('result', 'stored'),))
+        return response
+    return wrapper
+
+
+def purge_expired():
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
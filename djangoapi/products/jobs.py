@@ -0,0 +1,209 @@
+"""
+Background jobs stored in the database.
+
+enqueue() writes a Job row, inside the caller's transaction if there is one,
+and manage.py run_workers executes it. Workers claim jobs the way the outbox
+dispatcher claims events: SELECT ... FOR UPDATE SKIP LOCKED, highest priority
+first, and a lease of JOBS_LEASE_SECONDS pushed into available_at. A worker
+that dies mid-job only delays that job until the lease runs out, after which
+another worker picks it up as a new attempt. While a task runs, a heartbeat
+thread extends the lease every JOBS_LEASE_SECONDS / 3 seconds, so only a
+worker that stopped loses it; reporting progress extends it too. Failed attempts are retried with exponential
+backoff until the job's max_attempts is reached.
+
+Tasks are plain functions registered with @task (see products/tasks.py).
+They are called as ``func(progress, **job.args)``, where ``progress(done,
+total=None)`` records how far the task has got. Their return value must be
+JSON serialisable and is stored in Job.result.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, OperationalError, close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .metrics import registry
+from .models import Job
+
+logger = logging.getLogger('api_requests_logger')
+
+TASKS = {}
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, args=None, priority=0, dedupe_key=None, max_attempts=None, run_at=None):
+    """
+    Queue ``task_name`` and return its Job. With ``dedupe_key``, a job with the
+    same key that is still queued or running is returned instead.
+    """
+    if task_name not in TASKS:
+        raise ValueError(f"Tarefa '{task_name}' não registrada.")
+    job = Job(
+        task=task_name, args=args or {}, priority=priority, dedupe_key=dedupe_key,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS, available_at=run_at or timezone.now(),
+    )
+    if dedupe_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        return Job.objects.get(dedupe_key=dedupe_key, status__in=[Job.QUEUED, Job.RUNNING])
+
+
+def backoff(attempts):
+    delay = min(settings.JOBS_BACKOFF_BASE ** attempts, settings.JOBS_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+class Worker:
+    def __init__(self, name=None):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+
+    def claim(self):
+        """Lease the next due job to this worker; None when there is nothing to run."""
+        while True:
+            now = timezone.now()
+            with transaction.atomic():
+                job = (
+                    Job.objects.select_for_update(skip_locked=True)
+                    .filter(status__in=[Job.QUEUED, Job.RUNNING], available_at__lte=now)
+                    .order_by('-priority', 'available_at', 'id')
+                    .first()
+                )
+                if job is None:
+                    return None
+                if job.attempts >= job.max_attempts:
+                    # A running job whose lease ran out on its last attempt.
+                    Job.objects.filter(pk=job.pk).update(
+                        status=Job.FAILED, finished_at=now, last_error='Reserva expirada: o worker parou durante a execução.',
+                    )
+                    registry.inc('jobs_total', (('task', job.task), ('result', 'failed')))
+                    continue
+                job.status = Job.RUNNING
+                job.attempts += 1
+                job.worker = self.name
+                job.started_at = now
+                job.available_at = now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+                job.save(update_fields=['status', 'attempts', 'worker', 'started_at', 'available_at'])
+                return job
+
+    def current(self, job):
+        # Writes made by a worker whose lease was taken over are dropped.
+        return Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts)
+
+    def lease_until(self):
+        return timezone.now() + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+
+    def renew(self, job):
+        self.current(job).update(available_at=self.lease_until())
+
+    def progress(self, job):
+        def report(done, total=None):
+            self.current(job).update(progress=done, progress_total=total, available_at=self.lease_until())
+        return report
+
+    def heartbeat(self, job, stopped):
+        # Runs in its own thread, with its own database connection.
+        try:
+            while not stopped.wait(settings.JOBS_LEASE_SECONDS / 3):
+                try:
+                    self.renew(job)
+                except DatabaseError as exc:
+                    logger.warning(f"Job {job.pk} ({job.task}): falha ao renovar a reserva: {exc}")
+                    close_old_connections()
+        finally:
+            connections.close_all()
+
+    def execute(self, job):
+        labels = (('task', job.task),)
+        started = time.monotonic()
+        try:
+            func = TASKS.get(job.task)
+            if func is None:
+                raise LookupError(f"Tarefa '{job.task}' não registrada.")
+            stopped = threading.Event()
+            heartbeat = threading.Thread(target=self.heartbeat, args=(job, stopped), name=f'job-{job.pk}-heartbeat', daemon=True)
+            heartbeat.start()
+            try:
+                result = func(self.progress(job), **job.args)
+            finally:
+                stopped.set()
+                heartbeat.join()
+        except Exception as exc:
+            duration = time.monotonic() - started
+            self.retry(job, f'{type(exc).__name__}: {exc}', duration, labels)
+        else:
+            duration = time.monotonic() - started
+            self.current(job).update(status=Job.DONE, result=result, finished_at=timezone.now(), duration=duration)
+            registry.inc('jobs_total', labels + (('result', 'done'),))
+        registry.observe('job_duration_seconds', labels, duration)
+        registry.flush()
+
+    def retry(self, job, error, duration, labels):
+        error = error[:2000]
+        logger.warning(f"Job {job.pk} ({job.task}): falha na tentativa {job.attempts}: {error}")
+        current = self.current(job)
+        if job.attempts >= job.max_attempts:
+            current.update(status=Job.FAILED, last_error=error, finished_at=timezone.now(), duration=duration)
+            registry.inc('jobs_total', labels + (('result', 'failed'),))
+        else:
+            current.update(status=Job.QUEUED, last_error=error, duration=duration, available_at=timezone.now() + backoff(job.attempts))
+            registry.inc('jobs_total', labels + (('result', 'retry'),))
+
+    def run_once(self):
+        """Run one due job; returns False when the queue had none."""
+        job = self.claim()
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def run(self, interval=0, max_jobs=None):
+        """
+        Run jobs until the queue is empty (``interval`` 0), ``max_jobs`` have
+        run or stop() is called; otherwise poll every ``interval`` seconds.
+        Returns the number of jobs run.
+        """
+        done = 0
+        while not self.stopping and (max_jobs is None or done < max_jobs):
+            try:
+                ran = self.run_once()
+            except OperationalError as exc:
+                # Lost connection or lock timeout: back off and try again.
+                logger.warning(f"Worker {self.name}: erro de banco de dados ao buscar jobs: {exc}")
+                close_old_connections()
+                time.sleep(interval or settings.JOBS_POLL_INTERVAL)
+                continue
+            if ran:
+                done += 1
+            elif interval:
+                time.sleep(interval)
+            else:
+                break
+        return done
+
+    def stop(self, *args):
+        # Finish the current job, then exit.
+        self.stopping = True
+
+
+def requeue(queryset):
+    """Put failed jobs back in the queue with a fresh attempt count, unless an equivalent job is already queued."""
+    active_keys = Job.objects.filter(status__in=[Job.QUEUED, Job.RUNNING], dedupe_key__isnull=False).values('dedupe_key')
+    return queryset.filter(status=Job.FAILED).exclude(dedupe_key__in=active_keys).update(status=Job.QUEUED, attempts=0, available_at=timezone.now(), finished_at=None)
@@ -0,0 +1,101 @@
+import hashlib
+import time
+import zlib
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import record_cache, registry
+from .versioning import get_version
+
+KEY_PREFIX = 'list:'
+
+POLL_INTERVAL = 0.05
+
+
+def cache_key(name, request):
+    """Key for ``request``'s list response: query parameters are sorted and stripped so equivalent URLs share an entry."""
+    params = sorted(
+        (key, ','.join(part.strip() for part in value.split(',')))
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    # Pagination links are absolute, so the host is part of the response.
+    digest = hashlib.sha1(orjson.dumps([request.get_host(), params])).hexdigest()
+    return f'{KEY_PREFIX}{name}:{digest}'
+
+
+class ListCache:
+    """
+    Stale-while-revalidate cache for list responses.
+
+    Entries are stored zlib-compressed together with the version of the
+    ``namespace`` they were built from and a soft deadline, and live in the
+    cache for LIST_CACHE_HARD_TTL. Past the soft deadline, or once the
+    namespace version has moved on, an entry is stale: the one request that
+    wins a lock in the cache backend recomputes it while every other request
+    keeps getting the stale copy, so an expiry never sends the same query to
+    the database from every worker at once. With no entry at all, requests
+    that lose the lock wait for the winner's result for up to
+    LIST_CACHE_LOCK_TIMEOUT.
+    """
+    def __init__(self, name, namespace):
+        self.name = name
+        self.namespace = namespace
+
+    def get(self, request, compute):
+        key = cache_key(self.name, request)
+        version = get_version(self.namespace)
+        entry = cache.get(key)
+        if entry is not None:
+            fresh_until, entry_version, payload = entry
+            if entry_version == version and time.time() < fresh_until:
+                record_cache(self.name, 'hit')
+                return self.load(payload)
+            if not self.lock(key):
+                record_cache(self.name, 'stale')
+                return self.load(payload)
+            record_cache(self.name, 'refresh')
+            return self.refresh(key, version, compute)
+
+        record_cache(self.name, 'miss')
+        if self.lock(key):
+            return self.refresh(key, version, compute)
+        entry = self.wait(key)
+        if entry is not None:
+            return self.load(entry[2])
+        return compute()
+
+    def lock(self, key):
+        return cache.add(key + ':lock', 1, timeout=settings.LIST_CACHE_LOCK_TIMEOUT)
+
+    def refresh(self, key, version, compute):
+        start = time.perf_counter()
+        try:
+            data = compute()
+            entry = (time.time() + settings.LIST_CACHE_SOFT_TTL, version, zlib.compress(orjson.dumps(data)))
+            cache.set(key, entry, timeout=settings.LIST_CACHE_HARD_TTL)
+        finally:
+            cache.delete(key + ':lock')
+            registry.observe('cache_refresh_duration_seconds', (('cache', self.name),), time.perf_counter() - start)
+        return data
+
+    def wait(self, key):
+        deadline = time.monotonic() + settings.LIST_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+            if cache.get(key + ':lock') is None:
+                return None
+        return None
+
+    @staticmethod
+    def load(payload):
+        return orjson.loads(zlib.decompress(payload))
+
+
+product_list_cache = ListCache('product-list', 'catalog')
+category_list_cache = ListCache('category-list', 'category')
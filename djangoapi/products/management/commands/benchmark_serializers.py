@@ -0,0 +1,61 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from products.models import Product
+from products.renderers import ORJSONRenderer
+from products.serializers import ProductSerializer, ProductReadSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara o throughput de serialização da listagem de produtos (ModelSerializer + json vs values() + orjson).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        repeat = options['repeat']
+
+        rows = [
+            {
+                'id': i,
+                'name': f'Produto {i}',
+                'description': 'Descrição do produto ' * 10,
+                'price': Decimal('19.90') + i,
+                'sku': f'SKU{i:08d}',
+                'supplier': 1,
+                'category': 1,
+            }
+            for i in range(count)
+        ]
+        instances = [
+            Product(
+                id=row['id'], name=row['name'], description=row['description'], price=row['price'],
+                sku=row['sku'], supplier_id=row['supplier'], category_id=row['category'],
+            )
+            for row in rows
+        ]
+
+        def baseline():
+            return JSONRenderer().render(ProductSerializer(instances, many=True).data)
+
+        def fast():
+            serializer = ProductReadSerializer()
+            return ORJSONRenderer().render([serializer.to_representation(row) for row in rows])
+
+        results = []
+        for label, func in (('ModelSerializer + JSONRenderer', baseline), ('ProductReadSerializer + ORJSONRenderer', fast)):
+            best = min(self._timed(func) for _ in range(repeat))
+            results.append(best)
+            self.stdout.write(f'{label:<40} {best * 1000:9.1f} ms  {count / best:12,.0f} produtos/s')
+
+        self.stdout.write(f'Speedup: {results[0] / results[1]:.1f}x')
+
+    def _timed(self, func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
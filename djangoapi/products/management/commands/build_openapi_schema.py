@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce_api.docs import write_schema
+
+
+class Command(BaseCommand):
+    help = 'Gera o schema OpenAPI (swagger.json e swagger.yaml) servido pelas rotas de documentação.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help='Diretório de saída (padrão: OPENAPI_SCHEMA_DIR).')
+
+    def handle(self, *args, **options):
+        for path in write_schema(options['output_dir']):
+            self.stdout.write(f'Schema gerado em {path}')
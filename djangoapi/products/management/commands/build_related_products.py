@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.recommendations import build_related_products
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os produtos relacionados ("quem avaliou também avaliou") a partir das avaliações.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None, help='Produtos relacionados mantidos por produto.')
+        parser.add_argument('--memory-mb', type=int, default=None, help='Memória máxima usada por bloco de similaridades.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = build_related_products(options['top'], options['memory_mb'])
+        self.stdout.write(f'{written} relação(ões) gravada(s) em {time.perf_counter() - start:.1f}s.')
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.outbox import Dispatcher
+
+
+class Command(BaseCommand):
+    help = 'Entrega os eventos pendentes do outbox aos sistemas de destino.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Eventos reservados por lote.')
+        parser.add_argument('--interval', type=float, default=0, help='Aguarda N segundos quando a fila esvazia (0 encerra).')
+
+    def handle(self, *args, **options):
+        dispatcher = Dispatcher(batch_size=options['batch_size'])
+        total = 0
+        while True:
+            claimed, delivered = dispatcher.dispatch_once()
+            total += delivered
+            if claimed:
+                continue
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'{total} evento(s) entregue(s).')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from products.reordering import emit_batches, refresh_all_levels
+from products.serializers import LowStockSerializer
+
+
+class Command(BaseCommand):
+    help = 'Gera um lote de reposição por fornecedor com os produtos abaixo do estoque mínimo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Apenas lista os lotes, sem publicá-los.')
+        parser.add_argument('--refresh-levels', action='store_true', help='Recalcula antes o estoque mínimo de todos os produtos.')
+
+    def handle(self, *args, **options):
+        if options['refresh_levels']:
+            refresh_all_levels()
+        batches = emit_batches(LowStockSerializer(), dry_run=options['dry_run'])
+        for batch in batches:
+            self.stdout.write(f"{batch['supplier_name'] or 'Sem fornecedor'}: {len(batch['items'])} produto(s)")
+        self.stdout.write(f'{len(batches)} lote(s) de reposição gerado(s).')
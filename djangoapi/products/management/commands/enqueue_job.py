@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.jobs import TASKS, enqueue
+
+
+class Command(BaseCommand):
+    help = 'Coloca uma tarefa na fila de jobs em segundo plano.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('task', help="Tarefa a executar.")
+        parser.add_argument('--args', dest='task_args', default='{}', help='Argumentos da tarefa como objeto JSON.')
+        parser.add_argument('--priority', type=int, default=0, help='Jobs de maior prioridade são executados primeiro.')
+        parser.add_argument('--dedupe-key', default=None, help='Não enfileira se já houver um job pendente com a mesma chave.')
+        parser.add_argument('--max-attempts', type=int, default=None, help='Tentativas antes de marcar o job como falho.')
+
+    def handle(self, *args, **options):
+        if options['task'] not in TASKS:
+            raise CommandError(f"Tarefa '{options['task']}' não registrada. Disponíveis: {', '.join(sorted(TASKS))}.")
+        try:
+            task_args = json.loads(options['task_args'])
+        except ValueError as exc:
+            raise CommandError(f'--args não é um JSON válido: {exc}')
+        job = enqueue(
+            options['task'], task_args, priority=options['priority'],
+            dedupe_key=options['dedupe_key'], max_attempts=options['max_attempts'],
+        )
+        self.stdout.write(f'Job {job.pk} ({job.task}) na fila.')
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# What a new worker imports before serving its first request: settings,
+# apps and the whole URLconf (views, serializers, ...).
+COLD_START = (
+    'import sys, django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns; '
+    'print(" ".join(name for name in ("drf_yasg", "pkg_resources") if name in sys.modules))'
+)
+
+
+def parse_importtime(output):
+    """Parse ``python -X importtime`` output into {top-level package: self time in microseconds}."""
+    packages = defaultdict(int)
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|', 2)
+        packages[name.strip().split('.')[0]] += int(self_us)
+    return dict(packages)
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo de importação de um worker novo (python -X importtime) por pacote.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Quantidade de pacotes listados.')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'ecommerce_api.settings')}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', COLD_START],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            self.stderr.write(result.stderr[-2000:])
+            return
+
+        packages = parse_importtime(result.stderr)
+        total = sum(packages.values())
+        self.stdout.write(f'Tempo total de importação: {total / 1000:.1f} ms em {len(packages)} pacotes.')
+        for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'{self_us / 1000:10.1f} ms  {name}')
+        loaded = result.stdout.split()
+        for name in ('drf_yasg', 'pkg_resources'):
+            self.stdout.write(f"{name} importado na inicialização: {'sim' if name in loaded else 'não'}")
@@ -0,0 +1,52 @@
+import json
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Resume as requisições capturadas pelo ProfilingMiddleware, das views mais lentas para as mais rápidas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10, help='Quantidade de requisições mais lentas listadas.')
+        parser.add_argument('--view', help='Filtra por nome da view.')
+
+    def handle(self, *args, **options):
+        captures = []
+        for path in Path(settings.PROFILING_DIR).glob('*.json'):
+            try:
+                capture = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if options['view'] and capture['view'] != options['view']:
+                continue
+            captures.append(capture)
+
+        if not captures:
+            self.stdout.write('Nenhuma requisição capturada.')
+            return
+
+        by_view = defaultdict(list)
+        for capture in captures:
+            by_view[capture['view']].append(capture)
+
+        self.stdout.write(f'{"view":<30} {"n":>5} {"média ms":>10} {"máx ms":>10} {"queries":>8} {"sql ms":>10}')
+        for view, items in sorted(by_view.items(), key=lambda item: -max(c['duration'] for c in item[1])):
+            count = len(items)
+            self.stdout.write(
+                f'{view:<30} {count:>5} '
+                f'{sum(c["duration"] for c in items) / count * 1000:>10.1f} '
+                f'{max(c["duration"] for c in items) * 1000:>10.1f} '
+                f'{sum(c["query_count"] for c in items) / count:>8.1f} '
+                f'{sum(c["query_time"] for c in items) / count * 1000:>10.1f}'
+            )
+
+        self.stdout.write('')
+        self.stdout.write('Requisições mais lentas:')
+        for capture in sorted(captures, key=lambda c: -c['duration'])[:options['limit']]:
+            self.stdout.write(
+                f'{capture["duration"] * 1000:>9.1f} ms  {capture["query_count"]:>4} queries  '
+                f'{capture["status"]} {capture["method"]} {capture["path"]}  ({capture["id"]}.prof)'
+            )
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core import signing
+from django.core.management.base import BaseCommand
+
+from products.middleware import ProfilingMiddleware
+
+
+class Command(BaseCommand):
+    help = 'Gera um token assinado para o header de profiling.'
+
+    def handle(self, *args, **options):
+        token = signing.TimestampSigner(salt=ProfilingMiddleware.signer_salt).sign('profile')
+        self.stdout.write(f'{settings.PROFILING_HEADER}: {token}')
+        self.stdout.write(f'Válido por {settings.PROFILING_TOKEN_MAX_AGE} segundos.')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.snapshots import publish_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Gera os arquivos pré-comprimidos do catálogo quando a versão do catálogo muda.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regera mesmo sem mudanças no catálogo.')
+        parser.add_argument('--interval', type=int, default=0, help='Repete a cada N segundos (0 executa uma vez).')
+
+    def handle(self, *args, **options):
+        while True:
+            manifest, published = publish_catalog_snapshot(force=options['force'])
+            if published:
+                self.stdout.write(f"Snapshot {manifest['hash']} publicado ({manifest['count']} produtos).")
+            else:
+                self.stdout.write(f"Snapshot {manifest['hash']} já está atualizado.")
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from products.changes import purge
+
+
+class Command(BaseCommand):
+    help = 'Remove do change feed as entradas mais antigas que o período de retenção.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHANGE_FEED_RETENTION_DAYS, help='Dias de retenção.')
+
+    def handle(self, *args, **options):
+        deleted = purge(options['days'])
+        self.stdout.write(f'{deleted} entrada(s) removida(s).')
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.deletion import purge_deleted
+
+
+class Command(BaseCommand):
+    help = 'Remove definitivamente os produtos excluídos e seus dependentes, em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Linhas removidas por comando DELETE.')
+        parser.add_argument('--interval', type=float, default=0, help='Aguarda N segundos quando não há produtos a remover (0 encerra).')
+
+    def handle(self, *args, **options):
+        products = rows = 0
+        while True:
+            purged, deleted = purge_deleted(options['batch_size'], limit=100)
+            products += purged
+            rows += deleted
+            if purged:
+                continue
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'{products} produto(s) e {rows} linha(s) removido(s).')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Remove as respostas armazenadas de Idempotency-Key já expiradas.'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(f'{deleted} chave(s) expirada(s) removida(s).')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from products.ranking import rebuild_scores
+from products.versioning import bump_version
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a pontuação de ranking (média bayesiana) de todos os produtos.'
+
+    def handle(self, *args, **options):
+        updated = rebuild_scores()
+        bump_version('catalog')
+        self.stdout.write(f'{updated} produto(s) atualizado(s).')
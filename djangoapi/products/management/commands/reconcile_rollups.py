@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.rollups import reconcile_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os resumos por fornecedor e categoria e corrige divergências.'
+
+    def handle(self, *args, **options):
+        corrected = reconcile_rollups()
+        self.stdout.write(f'{corrected} resumo(s) corrigido(s).')
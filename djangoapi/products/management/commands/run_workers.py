@@ -0,0 +1,61 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.jobs import Worker
+
+
+def work(interval, max_jobs, total):
+    worker = Worker()
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    try:
+        done = worker.run(interval=interval, max_jobs=max_jobs)
+    finally:
+        connections.close_all()
+    with total.get_lock():
+        total.value += done
+
+
+class Command(BaseCommand):
+    help = 'Executa os jobs em segundo plano com um pool de processos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None, help='Número de processos (padrão: JOBS_WORKER_PROCESSES).')
+        parser.add_argument('--interval', type=float, default=None, help='Aguarda N segundos quando a fila esvazia (0 encerra; padrão: JOBS_POLL_INTERVAL).')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Encerra cada processo após N jobs.')
+
+    def handle(self, *args, **options):
+        processes = options['processes'] or settings.JOBS_WORKER_PROCESSES
+        interval = settings.JOBS_POLL_INTERVAL if options['interval'] is None else options['interval']
+
+        if processes == 1:
+            worker = Worker()
+            total = worker.run(interval=interval, max_jobs=options['max_jobs'])
+        else:
+            # Forked children must not share the parent's database connections.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            counter = context.Value('i', 0)
+            children = [
+                context.Process(target=work, args=(interval, options['max_jobs'], counter), daemon=True)
+                for _ in range(processes)
+            ]
+            for child in children:
+                child.start()
+
+            def forward(signum, frame):
+                for child in children:
+                    if child.is_alive():
+                        child.terminate()
+
+            # Ctrl+C reaches the children directly; they finish their current job.
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, forward)
+            for child in children:
+                child.join()
+            total = counter.value
+        self.stdout.write(f'{total} job(s) executado(s).')
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'http_requests_total': ('counter', 'Requisições HTTP por view, método e status.'),
+    'http_request_duration_seconds': ('histogram', 'Latência das requisições HTTP por view.'),
+    'db_queries_total': ('counter', 'Queries executadas por view.'),
+    'db_query_duration_seconds_total': ('counter', 'Tempo gasto em queries por view.'),
+    'serializer_duration_seconds_total': ('counter', 'Tempo gasto serializando dados por view.'),
+    'render_duration_seconds_total': ('counter', 'Tempo gasto renderizando respostas por view.'),
+    'cache_requests_total': ('counter', 'Consultas aos caches da aplicação por resultado (hit/miss/stale/refresh).'),
+    'cache_refresh_duration_seconds': ('histogram', 'Tempo gasto recalculando entradas dos caches de listagem.'),
+    'idempotency_requests_total': ('counter', 'Requisições com Idempotency-Key por view e resultado.'),
+    'outbox_events_total': ('counter', 'Eventos do outbox por destino e resultado (delivered/retry/failed).'),
+    'jobs_total': ('counter', 'Jobs executados por tarefa e resultado (done/retry/failed).'),
+    'job_duration_seconds': ('histogram', 'Duração da execução dos jobs por tarefa.'),
+}
+
+# Per-request accumulator for time spent in serializers/renderers.
+request_timings = ContextVar('request_timings', default=None)
+
+
+class Registry:
+    """
+    In-process metrics registry.
+
+    Under a preforking server every worker keeps its own registry and, when
+    METRICS_DIR is set, periodically dumps it to ``metrics-<pid>.json`` in
+    that directory. Collecting merges every worker's file, so the /metrics
+    endpoint reports totals for the whole server no matter which worker
+    answers the scrape. A registry inherited through fork is reset in the
+    child so samples are never counted twice.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def _check_pid(self):
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self._check_pid()
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        with self.lock:
+            self._check_pid()
+            key = (name, labels)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(DEFAULT_BUCKETS) + 2)
+            histogram[bisect_left(DEFAULT_BUCKETS, value)] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            self._check_pid()
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, values] for (name, labels), values in self.histograms.items()],
+            }
+
+    def flush(self, force=False):
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or (not force and now - self.last_flush < settings.METRICS_FLUSH_INTERVAL):
+            return
+        self.last_flush = now
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'metrics-{os.getpid()}.json'
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_bytes(orjson.dumps(self.snapshot()))
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        snapshots = [self.snapshot()]
+        if settings.METRICS_DIR:
+            self.flush(force=True)
+            snapshots = []
+            for path in Path(settings.METRICS_DIR).glob('metrics-*.json'):
+                try:
+                    snapshots.append(orjson.loads(path.read_bytes()))
+                except (OSError, orjson.JSONDecodeError):
+                    continue
+
+        counters = {}
+        histograms = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    merged[i] += value
+        return counters, histograms
+
+    def render(self):
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, description) in METRICS.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (sample, labels), value in sorted(counters.items()):
+                    if sample == name:
+                        lines.append(f'{name}{_format_labels(labels)} {value}')
+            else:
+                for (sample, labels), values in sorted(histograms.items()):
+                    if sample != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(DEFAULT_BUCKETS + ('+Inf',), values):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(labels + (("le", str(bound)),))} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {values[-1]}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+registry = Registry()
+
+
+@contextmanager
+def timed(kind):
+    """Add the block's duration to the current request's ``kind`` timing."""
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[kind] = timings.get(kind, 0.0) + time.perf_counter() - start
+
+
+def record_cache(cache_name, result):
+    registry.inc('cache_requests_total', (('cache', cache_name), ('result', result)))
@@ -1,8 +1,31 @@
+import cProfile
+import hashlib
 import logging
 import json
+import math
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
+from . import metrics
+from .routers import replica_reads
+from .slow_queries import capture as capture_slow_queries
 
 class LoggingMiddleware(MiddlewareMixin):
+    # __call__ is synchronous; without this Django would hand it an async
+    # get_response under ASGI.
+    async_capable = False
+
     def __init__(self, get_response):
         self.get_response = get_response
         self.logger = logging.getLogger('api_requests_logger')
@@ -30,6 +53,285 @@ class LoggingMiddleware(MiddlewareMixin):
         response = self.get_response(request)
 
         if not any(request.path.startswith(excluded_path) for excluded_path in excluded_paths):
-            self.logger.info(f'Response: {response.status_code} {response.content[:1000]}')
+            content = b'<streaming>' if response.streaming else response.content[:1000]
+            self.logger.info(f'Response: {response.status_code} {content}')
+
+        return response
+
+class LoadSheddingMiddleware:
+    """
+    Rejects new requests with 503 + Retry-After while this worker is
+    saturated: too many requests in flight, or database latency (an
+    exponentially decaying average of observed query times) above the
+    configured threshold. The average decays with wall time, so once
+    traffic is shed the worker recovers on its own.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_concurrency = settings.LOAD_SHEDDING_MAX_CONCURRENCY
+        self.db_latency_threshold = settings.LOAD_SHEDDING_DB_LATENCY_MS / 1000
+        self.decay_seconds = settings.LOAD_SHEDDING_DECAY_SECONDS
+        self.retry_after = settings.LOAD_SHEDDING_RETRY_AFTER
+        if not self.max_concurrency and not self.db_latency_threshold:
+            raise MiddlewareNotUsed
+
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.db_latency = 0.0
+        self.db_latency_updated = time.monotonic()
+
+    def __call__(self, request):
+        if any(request.path.startswith(path) for path in settings.LOAD_SHEDDING_EXEMPT_PATHS):
+            return self.get_response(request)
+
+        with self.lock:
+            overloaded = (
+                (self.max_concurrency and self.in_flight >= self.max_concurrency)
+                or (self.db_latency_threshold and self.current_db_latency() > self.db_latency_threshold)
+            )
+            if not overloaded:
+                self.in_flight += 1
+
+        if overloaded:
+            response = JsonResponse({"error": "Servidor sobrecarregado, tente novamente em instantes."}, status=503)
+            response['Retry-After'] = self.retry_after
+            return response
+
+        try:
+            with ExitStack() as stack:
+                if self.db_latency_threshold:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(self.observe_query))
+                return self.get_response(request)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def current_db_latency(self):
+        elapsed = time.monotonic() - self.db_latency_updated
+        return self.db_latency * math.exp(-elapsed / self.decay_seconds)
+
+    def observe_query(self, execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.monotonic() - start
+            with self.lock:
+                self.db_latency = 0.8 * self.current_db_latency() + 0.2 * duration
+                self.db_latency_updated = time.monotonic()
+
+
+class ProfilingMiddleware:
+    """
+    Profiles single requests on demand: those carrying a valid signed
+    PROFILING_HEADER token (see `manage.py profiling_token`) plus a random
+    PROFILING_SAMPLE_RATE fraction. Each capture writes a cProfile ``.prof``
+    file and a ``.json`` file with the request's SQL and timings to
+    PROFILING_DIR, keeping only the newest PROFILING_MAX_FILES captures.
+    Disabled unless PROFILING_ENABLED is set.
+    """
+    signer_salt = 'products.profiling'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.header = 'HTTP_' + settings.PROFILING_HEADER.upper().replace('-', '_')
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.directory = Path(settings.PROFILING_DIR)
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        queries = []
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'duration': time.perf_counter() - start,
+                })
+
+        profile = cProfile.Profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            start = time.perf_counter()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already active on this thread.
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+            duration = time.perf_counter() - start
+
+        capture_id = self.save(request, response, profile, queries, duration)
+        response['X-Profile-Id'] = capture_id
+        return response
+
+    def should_profile(self, request):
+        token = request.META.get(self.header)
+        if token:
+            try:
+                signing.TimestampSigner(salt=self.signer_salt).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+                return True
+            except signing.BadSignature:
+                return False
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def save(self, request, response, profile, queries, duration):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        capture_id = f'{datetime.now().strftime("%Y%m%dT%H%M%S%f")}-{view}-{uuid.uuid4().hex[:8]}'
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(self.directory / f'{capture_id}.prof')
+        (self.directory / f'{capture_id}.json').write_text(json.dumps({
+            'id': capture_id,
+            'view': view,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration': duration,
+            'query_count': len(queries),
+            'query_time': sum(query['duration'] for query in queries),
+            'queries': queries,
+        }))
+
+        captures = sorted(self.directory.glob('*.json'))
+        for old in captures[:-settings.PROFILING_MAX_FILES]:
+            old.unlink(missing_ok=True)
+            old.with_suffix('.prof').unlink(missing_ok=True)
+        return capture_id
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status, DB query count/time and serializer/render time
+    per URL name into products.metrics.registry.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_stats = {'count': 0, 'time': 0.0}
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                query_stats['count'] += 1
+                query_stats['time'] += time.perf_counter() - start
+
+        timings = {}
+        token = metrics.request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                response = self.get_response(request)
+        finally:
+            metrics.request_timings.reset(token)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        labels = (('view', view), ('method', request.method))
+        registry = metrics.registry
+        registry.inc('http_requests_total', labels + (('status', str(response.status_code)),))
+        registry.observe('http_request_duration_seconds', labels, duration)
+        registry.inc('db_queries_total', labels, query_stats['count'])
+        registry.inc('db_query_duration_seconds_total', labels, query_stats['time'])
+        registry.inc('serializer_duration_seconds_total', labels, timings.get('serializer', 0.0))
+        registry.inc('render_duration_seconds_total', labels, timings.get('render', 0.0))
+        registry.flush()
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Flags queries slower than SLOW_QUERY_THRESHOLD_MS and, after the response
+    is built, stores them as SlowQuery rows with a normalized fingerprint,
+    the originating view and an EXPLAIN plan (rate limited).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+        if not self.threshold:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        slow_queries = []
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - start
+                if duration >= self.threshold and not many:
+                    slow_queries.append({
+                        'alias': context['connection'].alias,
+                        'sql': sql,
+                        'params': params,
+                        'duration': duration,
+                    })
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            response = self.get_response(request)
+
+        if slow_queries:
+            match = request.resolver_match
+            view = (match.url_name or match.view_name) if match else request.path
+            capture_slow_queries(slow_queries, view)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe requests read from the replicas in REPLICA_ALIASES. A client
+    (identified by its Authorization header, or its address) that just sent
+    a write keeps reading from the primary for REPLICA_STICKY_SECONDS so it
+    always sees its own changes. That flag must reach every worker, so a
+    shared cache backend is required.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+    local_caches = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.REPLICA_ALIASES:
+            raise MiddlewareNotUsed
+        if settings.CACHES['default']['BACKEND'] in self.local_caches:
+            raise ImproperlyConfigured(
+                'Réplicas de leitura exigem um cache compartilhado entre os workers (CACHE_BACKEND, ex. memcached ou redis).'
+            )
+
+    def __call__(self, request):
+        sticky_key = self.sticky_key(request)
+        safe = request.method in self.safe_methods
+        allowed = safe and not cache.get(sticky_key)
+
+        with replica_reads(allowed):
+            response = self.get_response(request)
+
+        if not safe:
+            cache.set(sticky_key, 1, timeout=settings.REPLICA_STICKY_SECONDS)
+        return response
 
-        return response
\ No newline at end of file
+    def sticky_key(self, request):
+        client = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+        return 'replica:sticky:' + hashlib.sha1(client.encode()).hexdigest()
@@ -2,6 +2,12 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+class LiveProductManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 class Product(models.Model):
     name = models.CharField(max_length=255)
@@ -10,6 +16,31 @@ class Product(models.Model):
     sku = models.CharField(max_length=50, unique=True)
     supplier = models.ForeignKey('Supplier', on_delete=models.SET_NULL, null=True)
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='products')
+    # Set by ProductDeleteView; the row and its dependents are removed later by
+    # manage.py purge_deleted_products (products/deletion.py).
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    # Bayesian average of the product's reviews, kept in sync with
+    # ProductRating by products/ranking.py; null while unrated.
+    rating_score = models.FloatField(null=True, blank=True)
+
+    # Read paths use Product.objects, which hides soft-deleted products. The
+    # default manager still sees them so the SKU stays reserved (unique
+    # validation, admin, related managers) until the row is purged.
+    objects = LiveProductManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        default_manager_name = 'all_objects'
+        indexes = [
+            # Prefix searches (admin '^name'); the opclass is PostgreSQL-only and ignored elsewhere.
+            models.Index(fields=['name'], name='product_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['deleted_at'], condition=models.Q(deleted_at__isnull=False), name='product_deleted_idx'),
+            # product/top/: one index range per category, already in leaderboard order.
+            models.Index(
+                fields=['category', '-rating_score', 'id'], name='product_top_rated_idx',
+                condition=models.Q(deleted_at__isnull=True, rating_score__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -23,6 +54,8 @@ class Category(models.Model):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True, null=True)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    # Reorder threshold for the category's products; null inherits the parent's.
+    reorder_level = models.PositiveIntegerField(null=True, blank=True)
 
     def save(self, *args, **kwargs):
         self.name = self.name.lower()
@@ -32,7 +65,7 @@ class Category(models.Model):
         return self.name
 class ProductRating(models.Model):
     product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='rating')
-    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    average_rating = models.DecimalField(max_digits=4, decimal_places=2, default=0.00)
     ratings_count = models.IntegerField(default=0)
 
     def __str__(self):
@@ -42,6 +75,19 @@ class ProductStock(models.Model):
     product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='stock')
     quantity = models.IntegerField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
+    # Per-product threshold; null falls back to the category's (products/reordering.py).
+    reorder_threshold = models.PositiveIntegerField(null=True, blank=True)
+    # Effective threshold, denormalized here so low stock is a same-row comparison.
+    reorder_level = models.IntegerField(default=0)
+    # Set once the product went out in a reorder batch; cleared when restocked.
+    reorder_requested_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Only rows below their threshold are indexed, so low-stock scans
+            # cost as much as there are low-stock products.
+            models.Index(fields=['product'], condition=models.Q(quantity__lt=models.F('reorder_level')), name='stock_low_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.quantity} items"
@@ -66,6 +112,174 @@ class Review(models.Model):
     def __str__(self):
         return f"Review by {self.user} on {self.product}"
     
+class Rollup(models.Model):
+    product_count = models.IntegerField(default=0)
+    units_in_stock = models.BigIntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    rating_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    rated_products = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+class SupplierRollup(Rollup):
+    supplier = models.OneToOneField(Supplier, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+
+    def __str__(self):
+        return f"Resumo do fornecedor {self.supplier_id}"
+
+class CategoryRollup(Rollup):
+    """Totals for the category and all of its subcategories."""
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+
+    def __str__(self):
+        return f"Resumo da categoria {self.category_id}"
+
+class RelatedProduct(models.Model):
+    """Precomputed "customers also rated" neighbours of a product, rebuilt by manage.py build_related_products."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_products')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_to')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['product', 'rank'], name='related_product_rank_uniq')]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} ({self.score:.3f})"
+
+class SlowQuery(models.Model):
+    fingerprint = models.CharField(max_length=16)
+    normalized_sql = models.TextField()
+    sql = models.TextField()
+    duration_ms = models.FloatField()
+    plan = models.TextField(blank=True)
+    view = models.CharField(max_length=255, blank=True)
+    database = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['fingerprint', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.fingerprint} {self.duration_ms:.0f}ms em {self.view}"
+
+class ChangeLog(models.Model):
+    """Append-only log of catalog changes; the id is the position in the change feed."""
+    KIND_CHOICES = [('product', 'product'), ('price', 'price'), ('stock', 'stock'), ('rating', 'rating')]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    # Plain columns, not a FK: entries outlive the products they describe.
+    product_id = models.BigIntegerField(db_index=True)
+    sku = models.CharField(max_length=50)
+    deleted = models.BooleanField(default=False)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.id} {self.kind} {self.sku}"
+
+class ChangeLogPurge(models.Model):
+    """Single row: the highest ChangeLog id removed by changes.purge(); feed tokens below it are expired."""
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    purged_through = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"purged through {self.purged_through}"
+
+class OutboxEvent(models.Model):
+    """Event waiting to be delivered to another system by manage.py dispatch_outbox."""
+    id = models.BigAutoField(primary_key=True)
+    destination = models.CharField(max_length=64)
+    event_type = models.CharField(max_length=64)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_at'], condition=models.Q(failed_at__isnull=True), name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.event_type} -> {self.destination}"
+
+class Job(models.Model):
+    """Background task run by manage.py run_workers (see products/jobs.py)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Na fila'), (RUNNING, 'Executando'), (DONE, 'Concluído'), (FAILED, 'Falhou')]
+
+    id = models.BigAutoField(primary_key=True)
+    task = models.CharField(max_length=64)
+    args = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    priority = models.SmallIntegerField(default=0)
+    # At most one queued/running job per key; enqueueing it again returns that job.
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    # Queued: when the job may start. Running: when its lease runs out.
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    worker = models.CharField(max_length=255, blank=True)
+    progress = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Seconds taken by the last attempt.
+    duration = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                models.F('priority').desc(), 'available_at', name='job_pending_idx',
+                condition=models.Q(status__in=['queued', 'running']),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'], name='job_active_dedupe_uniq',
+                condition=models.Q(status__in=['queued', 'running']),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.task} ({self.status})"
+
+class CacheVersion(models.Model):
+    """Shared version counter of a group of in-process caches (products/versioning.py)."""
+    namespace = models.CharField(max_length=64, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.namespace} v{self.version}"
+
+class IdempotencyKey(models.Model):
+    """Stored response of a request sent with an Idempotency-Key header; status_code is null while in flight."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key')]
+
+    def __str__(self):
+        return f"{self.user} {self.key} {self.status_code}"
+
 # class APILog(models.Model):
 #     created_at = models.DateTimeField(auto_now_add=True)
 #     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
@@ -0,0 +1,122 @@
+import logging
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .metrics import registry
+from .models import OutboxEvent
+
+logger = logging.getLogger('api_requests_logger')
+
+
+def destinations_for(event_type):
+    return [name for name, destination in settings.OUTBOX_DESTINATIONS.items() if event_type in destination.get('events', ())]
+
+
+def publish(event_type, payload):
+    publish_many(event_type, [payload])
+
+
+def publish_many(event_type, payloads):
+    """
+    Queue events for every destination subscribed to ``event_type``. Must run
+    inside the transaction of the change so the events commit (or roll back)
+    with it; nothing is sent from the request itself.
+    """
+    names = destinations_for(event_type)
+    if not names:
+        return
+    OutboxEvent.objects.bulk_create(
+        [OutboxEvent(destination=name, event_type=event_type, payload=payload) for payload in payloads for name in names],
+        batch_size=1000,
+    )
+
+
+def backoff(attempts):
+    delay = min(settings.OUTBOX_BACKOFF_BASE ** attempts, settings.OUTBOX_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+class Dispatcher:
+    """
+    Claims due events with SELECT ... FOR UPDATE SKIP LOCKED and leases them
+    for OUTBOX_LEASE_SECONDS, so any number of dispatchers can run side by
+    side without sending an event twice; a dispatcher that dies mid-batch
+    only delays its events until the lease runs out.
+    """
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.session = requests.Session()
+
+    def claim(self):
+        now = timezone.now()
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(failed_at__isnull=True, available_at__lte=now)
+                .order_by('available_at', 'id')[:self.batch_size]
+            )
+            if events:
+                OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                    available_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+                )
+        return events
+
+    def dispatch_once(self):
+        """Deliver one batch; returns (claimed, delivered) event counts."""
+        events = self.claim()
+        batches = defaultdict(list)
+        for event in events:
+            batches[event.destination].append(event)
+        return len(events), sum(self.deliver(destination, batch) for destination, batch in batches.items())
+
+    def deliver(self, destination, events):
+        labels = (('destination', destination),)
+        config = settings.OUTBOX_DESTINATIONS.get(destination)
+        try:
+            if config is None:
+                raise ValueError(f"Destino '{destination}' não configurado.")
+            response = self.session.post(
+                config['url'],
+                json={'events': [
+                    {'id': event.id, 'type': event.event_type, 'created_at': event.created_at.isoformat(), 'payload': event.payload}
+                    for event in events
+                ]},
+                headers=config.get('headers', {}),
+                timeout=settings.OUTBOX_TIMEOUT,
+            )
+            response.raise_for_status()
+        except (requests.RequestException, ValueError) as exc:
+            self.retry(events, str(exc), labels)
+            return 0
+
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+        registry.inc('outbox_events_total', labels + (('result', 'delivered'),), len(events))
+        return len(events)
+
+    def retry(self, events, error, labels):
+        now = timezone.now()
+        attempts = max(event.attempts for event in events) + 1
+        error = error[:2000]
+        logger.warning(f"Outbox: falha ao entregar {len(events)} evento(s) para {labels[0][1]} (tentativa {attempts}): {error}")
+
+        pending = OutboxEvent.objects.filter(pk__in=[event.pk for event in events])
+        failed = pending.filter(attempts__gte=settings.OUTBOX_MAX_ATTEMPTS - 1).update(
+            attempts=F('attempts') + 1, last_error=error, failed_at=now,
+        )
+        retried = pending.filter(failed_at__isnull=True).update(
+            attempts=F('attempts') + 1, last_error=error, available_at=now + backoff(attempts),
+        )
+        registry.inc('outbox_events_total', labels + (('result', 'failed'),), failed)
+        registry.inc('outbox_events_total', labels + (('result', 'retry'),), retried)
+
+
+def requeue(queryset):
+    """Put failed events back in the queue with a fresh attempt count."""
+    return queryset.update(failed_at=None, attempts=0, available_at=timezone.now())
@@ -0,0 +1,73 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+def estimate_count(queryset):
+    """
+    Planner estimate of the rows in ``queryset`` (PostgreSQL only, None
+    elsewhere): pg_class.reltuples for a whole table, the EXPLAIN row
+    estimate for a filtered queryset.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+                # -1 until the table has been analyzed.
+                return row[0] if row and row[0] >= 0 else None
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+    except DatabaseError:
+        return None
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Uses the planner estimate instead of SELECT COUNT(*) when it is at least
+    APPROXIMATE_COUNT_THRESHOLD rows, so paging a huge table never scans it;
+    smaller results are counted exactly.
+    """
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate >= settings.APPROXIMATE_COUNT_THRESHOLD:
+                self.count_is_estimate = True
+                return estimate
+        return Paginator.count.func(self)
+
+
+class ApproximatePageNumberPagination(PageNumberPagination):
+    django_paginator_class = ApproximateCountPaginator
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def is_requested(self, request):
+        return self.page_query_param in request.query_params or self.page_size_query_param in request.query_params
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        return Response({
+            'count': paginator.count,
+            'count_is_estimate': paginator.count_is_estimate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
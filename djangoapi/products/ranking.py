@@ -0,0 +1,68 @@
+"""
+Leaderboard scores.
+
+A product's rating_score is the Bayesian average of its reviews: the mean
+pulled towards RANKING_PRIOR_MEAN as if it also had RANKING_PRIOR_WEIGHT
+reviews of that value, so a single 10/10 review does not outrank a hundred
+9/10 ones. The score is written to the Product row whenever its
+ProductRating changes and is indexed with the category, so product/top/
+reads each category's leaders straight off the index.
+"""
+import heapq
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import ExpressionWrapper, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast
+
+from .models import Product, ProductRating
+
+
+def bayesian_score(average_rating, ratings_count):
+    if not ratings_count:
+        return None
+    weight, mean = settings.RANKING_PRIOR_WEIGHT, settings.RANKING_PRIOR_MEAN
+    return (weight * mean + float(average_rating) * ratings_count) / (weight + ratings_count)
+
+
+def rating_saved(instance):
+    score = bayesian_score(instance.average_rating, instance.ratings_count)
+    Product.all_objects.filter(pk=instance.product_id).update(rating_score=score)
+
+
+def rating_deleted(instance):
+    Product.all_objects.filter(pk=instance.product_id).update(rating_score=None)
+
+
+def rebuild_scores():
+    """Recompute every score in one UPDATE (after changing the prior); returns the rows updated."""
+    weight, mean = settings.RANKING_PRIOR_WEIGHT, settings.RANKING_PRIOR_MEAN
+    score = ExpressionWrapper(
+        (Value(float(weight * mean)) + Cast('average_rating', FloatField()) * F('ratings_count')) / (Value(float(weight)) + F('ratings_count')),
+        output_field=FloatField(),
+    )
+    rated = ProductRating.objects.filter(product=OuterRef('pk'), ratings_count__gt=0).annotate(score=score)
+    return Product.all_objects.update(rating_score=Subquery(rated.values('score')[:1]))
+
+
+def top_products(category_ids, limit, serializer):
+    """
+    The ``limit`` best-scored products over ``category_ids``. Each category
+    is read as its own ORDER BY ... LIMIT on product_top_rated_idx (one
+    UNION ALL query where the backend allows it) and the per-category lists
+    are merged here, so the database never sorts more than an index range.
+    ``serializer`` picks the columns and must read id and rating_score.
+    """
+    if limit <= 0:
+        return []
+    ranges = [
+        serializer.values(
+            Product.objects.filter(category_id=category_id, rating_score__isnull=False).order_by('-rating_score', 'id')
+        )[:limit]
+        for category_id in category_ids
+    ]
+    if len(ranges) > 1 and connection.features.supports_slicing_ordering_in_compound:
+        rows = list(ranges[0].union(*ranges[1:], all=True))
+    else:
+        rows = [row for queryset in ranges for row in queryset]
+    return heapq.nsmallest(limit, rows, key=lambda row: (-row['rating_score'], row['id']))
@@ -0,0 +1,155 @@
+"""
+"Customers also rated" item-item similarities, computed offline from Review.
+
+Reviews become a sparse user x product matrix (rating + 1, so a 0 rating
+still counts as having rated the product) and products are compared by the
+cosine of their columns. The product of the whole matrix with itself is
+never materialised: products are processed in chunks whose worst-case
+number of non-zero similarities fits RELATED_PRODUCTS_MEMORY_MB, and each
+chunk is reduced to its top K neighbours with vectorised NumPy before the
+next one starts.
+
+Only the build job imports NumPy/SciPy; product/<sku>/related/ reads the
+RelatedProduct table.
+"""
+import io
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from scipy import sparse
+
+from .models import RelatedProduct, Review
+
+# Peak bytes per non-zero similarity while a chunk is reduced: the product
+# matrix itself (value + column), row ids, the sort order and filtered copies.
+BYTES_PER_ENTRY = 48
+
+LOAD_CHUNK_SIZE = 100000
+
+INSERT_BATCH_SIZE = 5000
+
+
+def load_reviews(chunk_size=LOAD_CHUNK_SIZE):
+    """(user ids, product ids, ratings) of every review of a live product."""
+    rows = (
+        Review.objects.filter(product__deleted_at__isnull=True)
+        .values_list('user_id', 'product_id', 'rating')
+        .iterator(chunk_size=chunk_size)
+    )
+    chunks = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        chunks.append(np.array(chunk, dtype=np.int64))
+    if not chunks:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+    data = np.concatenate(chunks)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def rating_matrix(users, items, ratings):
+    """
+    Column-normalised user x item matrix and the product id of each column.
+    A user who reviewed a product more than once counts with the mean rating.
+    """
+    user_ids, user_index = np.unique(users, return_inverse=True)
+    product_ids, item_index = np.unique(items, return_inverse=True)
+    shape = (len(user_ids), len(product_ids))
+    values = sparse.csr_matrix(((ratings + 1).astype(np.float32), (user_index, item_index)), shape=shape)
+    counts = sparse.csr_matrix((np.ones(len(ratings), np.float32), (user_index, item_index)), shape=shape)
+    values.sum_duplicates()
+    counts.sum_duplicates()
+    values.data /= counts.data
+
+    norms = np.sqrt(np.asarray(values.multiply(values).sum(axis=0)).ravel())
+    return (values @ sparse.diags(1 / norms)).tocsc(), product_ids
+
+
+def chunk_bounds(matrix, max_entries):
+    """
+    Split the columns so that no chunk's similarity block can have more
+    than ``max_entries`` non-zeros (a single column may exceed it on its own).
+    The bound for a column is the total number of ratings given by the users
+    who rated it.
+    """
+    binary = matrix.copy()
+    binary.data[:] = 1
+    user_degree = np.asarray(binary.sum(axis=1)).ravel()
+    work = np.cumsum(binary.T @ user_degree)
+    bounds = [0]
+    while bounds[-1] < len(work):
+        start = bounds[-1]
+        done = work[start - 1] if start else 0
+        stop = int(np.searchsorted(work, done + max_entries, side='right'))
+        bounds.append(max(stop, start + 1))
+    return list(zip(bounds, bounds[1:]))
+
+
+def top_k(block, offset, k):
+    """Top ``k`` (row, column, score) of every row of ``block``, excluding the diagonal."""
+    block = block.tocsr()
+    rows = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+    columns, scores = block.indices, block.data
+    keep = columns != rows + offset
+    rows, columns, scores = rows[keep], columns[keep], scores[keep]
+
+    order = np.lexsort((columns, -scores, rows))
+    rows, columns, scores = rows[order], columns[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < k
+    return rows[keep] + offset, columns[keep], scores[keep], rank[keep]
+
+
+def similar_products(users, items, ratings, k, memory_mb):
+    """Yield (product ids, related ids, scores, ranks) arrays, one chunk of products at a time."""
+    if not len(ratings):
+        return
+    matrix, product_ids = rating_matrix(users, items, ratings)
+    transposed, right = matrix.T.tocsr(), matrix.tocsr()
+    for start, stop in chunk_bounds(matrix, memory_mb * 1024 * 1024 // BYTES_PER_ENTRY):
+        rows, columns, scores, ranks = top_k(transposed[start:stop] @ right, start, k)
+        yield product_ids[rows], product_ids[columns], scores, ranks
+
+
+def _copy(product_ids, related_ids, scores, ranks):
+    # PostgreSQL: one COPY per chunk instead of INSERT batches.
+    buffer = io.StringIO()
+    np.savetxt(buffer, np.column_stack((product_ids, related_ids, ranks, scores)), fmt=('%d', '%d', '%d', '%.6f'), delimiter='\t')
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in ('product_id', 'related_id', 'rank', 'score'))
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {quote(RelatedProduct._meta.db_table)} ({columns}) FROM STDIN', buffer)
+
+
+def _insert(product_ids, related_ids, scores, ranks):
+    for start in range(0, len(product_ids), INSERT_BATCH_SIZE):
+        stop = start + INSERT_BATCH_SIZE
+        RelatedProduct.objects.bulk_create([
+            RelatedProduct(product_id=product_id, related_id=related_id, score=score, rank=rank)
+            for product_id, related_id, score, rank in zip(
+                product_ids[start:stop].tolist(), related_ids[start:stop].tolist(),
+                scores[start:stop].tolist(), ranks[start:stop].tolist(),
+            )
+        ])
+
+
+def store(chunks):
+    """Replace the RelatedProduct table with ``chunks`` in one transaction; returns the rows written."""
+    load = _copy if connection.vendor == 'postgresql' else _insert
+    written = 0
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        for chunk in chunks:
+            load(*chunk)
+            written += len(chunk[0])
+    return written
+
+
+def build_related_products(k=None, memory_mb=None):
+    k = k or settings.RELATED_PRODUCTS_K
+    memory_mb = memory_mb or settings.RELATED_PRODUCTS_MEMORY_MB
+    return store(similar_products(*load_reviews(), k, memory_mb))
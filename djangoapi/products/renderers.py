@@ -0,0 +1,30 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from .metrics import timed
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson.
+
+    Native types (str, int, float, dict, list, ...) are encoded in C; anything
+    orjson does not know (Decimal, lazy strings, datetimes, querysets, ...) is
+    handed to DRF's JSONEncoder so the output stays identical to JSONRenderer.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def __init__(self):
+        self._default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+
+        with timed('render'):
+            return orjson.dumps(data, default=self._default, option=options)
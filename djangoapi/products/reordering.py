@@ -0,0 +1,124 @@
+"""
+Low-stock detection and supplier reorder batches.
+
+Every ProductStock row carries its effective reorder_level: the product's
+own reorder_threshold, else the reorder_level of its category or nearest
+ancestor, else REORDER_LEVEL_DEFAULT. Keeping it on the row makes "low
+stock" the same-row comparison quantity < reorder_level, which the partial
+index stock_low_idx covers, so finding low stock reads only low rows. The
+signal handlers below recompute the level when a threshold, a category's
+level or a product's category changes.
+"""
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import outbox
+from .category_cache import category_cache
+from .models import ProductStock
+
+EVENT_TYPE = 'reorder.requested'
+
+
+def effective_level(category_id):
+    level = category_cache.reorder_level(category_id) if category_id is not None else None
+    return settings.REORDER_LEVEL_DEFAULT if level is None else level
+
+
+def low_stock():
+    return ProductStock.objects.filter(quantity__lt=F('reorder_level'))
+
+
+def group_by_supplier(rows):
+    """Rows ordered by supplier -> [{supplier, supplier_name, items}]."""
+    return [
+        {
+            "supplier": supplier,
+            "supplier_name": items[0]['supplier_name'],
+            "items": [{key: value for key, value in item.items() if key not in ('supplier', 'supplier_name')} for item in items],
+        }
+        for supplier, items in ((supplier, list(items)) for supplier, items in groupby(rows, itemgetter('supplier')))
+    ]
+
+
+def emit_batches(serializer, dry_run=False):
+    """
+    Queue one reorder.requested outbox event per supplier with the low-stock
+    products not yet requested, and mark them requested. Returns the batches.
+    """
+    with transaction.atomic():
+        pending = low_stock().filter(reorder_requested_at__isnull=True).order_by('product__supplier', 'product__sku')
+        if not dry_run:
+            pending = pending.select_for_update(skip_locked=True, of=('self',))
+        rows = serializer.serialize(pending)
+        batches = group_by_supplier(rows)
+        if batches and not dry_run:
+            outbox.publish_many(EVENT_TYPE, batches)
+            ProductStock.objects.filter(product__sku__in=[row['sku'] for row in rows]).update(reorder_requested_at=timezone.now())
+    return batches
+
+
+def refresh_levels(category_ids):
+    """Recompute the level of every inherited-threshold stock row in ``category_ids``; one UPDATE per distinct level."""
+    by_level = {}
+    for category_id in category_ids:
+        by_level.setdefault(effective_level(category_id), []).append(category_id)
+    for level, ids in by_level.items():
+        inherited = ProductStock.objects.filter(reorder_threshold__isnull=True)
+        inherited.filter(product__category_id__in=[pk for pk in ids if pk is not None]).update(reorder_level=level)
+        if None in ids:
+            inherited.filter(product__category__isnull=True).update(reorder_level=level)
+    ProductStock.objects.filter(reorder_requested_at__isnull=False, quantity__gte=F('reorder_level')).update(reorder_requested_at=None)
+
+
+def refresh_all_levels():
+    category_cache.refresh()
+    refresh_levels([*category_cache.parents, None])
+
+
+# Signal handlers (wired in products/signals.py)
+
+def track_stock(instance):
+    instance._reorder_threshold = instance.__dict__.get('reorder_threshold')
+
+
+def stock_pre_save(instance):
+    if instance.reorder_threshold is not None:
+        instance.reorder_level = instance.reorder_threshold
+    elif instance._state.adding or instance._reorder_threshold is not None:
+        instance.reorder_level = effective_level(instance.product.category_id)
+    if instance.quantity >= instance.reorder_level:
+        instance.reorder_requested_at = None
+    track_stock(instance)
+
+
+def track_product(instance):
+    instance._reorder_category = instance.__dict__.get('category_id')
+
+
+def product_saved(instance, created):
+    if not created and instance.category_id != instance._reorder_category:
+        ProductStock.objects.filter(product=instance, reorder_threshold__isnull=True).update(
+            reorder_level=effective_level(instance.category_id),
+        )
+    track_product(instance)
+
+
+def track_category(instance):
+    values = instance.__dict__
+    instance._reorder_state = (values.get('parent_id'), values.get('reorder_level'))
+
+
+def category_saved(instance, created):
+    if not created and (instance.parent_id, instance.reorder_level) != instance._reorder_state:
+        refresh_levels(category_cache.descendants(instance.pk))
+    track_category(instance)
+
+
+def category_deleted(instance):
+    # The category's products were moved to "no category" by SET_NULL.
+    refresh_levels([None])
@@ -0,0 +1,116 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, Q, Value
+from django.db.models.functions import Ceil, Coalesce, Greatest, Round
+
+from . import outbox, rollups
+from .changes import EVENT_TYPES, event_payload, lock_feed
+from .models import ChangeLog, PriceHistory, Product
+from .versioning import bump_version_on_commit
+
+OPERATIONS = ('set', 'percent', 'delta')
+
+ROUNDINGS = ('cents', 'integer', 'ending_99')
+
+MAX_PRICE = Decimal('99999999.99')
+
+PRICE_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+class RepriceError(Exception):
+    pass
+
+
+def price_expression(operation, value, rounding='cents'):
+    """SQL expression for the new price of each row."""
+    value = Decimal(value)
+    if operation == 'set':
+        expression = Value(value)
+    elif operation == 'percent':
+        expression = F('price') * Value(1 + value / 100)
+    elif operation == 'delta':
+        expression = F('price') + Value(value)
+    else:
+        raise RepriceError(f"Operação inválida: {operation}.")
+
+    if rounding == 'cents':
+        expression = Round(expression, 2)
+    elif rounding == 'integer':
+        expression = Round(expression, 0)
+    elif rounding == 'ending_99':
+        expression = Ceil(expression) - Value(Decimal('0.01'))
+    else:
+        raise RepriceError(f"Arredondamento inválido: {rounding}.")
+
+    return ExpressionWrapper(Greatest(expression, Value(Decimal('0.00'))), output_field=PRICE_FIELD)
+
+
+def update_prices(connection, sql, params):
+    """
+    Set each product selected by ``sql`` (id, sku, supplier_id, category_id,
+    price, new_price, quantity) to its new price with one UPDATE. Returns
+    the selected rows, with the old and the new price.
+    """
+    table = connection.ops.quote_name(Product._meta.db_table)
+    update = (
+        f'WITH changes AS ({sql}) '
+        f'UPDATE {table} SET price = changes.new_price FROM changes WHERE {table}.id = changes.id'
+    )
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                update + ' RETURNING changes.id, changes.sku, changes.supplier_id, changes.category_id, '
+                f'changes.price, {table}.price, changes.quantity',
+                params,
+            )
+            return cursor.fetchall()
+        # SQLite's RETURNING cannot see the CTE (the old price), but it
+        # serializes writers, so reading first is equivalent.
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.execute(update, params)
+        return rows
+
+
+def reprice(queryset, operation, value, rounding, user):
+    """
+    Reprice every product in ``queryset`` set-based: one UPDATE for all rows,
+    bulk PriceHistory and change feed inserts and rollup deltas grouped by
+    supplier and category, in a single transaction. Returns the number of changed products.
+    """
+    expression = price_expression(operation, value, rounding)
+    alias = queryset.db
+    connection = connections[alias]
+
+    with transaction.atomic(using=alias):
+        changes = queryset.order_by().annotate(new_price=expression).filter(~Q(price=F('new_price')))
+        highest = changes.aggregate(highest=Max('new_price'))['highest']
+        if highest is not None and highest > MAX_PRICE:
+            raise RepriceError(f"O novo preço excede o máximo permitido ({MAX_PRICE}).")
+
+        changes = changes.select_for_update(of=('self',)).annotate(quantity=Coalesce('stock__quantity', 0))
+        sql, params = changes.values(
+            'id', 'sku', 'supplier_id', 'category_id', 'price', 'new_price', 'quantity'
+        ).query.get_compiler(using=alias).as_sql()
+        rows = update_prices(connection, sql, params)
+
+        history = []
+        feed = []
+        deltas = defaultdict(Decimal)
+        for product_id, sku, supplier_id, category_id, old_price, new_price, quantity in rows:
+            old_price, new_price = rollups.to_decimal(old_price), rollups.to_decimal(new_price)
+            history.append(PriceHistory(product_id=product_id, old_price=old_price, new_price=new_price, user=user))
+            feed.append(ChangeLog(kind='price', product_id=product_id, sku=sku, data={'old_price': str(old_price), 'new_price': str(new_price)}))
+            deltas[supplier_id, category_id] += (new_price - old_price) * quantity
+        PriceHistory.objects.using(alias).bulk_create(history, batch_size=1000)
+        lock_feed(alias)
+        feed = ChangeLog.objects.using(alias).bulk_create(feed, batch_size=1000)
+        outbox.publish_many(EVENT_TYPES['price'], [event_payload(entry) for entry in feed])
+
+        for (supplier_id, category_id), stock_value in deltas.items():
+            rollups.apply(supplier_id, category_id, {'stock_value': stock_value})
+        if rows:
+            bump_version_on_commit('catalog')
+    return len(rows)
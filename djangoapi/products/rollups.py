@@ -0,0 +1,203 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .category_cache import category_cache
+from .models import CategoryRollup, Product, SupplierRollup
+
+FIELDS = ('product_count', 'units_in_stock', 'stock_value', 'rating_total', 'rated_products')
+
+CENTS = Decimal('0.01')
+
+
+def to_decimal(value):
+    return Decimal(str(value or 0)).quantize(CENTS)
+
+
+def contribution(price, quantity, average_rating, ratings_count, count=1):
+    """What one product adds to its supplier and category rollups."""
+    rated = (ratings_count or 0) > 0
+    return {
+        'product_count': count,
+        'units_in_stock': quantity,
+        'stock_value': to_decimal(price) * quantity,
+        'rating_total': to_decimal(average_rating) if rated else Decimal(0),
+        'rated_products': 1 if rated else 0,
+    }
+
+
+def empty_rollup(**key):
+    return {**key, **dict.fromkeys(FIELDS, 0), 'stock_value': Decimal(0)}
+
+
+def difference(new, old):
+    return {field: new[field] - old[field] for field in FIELDS}
+
+
+def negate(deltas):
+    return {field: -value for field, value in deltas.items()}
+
+
+def product_state(product_id):
+    # all_objects: soft_delete reads the state right after flagging the product.
+    return Product.all_objects.filter(pk=product_id).values(
+        'supplier_id', 'category_id', 'price',
+        quantity=Coalesce('stock__quantity', 0),
+        average_rating=Coalesce('rating__average_rating', Decimal(0)),
+        ratings_count=Coalesce('rating__ratings_count', 0),
+    ).first()
+
+
+def apply(supplier_id, category_id, deltas):
+    """Add ``deltas`` to the supplier rollup and to the category and all its ancestors."""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    if supplier_id is not None:
+        _add(SupplierRollup, [supplier_id], deltas)
+    if category_id is not None:
+        _add(CategoryRollup, [category_id, *category_cache.ancestors(category_id)], deltas)
+
+
+def _add(model, keys, deltas):
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    updates['updated_at'] = timezone.now()
+    if model.objects.filter(pk__in=keys).update(**updates) == len(keys):
+        return
+
+    existing = set(model.objects.filter(pk__in=keys).values_list('pk', flat=True))
+    for key in keys:
+        if key in existing:
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(pk=key, **deltas)
+        except IntegrityError:
+            model.objects.filter(pk=key).update(**updates)
+
+
+# Signal handlers (wired in products/signals.py). Each model remembers the
+# values it was loaded with so a save only applies the difference.
+
+def track_product(instance):
+    values = instance.__dict__
+    instance._rollup_state = (values.get('supplier_id'), values.get('category_id'), values.get('price'))
+
+
+def product_pre_save(instance):
+    state = getattr(instance, '_rollup_state', None)
+    if instance.pk and (state is None or state[2] is None):
+        row = Product.objects.filter(pk=instance.pk).values_list('supplier_id', 'category_id', 'price').first()
+        instance._rollup_state = row
+
+
+def product_saved(instance, created):
+    new_keys = (instance.supplier_id, instance.category_id)
+    if created:
+        apply(*new_keys, {'product_count': 1})
+    elif instance._rollup_state is not None:
+        old_supplier, old_category, old_price = instance._rollup_state
+        old_keys = (old_supplier, old_category)
+        if old_keys != new_keys or to_decimal(old_price) != to_decimal(instance.price):
+            state = product_state(instance.pk)
+            old = contribution(old_price, state['quantity'], state['average_rating'], state['ratings_count'])
+            new = contribution(instance.price, state['quantity'], state['average_rating'], state['ratings_count'])
+            if old_keys == new_keys:
+                apply(*new_keys, difference(new, old))
+            else:
+                apply(*old_keys, negate(old))
+                apply(*new_keys, new)
+    track_product(instance)
+
+
+def product_deleted(instance):
+    # Stock and rating rows are deleted (and subtracted) before the product.
+    apply(instance.supplier_id, instance.category_id, {'product_count': -1})
+
+
+def product_removed(product_id):
+    # Soft deletes bypass the collector, so the whole contribution goes at once.
+    state = product_state(product_id)
+    if state is not None:
+        contributed = contribution(state['price'], state['quantity'], state['average_rating'], state['ratings_count'])
+        apply(state['supplier_id'], state['category_id'], negate(contributed))
+
+
+def track_stock(instance):
+    instance._rollup_quantity = instance.__dict__.get('quantity')
+
+
+def stock_changed(instance, old_quantity, new_quantity):
+    delta = int(new_quantity or 0) - int(old_quantity or 0)
+    if not delta:
+        return
+    row = Product.objects.filter(pk=instance.product_id).values_list('supplier_id', 'category_id', 'price').first()
+    if row is None:
+        return
+    supplier_id, category_id, price = row
+    apply(supplier_id, category_id, {'units_in_stock': delta, 'stock_value': to_decimal(price) * delta})
+
+
+def track_rating(instance):
+    values = instance.__dict__
+    instance._rollup_rating = (values.get('average_rating'), values.get('ratings_count'))
+
+
+def rating_changed(instance, old, new):
+    deltas = difference(contribution(0, 0, *new), contribution(0, 0, *old))
+    if not deltas['rating_total'] and not deltas['rated_products']:
+        return
+    row = Product.objects.filter(pk=instance.product_id).values_list('supplier_id', 'category_id').first()
+    if row is not None:
+        apply(*row, {'rating_total': deltas['rating_total'], 'rated_products': deltas['rated_products']})
+
+
+# Full recomputation
+
+def compute_totals(group_field):
+    rated = Q(rating__ratings_count__gt=0)
+    rows = Product.objects.order_by().values(group_field).annotate(
+        product_count=Count('id'),
+        units_in_stock=Coalesce(Sum('stock__quantity'), 0),
+        stock_value=Coalesce(
+            Sum(F('price') * F('stock__quantity'), output_field=DecimalField(max_digits=18, decimal_places=2)),
+            Decimal(0),
+        ),
+        rating_total=Coalesce(Sum('rating__average_rating', filter=rated), Decimal(0)),
+        rated_products=Count('rating', filter=rated),
+    )
+    return {row.pop(group_field): row for row in rows if row[group_field] is not None}
+
+
+def _write(model, totals):
+    existing = {row.pop('pk'): row for row in model.objects.values('pk', *FIELDS)}
+    zero = dict.fromkeys(FIELDS, 0)
+    corrected = 0
+    for key in set(existing) | set(totals):
+        desired = {field: totals.get(key, zero)[field] for field in FIELDS}
+        current = existing.get(key)
+        if current is not None and all(to_decimal(current[f]) == to_decimal(desired[f]) for f in FIELDS):
+            continue
+        corrected += 1
+        model.objects.update_or_create(pk=key, defaults=desired)
+    return corrected
+
+
+def rebuild_category_rollups():
+    direct = compute_totals('category_id')
+    totals = {}
+    for category_id, values in direct.items():
+        for key in (category_id, *category_cache.ancestors(category_id)):
+            target = totals.setdefault(key, dict.fromkeys(FIELDS, 0))
+            for field in FIELDS:
+                target[field] += values[field]
+    return _write(CategoryRollup, totals)
+
+
+def reconcile_rollups():
+    """Recompute every rollup from scratch; returns how many rows were corrected."""
+    with transaction.atomic():
+        return _write(SupplierRollup, compute_totals('supplier_id')) + rebuild_category_rollups()
@@ -0,0 +1,82 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+# Reads only go to a replica inside a request that ReplicaRoutingMiddleware
+# marked as safe; management commands and background jobs stay on the primary.
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    token = _replica_reads.set(allowed)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaLagMonitor:
+    """Caches each replica's replication lag for REPLICA_LAG_CHECK_INTERVAL seconds."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lags = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        checked_at, lag = self.lags.get(alias, (None, None))
+        if checked_at is None or now - checked_at > settings.REPLICA_LAG_CHECK_INTERVAL:
+            lag = self.measure(alias)
+            with self.lock:
+                self.lags[alias] = (now, lag)
+        return lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+    def measure(self, alias):
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                # An idle primary leaves replay_timestamp behind; when every
+                # received WAL record has been replayed the replica is current.
+                cursor.execute(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )
+                return float(cursor.fetchone()[0])
+        except DatabaseError:
+            return float('inf')
+
+    def reset(self):
+        with self.lock:
+            self.lags.clear()
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+# Always read from the primary: a stale cache version would re-cache old data
+# under the new number, and feed readers must see every committed entry.
+PRIMARY_MODELS = {'products.cacheversion', 'products.changelog', 'products.changelogpurge'}
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.REPLICA_ALIASES or not _replica_reads.get() or model._meta.label_lower in PRIMARY_MODELS:
+            return 'default'
+        healthy = [alias for alias in settings.REPLICA_ALIASES if lag_monitor.is_healthy(alias)]
+        return random.choice(healthy) if healthy else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -1,18 +1,25 @@
+from decimal import Decimal
+from operator import itemgetter
 from rest_framework import serializers
+from django.conf import settings
+from django.db import models
 from django.shortcuts import get_object_or_404
-from .models import Product, ProductStock, Review, Category, Supplier
+from .models import Product, ProductStock, Review, Category, Supplier, SupplierRollup, CategoryRollup, ChangeLog, RelatedProduct, Job
+from .metrics import timed
+from .repricing import OPERATIONS, ROUNDINGS
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = ['deleted_at', 'rating_score']
 
 class ProductStockSerializer(serializers.ModelSerializer):
     product_sku = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductStock
-        fields = ['product_sku', 'quantity']
+        fields = ['product_sku', 'quantity', 'reorder_threshold']
+        extra_kwargs = {'reorder_threshold': {'write_only': True}}
 
     def get_product_sku(self, obj):
         return obj.product.sku
@@ -33,7 +40,7 @@ class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'parent', 'is_subcategory', 'parent_category']
+        fields = ['id', 'name', 'description', 'parent', 'reorder_level', 'is_subcategory', 'parent_category']
     
     def get_is_subcategory(self, obj):
         return obj.parent is not None
@@ -61,7 +68,222 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         product_sku = validated_data.pop('product_sku')
-        product = get_object_or_404(Product, sku=product_sku)
+        product = get_object_or_404(Product.objects, sku=product_sku)
         validated_data['product'] = product
         review = Review.objects.create(**validated_data)
-        return review
\ No newline at end of file
+        return review
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer for rows produced by ``QuerySet.values()``.
+
+    The lookups and the per-field converters are resolved once, when the
+    subclass is created, so serializing a row is a plain dict build with no
+    model instantiation or per-object field introspection. Output matches the
+    equivalent ModelSerializer (decimals as quantized strings, FKs as pks).
+    """
+    model = None
+    field_names = ()
+    sources = {}
+    computed = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._lookups, cls._getters = cls._compile(cls.field_names)
+
+    def __init__(self, fields=None):
+        # Sparse fieldset: only the lookups the requested fields need are
+        # selected, so unrequested columns and joins never reach the SQL.
+        if fields:
+            unknown = [name for name in fields if name not in self.field_names]
+            if unknown:
+                raise serializers.ValidationError({"error": f"Campos inválidos: {', '.join(unknown)}."})
+            names = tuple(name for name in self.field_names if name in fields)
+            self._lookups, self._getters = self._compile(names)
+
+    @classmethod
+    def _compile(cls, names):
+        lookups = []
+        getters = []
+        for name in names:
+            if name in cls.computed:
+                dependencies, getter = cls.computed[name]
+                lookups.extend(dependencies)
+            else:
+                lookup = cls.sources.get(name, name)
+                lookups.append(lookup)
+                getter = cls._getter_for(lookup)
+            getters.append((name, getter))
+        return tuple(dict.fromkeys(lookups)), tuple(getters)
+
+    @classmethod
+    def _getter_for(cls, lookup):
+        field = cls._resolve_field(lookup)
+        get = itemgetter(lookup)
+
+        if isinstance(field, models.DecimalField):
+            quantum = Decimal(1).scaleb(-field.decimal_places)
+
+            def get_decimal(row):
+                value = get(row)
+                return None if value is None else '{:f}'.format(value.quantize(quantum))
+            return get_decimal
+
+        if isinstance(field, models.DateTimeField):
+            to_representation = serializers.DateTimeField().to_representation
+
+            def get_datetime(row):
+                value = get(row)
+                return None if value is None else to_representation(value)
+            return get_datetime
+
+        return get
+
+    @classmethod
+    def _resolve_field(cls, lookup):
+        model = cls.model
+        *path, name = lookup.split('__')
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(name)
+
+    def to_representation(self, row):
+        return {name: get(row) for name, get in self._getters}
+
+    def values(self, queryset):
+        return queryset.values(*self._lookups)
+
+    def represent(self, rows):
+        to_representation = self.to_representation
+        with timed('serializer'):
+            return [to_representation(row) for row in rows]
+
+    def serialize(self, queryset):
+        return self.represent(list(self.values(queryset)))
+
+    def serialize_one(self, queryset):
+        row = next(iter(queryset.values(*self._lookups)[:1]), None)
+        if row is None:
+            raise self.model.DoesNotExist
+        with timed('serializer'):
+            return self.to_representation(row)
+
+    @classmethod
+    def from_request(cls, request):
+        fields = request.query_params.get('fields', '')
+        return cls(fields=[name.strip() for name in fields.split(',') if name.strip()])
+
+
+class ProductReadSerializer(ValuesSerializer):
+    model = Product
+    field_names = ('id', 'name', 'description', 'price', 'sku', 'supplier', 'category')
+
+
+class ProductStockReadSerializer(ValuesSerializer):
+    model = ProductStock
+    field_names = ('product_sku', 'quantity')
+    sources = {'product_sku': 'product__sku'}
+
+
+class LowStockSerializer(ValuesSerializer):
+    model = ProductStock
+    field_names = ('sku', 'name', 'supplier', 'supplier_name', 'quantity', 'reorder_level', 'shortfall')
+    sources = {'sku': 'product__sku', 'name': 'product__name', 'supplier': 'product__supplier', 'supplier_name': 'product__supplier__name'}
+    computed = {'shortfall': (('quantity', 'reorder_level'), lambda row: row['reorder_level'] - row['quantity'])}
+
+
+class CategoryReadSerializer(ValuesSerializer):
+    model = Category
+    field_names = ('id', 'name', 'description', 'parent', 'reorder_level', 'is_subcategory', 'parent_category')
+    computed = {
+        'is_subcategory': (('parent',), lambda row: row['parent'] is not None),
+        'parent_category': (('parent__name',), itemgetter('parent__name')),
+    }
+
+
+class SupplierReadSerializer(ValuesSerializer):
+    model = Supplier
+    field_names = ('id', 'name', 'description', 'contact_info')
+
+
+class CatalogItemSerializer(ValuesSerializer):
+    model = Product
+    field_names = (
+        'id', 'sku', 'name', 'description', 'price', 'supplier', 'category',
+        'stock', 'average_rating', 'ratings_count',
+    )
+    sources = {
+        'stock': 'stock__quantity',
+        'average_rating': 'rating__average_rating',
+        'ratings_count': 'rating__ratings_count',
+    }
+
+
+class ProductBatchSerializer(CatalogItemSerializer):
+    field_names = CatalogItemSerializer.field_names + ('category_name',)
+    sources = {**CatalogItemSerializer.sources, 'category_name': 'category__name'}
+
+
+class RelatedProductReadSerializer(ValuesSerializer):
+    model = RelatedProduct
+    field_names = ('sku', 'name', 'price', 'score')
+    sources = {'sku': 'related__sku', 'name': 'related__name', 'price': 'related__price'}
+    computed = {'score': (('score',), lambda row: round(row['score'], 4))}
+
+
+class TopProductSerializer(ValuesSerializer):
+    model = Product
+    field_names = ('id', 'sku', 'name', 'price', 'category', 'score', 'average_rating', 'ratings_count')
+    sources = {'average_rating': 'rating__average_rating', 'ratings_count': 'rating__ratings_count'}
+    computed = {'score': (('rating_score',), lambda row: round(row['rating_score'], 4))}
+
+
+def _average_rating(row):
+    if not row['rated_products']:
+        return None
+    return '{:f}'.format((Decimal(row['rating_total']) / row['rated_products']).quantize(Decimal('0.01')))
+
+
+class SupplierRollupSerializer(ValuesSerializer):
+    model = SupplierRollup
+    field_names = ('supplier', 'product_count', 'units_in_stock', 'stock_value', 'average_rating')
+    computed = {'average_rating': (('rating_total', 'rated_products'), _average_rating)}
+
+
+class CategoryRollupSerializer(ValuesSerializer):
+    model = CategoryRollup
+    field_names = ('category', 'product_count', 'units_in_stock', 'stock_value', 'average_rating')
+    computed = {'average_rating': (('rating_total', 'rated_products'), _average_rating)}
+
+
+class ChangeLogSerializer(ValuesSerializer):
+    model = ChangeLog
+    field_names = ('id', 'kind', 'product_id', 'sku', 'deleted', 'data', 'created_at')
+
+
+class JobSerializer(ValuesSerializer):
+    model = Job
+    field_names = (
+        'id', 'task', 'status', 'priority', 'attempts', 'max_attempts', 'progress', 'progress_total',
+        'result', 'last_error', 'created_at', 'started_at', 'finished_at', 'duration',
+    )
+
+
+class RepriceSerializer(serializers.Serializer):
+    category = serializers.CharField(required=False)
+    supplier = serializers.IntegerField(required=False)
+    skus = serializers.ListField(child=serializers.CharField(), required=False, allow_empty=False, max_length=settings.REPRICE_MAX_SKUS)
+    operation = serializers.ChoiceField(choices=OPERATIONS)
+    value = serializers.DecimalField(max_digits=12, decimal_places=4)
+    rounding = serializers.ChoiceField(choices=ROUNDINGS, default='cents')
+
+    def validate(self, data):
+        selectors = [name for name in ('category', 'supplier', 'skus') if name in data]
+        if len(selectors) != 1:
+            raise serializers.ValidationError("Informe exatamente um seletor: category, supplier ou skus.")
+        if data['operation'] == 'set' and data['value'] < 0:
+            raise serializers.ValidationError("O preço não pode ser negativo.")
+        if data['operation'] == 'percent' and data['value'] <= -100:
+            raise serializers.ValidationError("O percentual deve ser maior que -100.")
+        return data
@@ -1,7 +1,10 @@
 from django.db.models import Avg
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import Product, ProductStock, PriceHistory, Review, ProductRating
+from django.db import transaction
+from .models import Product, ProductStock, PriceHistory, Review, ProductRating, Category
+from .versioning import bump_version_on_commit
+from . import changes, ranking, reordering, rollups, streaming, typeahead
 
 @receiver(post_save, sender=Product)
 def create_product_stock(sender, instance, created, **kwargs):
@@ -22,7 +25,11 @@ def update_product_rating(sender, instance, **kwargs):
     )
 
 @receiver(post_delete, sender=Review)
-def update_product_rating_on_delete(sender, instance, **kwargs):
+def update_product_rating_on_delete(sender, instance, origin=None, **kwargs):
+    # Reviews removed because their product is being deleted must not
+    # recreate the product's rating row.
+    if getattr(origin, 'model', type(origin)) is Product:
+        return
     product = instance.product
     reviews = Review.objects.filter(product=product)
     average_rating = reviews.aggregate(Avg('rating'))['rating__avg']
@@ -31,4 +38,154 @@ def update_product_rating_on_delete(sender, instance, **kwargs):
     ProductRating.objects.update_or_create(
         product=product,
         defaults={'average_rating': average_rating or 0.00, 'ratings_count': ratings_count}
-    )
\ No newline at end of file
+    )
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductStock)
+@receiver([post_save, post_delete], sender=ProductRating)
+def bump_catalog_version(sender, **kwargs):
+    bump_version_on_commit('catalog')
+
+@receiver([post_save, post_delete], sender=Category)
+def bump_category_version(sender, **kwargs):
+    bump_version_on_commit('category')
+
+#Rollups
+@receiver(post_init, sender=Product)
+def track_product_rollup(sender, instance, **kwargs):
+    rollups.track_product(instance)
+
+@receiver(pre_save, sender=Product)
+def load_product_rollup_state(sender, instance, **kwargs):
+    rollups.product_pre_save(instance)
+
+@receiver(post_save, sender=Product)
+def update_rollups_on_product_save(sender, instance, created, **kwargs):
+    rollups.product_saved(instance, created)
+
+@receiver(post_delete, sender=Product)
+def update_rollups_on_product_delete(sender, instance, **kwargs):
+    # A soft-deleted product (hard-deleted from the admin) was already subtracted by soft_delete.
+    if instance.deleted_at is None:
+        rollups.product_deleted(instance)
+
+@receiver(post_init, sender=ProductStock)
+def track_stock_rollup(sender, instance, **kwargs):
+    rollups.track_stock(instance)
+
+@receiver(post_save, sender=ProductStock)
+def update_rollups_on_stock_save(sender, instance, created, **kwargs):
+    old_quantity = 0 if created else instance._rollup_quantity
+    rollups.stock_changed(instance, old_quantity, instance.quantity)
+    rollups.track_stock(instance)
+
+@receiver(post_delete, sender=ProductStock)
+def update_rollups_on_stock_delete(sender, instance, **kwargs):
+    rollups.stock_changed(instance, instance.quantity, 0)
+
+@receiver(post_init, sender=ProductRating)
+def track_rating_rollup(sender, instance, **kwargs):
+    rollups.track_rating(instance)
+
+@receiver(post_save, sender=ProductRating)
+def update_rollups_on_rating_save(sender, instance, created, **kwargs):
+    old = (0, 0) if created else instance._rollup_rating
+    rollups.rating_changed(instance, old, (instance.average_rating, instance.ratings_count))
+    rollups.track_rating(instance)
+
+@receiver(post_delete, sender=ProductRating)
+def update_rollups_on_rating_delete(sender, instance, **kwargs):
+    rollups.rating_changed(instance, (instance.average_rating, instance.ratings_count), (0, 0))
+
+@receiver(post_init, sender=Category)
+def track_category_parent(sender, instance, **kwargs):
+    instance._rollup_parent_id = instance.__dict__.get('parent_id')
+
+@receiver(post_save, sender=Category)
+def rebuild_rollups_on_category_move(sender, instance, created, **kwargs):
+    if not created and instance.parent_id != instance._rollup_parent_id:
+        rollups.rebuild_category_rollups()
+    instance._rollup_parent_id = instance.parent_id
+
+@receiver(post_delete, sender=Category)
+def rebuild_rollups_on_category_delete(sender, instance, **kwargs):
+    rollups.rebuild_category_rollups()
+
+#Ranking
+@receiver(post_save, sender=ProductRating)
+def update_rating_score(sender, instance, **kwargs):
+    ranking.rating_saved(instance)
+
+@receiver(post_delete, sender=ProductRating)
+def clear_rating_score(sender, instance, **kwargs):
+    ranking.rating_deleted(instance)
+
+#Reordering
+@receiver(post_init, sender=ProductStock)
+def track_stock_reorder_threshold(sender, instance, **kwargs):
+    reordering.track_stock(instance)
+
+@receiver(pre_save, sender=ProductStock)
+def set_stock_reorder_level(sender, instance, **kwargs):
+    reordering.stock_pre_save(instance)
+
+@receiver(post_init, sender=Product)
+def track_product_reorder_category(sender, instance, **kwargs):
+    reordering.track_product(instance)
+
+@receiver(post_save, sender=Product)
+def update_reorder_level_on_product_move(sender, instance, created, **kwargs):
+    reordering.product_saved(instance, created)
+
+@receiver(post_init, sender=Category)
+def track_category_reorder_level(sender, instance, **kwargs):
+    reordering.track_category(instance)
+
+@receiver(post_save, sender=Category)
+def update_reorder_levels_on_category_save(sender, instance, created, **kwargs):
+    reordering.category_saved(instance, created)
+
+@receiver(post_delete, sender=Category)
+def update_reorder_levels_on_category_delete(sender, instance, **kwargs):
+    reordering.category_deleted(instance)
+
+#Typeahead
+@receiver(post_save, sender=Product)
+def update_typeahead_on_product_save(sender, instance, **kwargs):
+    typeahead.product_saved(instance)
+
+@receiver(post_delete, sender=Product)
+def update_typeahead_on_product_delete(sender, instance, **kwargs):
+    typeahead.product_removed(instance.pk)
+
+#Change feed
+@receiver(post_init, sender=Product)
+def track_product_feed(sender, instance, **kwargs):
+    changes.track_product(instance)
+
+@receiver(post_save, sender=Product)
+def record_product_change(sender, instance, created, **kwargs):
+    changes.product_saved(instance, created)
+
+@receiver(post_delete, sender=Product)
+def record_product_delete(sender, instance, **kwargs):
+    if instance.deleted_at is None:
+        changes.product_deleted(instance)
+
+@receiver(post_init, sender=ProductStock)
+def track_stock_feed(sender, instance, **kwargs):
+    changes.track_stock(instance)
+
+@receiver(post_save, sender=ProductStock)
+def record_stock_change(sender, instance, created, **kwargs):
+    changes.stock_saved(instance, created)
+
+@receiver(post_save, sender=ProductRating)
+def record_rating_change(sender, instance, **kwargs):
+    changes.rating_saved(instance)
+
+#Stock streaming
+@receiver(post_save, sender=ProductStock)
+def publish_stock_change(sender, instance, **kwargs):
+    sku, quantity = instance.product.sku, instance.quantity
+    transaction.on_commit(lambda: streaming.publish_stock(sku, quantity))
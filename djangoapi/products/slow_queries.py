@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+import sqlparse
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from sqlparse import tokens
+
+from .models import SlowQuery
+
+logger = logging.getLogger('api_requests_logger')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Strip literals and collapse IN lists so equivalent queries share a fingerprint."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:16]
+
+
+class ExplainRateLimiter:
+    """
+    Allows at most SLOW_QUERY_EXPLAINS_PER_MINUTE plans per process and one
+    plan per fingerprint every SLOW_QUERY_FINGERPRINT_INTERVAL seconds.
+    """
+    def __init__(self, max_fingerprints=1000):
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.fingerprints = OrderedDict()
+        self.max_fingerprints = max_fingerprints
+
+    def allow(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            while self.recent and now - self.recent[0] > 60:
+                self.recent.popleft()
+            if len(self.recent) >= settings.SLOW_QUERY_EXPLAINS_PER_MINUTE:
+                return False
+            last = self.fingerprints.get(key)
+            if last is not None and now - last < settings.SLOW_QUERY_FINGERPRINT_INTERVAL:
+                return False
+
+            self.recent.append(now)
+            self.fingerprints.pop(key, None)
+            self.fingerprints[key] = now
+            if len(self.fingerprints) > self.max_fingerprints:
+                self.fingerprints.popitem(last=False)
+            return True
+
+
+rate_limiter = ExplainRateLimiter()
+
+
+def is_read_only(sql):
+    """
+    True for a plain SELECT: no data-modifying CTE (WITH ... UPDATE/DELETE/
+    INSERT) and no FOR UPDATE/SHARE row locks.
+    """
+    statement = sqlparse.parse(sql)[0]
+    if statement.get_type() != 'SELECT':
+        return False
+    for token in statement.flatten():
+        if token.ttype in tokens.Keyword.DML and token.normalized != 'SELECT':
+            return False
+        if token.ttype in tokens.Keyword and token.normalized == 'SHARE':
+            return False
+    return True
+
+
+def explain(alias, sql, params):
+    connection = connections[alias]
+    vendor = connection.vendor
+
+    if vendor == 'postgresql':
+        # ANALYZE executes the statement again, so only for plain reads.
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if is_read_only(sql) else 'EXPLAIN '
+    elif vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+
+    try:
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            plan = '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+            # Whatever the statement did while being explained is never kept.
+            transaction.set_rollback(True, using=alias)
+        return plan
+    except DatabaseError as exc:
+        return f'EXPLAIN falhou: {exc}'
+
+
+def capture(slow_queries, view):
+    seen = set()
+    for query in slow_queries:
+        normalized = normalize_sql(query['sql'])
+        key = fingerprint(normalized)
+        logger.warning(f"Slow query {key} {query['duration'] * 1000:.0f}ms em {view}: {normalized[:500]}")
+        if key in seen or not rate_limiter.allow(key):
+            continue
+        seen.add(key)
+
+        SlowQuery.objects.create(
+            fingerprint=key,
+            normalized_sql=normalized,
+            sql=query['sql'],
+            duration_ms=query['duration'] * 1000,
+            plan=explain(query['alias'], query['sql'], query['params']),
+            view=view,
+            database=query['alias'],
+        )
@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import os
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+
+from .models import Product
+from .serializers import CatalogItemSerializer
+from .versioning import read_version
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+VARIANTS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+ENCODINGS = {
+    'br': '.br',
+    'gzip': '.gz',
+    'identity': '',
+}
+
+
+def snapshot_dir():
+    return Path(settings.CATALOG_SNAPSHOT_DIR)
+
+
+def read_manifest():
+    try:
+        return orjson.loads((snapshot_dir() / MANIFEST_NAME).read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return None
+
+
+def _write_atomic(path, content):
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+def _encode(content):
+    encoded = {
+        'identity': content,
+        'gzip': gzip.compress(content, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        encoded['br'] = brotli.compress(content, quality=11)
+    return encoded
+
+
+def build_catalog():
+    return CatalogItemSerializer().serialize(Product.objects.order_by('id'))
+
+
+def publish_catalog_snapshot(force=False):
+    """
+    Write the catalog as precompressed JSON/NDJSON files named after their
+    content hash and point manifest.json at them.
+
+    Returns ``(manifest, published)``; nothing is rebuilt when the catalog
+    version matches the published manifest, and nothing is rewritten when
+    the rebuilt content hashes to the files already on disk. The version is
+    read from the database rather than this process's copy, so publishers
+    running in other processes agree on it.
+    """
+    directory = snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    version = read_version('catalog')
+    manifest = read_manifest()
+    if not force and manifest and manifest['version'] == version:
+        return manifest, False
+
+    items = build_catalog()
+    contents = {
+        'json': orjson.dumps(items),
+        'ndjson': b''.join(orjson.dumps(item) + b'\n' for item in items),
+    }
+    digest = hashlib.sha256(contents['json']).hexdigest()[:16]
+
+    if not force and manifest and manifest['hash'] == digest:
+        manifest['version'] = version
+        _write_atomic(directory / MANIFEST_NAME, orjson.dumps(manifest))
+        return manifest, False
+
+    files = {}
+    for variant, content in contents.items():
+        files[variant] = {}
+        for encoding, payload in _encode(content).items():
+            name = f'catalog-{digest}.{variant}{ENCODINGS[encoding]}'
+            _write_atomic(directory / name, payload)
+            files[variant][encoding] = {'name': name, 'size': len(payload)}
+
+    previous = manifest
+    manifest = {'version': version, 'hash': digest, 'count': len(items), 'files': files}
+    _write_atomic(directory / MANIFEST_NAME, orjson.dumps(manifest))
+
+    # Keep the previous generation around for downloads still in flight.
+    keep = {MANIFEST_NAME, *_file_names(manifest), *_file_names(previous)}
+    for path in directory.glob('catalog-*'):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+
+    return manifest, True
+
+
+def _file_names(manifest):
+    if not manifest:
+        return []
+    return [entry['name'] for encodings in manifest['files'].values() for entry in encodings.values()]
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import changes
+
+
+class Subscription:
+    """One SSE client. Keeps only the latest quantity per SKU, so a slow client never queues up."""
+    def __init__(self, broker, skus, loop):
+        self.broker = broker
+        self.skus = frozenset(skus)
+        self.loop = loop
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, sku, quantity):
+        # Runs on the subscriber's event loop.
+        self.pending[sku] = quantity
+        self.ready.set()
+
+    async def next(self, timeout):
+        """Wait up to ``timeout`` seconds for changes; returns {sku: quantity}, empty on timeout."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self.ready.clear()
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class StockBroker:
+    """
+    Fans stock changes out to every subscriber of this process. Changes reach
+    the broker through one channel per process (STOCK_STREAM_CHANNEL), so the
+    cost of following other workers' saves does not grow with the number of
+    subscribers.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.channel = None
+
+    def get_channel(self):
+        if self.channel is None:
+            self.channel = import_string(settings.STOCK_STREAM_CHANNEL)()
+        return self.channel
+
+    def subscribe(self, skus):
+        subscription = Subscription(self, skus, asyncio.get_running_loop())
+        with self.lock:
+            for sku in subscription.skus:
+                self.subscribers.setdefault(sku, set()).add(subscription)
+        self.get_channel().start(self)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for sku in subscription.skus:
+                subscribers = self.subscribers.get(sku)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscribers[sku]
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def publish(self, sku, quantity):
+        """Thread-safe; called by the channel."""
+        with self.lock:
+            targets = list(self.subscribers.get(sku, ()))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, sku, quantity)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+
+class LocalChannel:
+    """Delivers the saves made by this process only (single-process deployments)."""
+    def __init__(self):
+        self.broker = None
+
+    def start(self, broker):
+        self.broker = broker
+
+    def publish(self, sku, quantity):
+        if self.broker is not None:
+            self.broker.publish(sku, quantity)
+
+
+class ChangeFeedChannel:
+    """
+    Follows the stock entries of the change log (products.changes), so every
+    process sees every save. One polling task per process runs while there
+    are subscribers.
+    """
+    def __init__(self):
+        self.task = None
+        self.last_id = None
+
+    def start(self, broker):
+        if self.task is not None and not self.task.done() and not self.task.get_loop().is_closed():
+            return
+        self.last_id = None
+        self.task = asyncio.get_running_loop().create_task(self.run(broker))
+
+    def publish(self, sku, quantity):
+        # The change log entry is written with the save itself.
+        pass
+
+    async def run(self, broker):
+        while broker.has_subscribers():
+            await self.poll(broker)
+            await asyncio.sleep(settings.STOCK_STREAM_POLL_INTERVAL)
+
+    async def poll(self, broker):
+        if self.last_id is None:
+            self.last_id = await sync_to_async(changes.head)()
+            return
+        entries = changes.visible().filter(kind='stock', id__gt=self.last_id).order_by('id').values_list('id', 'sku', 'data')
+        async for entry_id, sku, data in entries[:1000]:
+            broker.publish(sku, data['quantity'])
+            self.last_id = entry_id
+
+
+broker = StockBroker()
+
+
+def publish_stock(sku, quantity):
+    broker.get_channel().publish(sku, quantity)
@@ -0,0 +1,49 @@
+"""
+Maintenance tasks that can run as background jobs (see products/jobs.py),
+e.g. ``enqueue('reconcile_rollups', dedupe_key='reconcile_rollups')``.
+Heavy imports stay inside the tasks so loading this module at startup costs
+nothing.
+"""
+from .jobs import task
+from .versioning import bump_version
+
+
+@task('reconcile_rollups')
+def reconcile_rollups(progress):
+    from .rollups import reconcile_rollups
+    return {'corrected': reconcile_rollups()}
+
+
+@task('rebuild_ranking_scores')
+def rebuild_ranking_scores(progress):
+    from .ranking import rebuild_scores
+    updated = rebuild_scores()
+    bump_version('catalog')
+    return {'updated': updated}
+
+
+@task('build_related_products')
+def build_related_products(progress, top=None, memory_mb=None):
+    from .recommendations import build_related_products
+    return {'written': build_related_products(top, memory_mb)}
+
+
+@task('publish_catalog_snapshot')
+def publish_catalog_snapshot(progress, force=False):
+    from .snapshots import publish_catalog_snapshot
+    manifest, published = publish_catalog_snapshot(force=force)
+    return {'hash': manifest['hash'], 'count': manifest['count'], 'published': published}
+
+
+@task('purge_deleted_products')
+def purge_deleted_products(progress, batch_size=None):
+    from .deletion import purge_deleted
+    products, rows = purge_deleted(batch_size, progress=progress)
+    return {'products': products, 'rows': rows}
+
+
+@task('emit_reorder_batches')
+def emit_reorder_batches(progress):
+    from .reordering import emit_batches
+    from .serializers import LowStockSerializer
+    return {'batches': len(emit_batches(LowStockSerializer()))}
@@ -0,0 +1,48 @@
+from django.db.models import F
+from django.test import TestCase, override_settings
+from products.category_cache import CategoryCache
+from products.models import CacheVersion, Category
+
+
+class CategoryCacheTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.root = Category.objects.create(name='Tecnologia')
+            self.child = Category.objects.create(name='Eletronicos', parent=self.root)
+            self.grandchild = Category.objects.create(name='Celulares', parent=self.child)
+        self.cache = CategoryCache()
+
+    def test_loads_once_and_resolves_names(self):
+        with self.assertNumQueries(1):
+            self.cache.refresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get_id('TECNOLOGIA'), self.root.pk)
+            self.assertEqual(self.cache.get_parent_id(self.child.pk), self.root.pk)
+        # An unknown name is checked in the database before it is reported missing.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cache.resolve(['eletronicos', 'inexistente']), {'eletronicos': self.child.pk, 'inexistente': None})
+
+    def test_unknown_name_found_in_database(self):
+        self.cache.refresh()
+        # Created by another worker whose version bump has not been seen yet.
+        livros = Category.objects.bulk_create([Category(name='livros')])[0]
+        self.assertEqual(self.cache.get_id('livros'), livros.pk)
+
+    def test_hierarchy(self):
+        self.assertEqual(self.cache.ancestors(self.grandchild.pk), [self.child.pk, self.root.pk])
+        self.assertEqual(self.cache.descendants(self.root.pk), [self.root.pk, self.child.pk, self.grandchild.pk])
+
+    def test_invalidated_on_save_and_delete(self):
+        self.assertIsNone(self.cache.get_id('livros'))
+        livros = Category.objects.create(name='Livros')
+        self.assertEqual(self.cache.get_id('livros'), livros.pk)
+        livros.delete()
+        self.assertIsNone(self.cache.get_id('livros'))
+
+    @override_settings(VERSION_CHECK_INTERVAL=0)
+    def test_invalidated_by_other_workers(self):
+        self.assertIsNone(self.cache.get_id('livros'))
+        # Another worker's change: the row and the shared counter, without this process's signals.
+        livros = Category.objects.bulk_create([Category(name='livros')])[0]
+        CacheVersion.objects.filter(pk='category').update(version=F('version') + 1)
+        self.assertEqual(self.cache.get_id('livros'), livros.pk)
@@ -0,0 +1,109 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from products import changes
+from products.models import ChangeLog, Product, ProductStock, Review, Supplier
+
+
+class ChangeFeedTest(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.product = Product.objects.create(name='Produto', description='Produto', price='10.00', sku='PROD1', supplier=self.supplier)
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+    def feed(self, **params):
+        return self.client.get(reverse('change-feed'), params)
+
+    def test_records_product_price_stock_and_rating_changes(self):
+        start = self.feed().json()['next']
+
+        product = Product.objects.get(pk=self.product.pk)
+        product.price = '12.00'
+        product.save()
+        stock = ProductStock.objects.get(product=product)
+        stock.quantity = 4
+        stock.save()
+        stock.save()
+        Review.objects.create(product=product, user=self.user, rating=4, comment='Bom')
+        product.delete()
+
+        response = self.feed(since=start)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(
+            [(row['kind'], row['sku'], row['deleted']) for row in body['results']],
+            [('product', 'PROD1', False), ('price', 'PROD1', False), ('stock', 'PROD1', False),
+             ('rating', 'PROD1', False), ('product', 'PROD1', True)],
+        )
+        self.assertEqual(body['results'][1]['data'], {'old_price': '10.00', 'new_price': '12.00'})
+        self.assertEqual(body['results'][2]['data'], {'quantity': 4})
+        self.assertEqual(body['next'], str(body['results'][-1]['id']))
+        self.assertFalse(body['has_more'])
+        self.assertEqual(self.feed(since=body['next']).json()['results'], [])
+
+    def test_pages_with_continuation_token(self):
+        for quantity in range(1, 6):
+            stock = ProductStock.objects.get(product=self.product)
+            stock.quantity = quantity
+            stock.save()
+
+        token, quantities = '0', []
+        while True:
+            body = self.feed(since=token, limit=2).json()
+            quantities += [row['data'].get('quantity') for row in body['results'] if row['kind'] == 'stock']
+            token = body['next']
+            if not body['has_more']:
+                break
+        self.assertEqual(quantities, [0, 1, 2, 3, 4, 5])
+
+    def test_purged_token_and_validation(self):
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(days=30))
+        stock = ProductStock.objects.get(product=self.product)
+        stock.quantity = 1
+        stock.save()
+        out = StringIO()
+        call_command('purge_change_log', stdout=out)
+        self.assertIn('2 entrada(s)', out.getvalue())
+
+        self.assertEqual(self.feed(since=0).status_code, status.HTTP_410_GONE)
+        self.assertEqual(self.feed(since=self.feed().json()['next']).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.feed(since='abc').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.feed(since=0, limit=0).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+    def test_id_gaps_are_not_expired(self):
+        # A rolled back insert leaves a hole in the ids, not a purge.
+        ChangeLog.objects.filter(pk=ChangeLog.objects.order_by('id').first().pk).delete()
+        response = self.feed(since=0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), ChangeLog.objects.count())
+
+
+class FeedLockTest(TransactionTestCase):
+    def test_writers_take_the_feed_lock_on_postgresql(self):
+        default, cursor = connections['default'], mock.MagicMock()
+        with mock.patch.object(default, 'cursor', return_value=cursor):
+            changes.lock_feed('default')
+            if default.vendor != 'postgresql':
+                cursor.assert_not_called()
+            with mock.patch.object(default, 'vendor', 'postgresql'):
+                changes.lock_feed('default')
+        cursor.__enter__.return_value.execute.assert_called_once_with('SELECT pg_advisory_xact_lock(%s)', [changes.FEED_LOCK_ID])
+
+    def test_lock_held_until_the_entry_commits(self):
+        # Outside a transaction, record() opens one so the lock covers the insert.
+        with mock.patch('products.changes.lock_feed', side_effect=lambda using: self.assertTrue(connection.in_atomic_block)) as lock_feed:
+            entry = changes.record('product', 1, 'PROD1')
+        lock_feed.assert_called_once_with('default')
+        self.assertTrue(ChangeLog.objects.filter(pk=entry.pk).exists())
+        self.assertFalse(connection.in_atomic_block)
@@ -0,0 +1,123 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from products.deletion import purge_deleted, purge_product, soft_delete
+from products.jobs import TASKS
+from products.models import ChangeLog, PriceHistory, Product, ProductRating, ProductStock, RelatedProduct, Review, Supplier, SupplierRollup
+from products.rollups import reconcile_rollups
+
+
+class SoftDeleteTest(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.product = self.create_product('PROD1', history=20)
+
+    def create_product(self, sku, history=0):
+        product = Product.objects.create(name=sku, description=sku, price='10.00', sku=sku, supplier=self.supplier)
+        PriceHistory.objects.bulk_create([
+            PriceHistory(product=product, old_price='1.00', new_price='2.00', user=self.user) for _ in range(history)
+        ])
+        Review.objects.bulk_create([Review(product=product, user=self.user, rating=4) for _ in range(history)])
+        if history:
+            ProductRating.objects.create(product=product, average_rating='4.00', ratings_count=history)
+        return product
+
+    def delete(self, sku):
+        return self.client.delete(reverse('product-delete', kwargs={'sku': sku}))
+
+    def test_hidden_from_read_paths(self):
+        self.assertEqual(self.delete('PROD1').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(reverse('product-list')).json(), [])
+        self.assertEqual(self.client.get(reverse('product-detail', kwargs={'sku': 'PROD1'})).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('product-batch'), {'skus': 'PROD1'}).json()['missing'], ['PROD1'])
+        self.assertEqual(self.client.get(reverse('stock-list')).json(), [])
+        self.assertEqual(self.client.get(reverse('product-rating-detail', kwargs={'sku': 'PROD1'})).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(reverse('review-create'), {'product_sku': 'PROD1', 'rating': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.delete('PROD1').status_code, status.HTTP_404_NOT_FOUND)
+
+        # History stays until the purger runs.
+        self.assertEqual(PriceHistory.objects.count(), 20)
+        self.assertTrue(ChangeLog.objects.filter(kind='product', sku='PROD1', deleted=True).exists())
+
+    def test_latency_does_not_depend_on_history(self):
+        self.create_product('PROD2')
+        with CaptureQueriesContext(connection) as long_history:
+            self.delete('PROD1')
+        with CaptureQueriesContext(connection) as no_history:
+            self.delete('PROD2')
+        self.assertEqual(len(long_history), len(no_history))
+
+    def test_rollups_stay_consistent(self):
+        stock = ProductStock.objects.get(product=self.product)
+        stock.quantity = 0
+        stock.save()
+        self.delete('PROD1')
+        self.assertEqual(SupplierRollup.objects.get(pk=self.supplier.pk).product_count, 0)
+        self.assertEqual(reconcile_rollups(), 0)
+        purge_product(self.product.pk)
+        self.assertEqual(reconcile_rollups(), 0)
+
+    def test_losing_delete_leaves_rollups_alone(self):
+        self.assertTrue(soft_delete(self.product))
+        with mock.patch('products.rollups.product_removed') as product_removed:
+            self.assertFalse(soft_delete(self.product))
+        product_removed.assert_not_called()
+        self.assertEqual(SupplierRollup.objects.get(pk=self.supplier.pk).product_count, 0)
+        self.assertEqual(reconcile_rollups(), 0)
+
+    def test_hard_delete_of_soft_deleted_product(self):
+        # What the admin does with a product from the "deleted" filter.
+        self.delete('PROD1')
+        Product.all_objects.get(pk=self.product.pk).delete()
+        self.assertEqual(SupplierRollup.objects.get(pk=self.supplier.pk).product_count, 0)
+        self.assertEqual(reconcile_rollups(), 0)
+        self.assertEqual(ChangeLog.objects.filter(sku='PROD1', deleted=True).count(), 1)
+
+    def test_purge_in_batches(self):
+        self.delete('PROD1')
+        with CaptureQueriesContext(connection) as queries:
+            deleted = purge_product(self.product.pk, batch_size=7)
+        self.assertEqual(deleted, 41)
+        statements = [query['sql'] for query in queries if query['sql'].startswith('DELETE')]
+        # History and reviews take three batches; rating and the two related-product columns one each.
+        self.assertEqual(len(statements), 2 * 3 + 2 + 2 + 1)
+        self.assertFalse(PriceHistory.objects.exists())
+        self.assertFalse(Review.objects.exists())
+        self.assertFalse(ProductRating.objects.exists())
+        self.assertFalse(Product.all_objects.exists())
+
+    def test_purge_removes_related_products(self):
+        other = self.create_product('PROD2')
+        RelatedProduct.objects.create(product=self.product, related=other, rank=0, score=0.5)
+        RelatedProduct.objects.create(product=other, related=self.product, rank=0, score=0.5)
+        self.delete('PROD1')
+        self.assertEqual(purge_deleted(), (1, 43))
+        self.assertFalse(RelatedProduct.objects.exists())
+        connection.check_constraints()
+
+    def test_purge_job_reports_progress(self):
+        self.create_product('PROD2')
+        self.delete('PROD1')
+        self.delete('PROD2')
+        progress = mock.Mock()
+        self.assertEqual(TASKS['purge_deleted_products'](progress), {'products': 2, 'rows': 42})
+        self.assertEqual(progress.call_args_list, [mock.call(1, 2), mock.call(2, 2)])
+
+    def test_sku_is_reserved_until_purged(self):
+        self.delete('PROD1')
+        data = {'name': 'Novo', 'description': 'Novo', 'price': '5.00', 'sku': 'PROD1', 'supplier': self.supplier.pk, 'category_name': ''}
+        self.assertEqual(self.client.post(reverse('product-create'), data, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        out = StringIO()
+        call_command('purge_deleted_products', stdout=out)
+        self.assertIn('1 produto(s)', out.getvalue())
+        self.assertEqual(self.client.post(reverse('product-create'), data, format='json').status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from products.management.commands.import_time_report import parse_importtime
+
+
+class OpenAPISchemaTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = override_settings(OPENAPI_SCHEMA_DIR=directory.name)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def test_prebuilt_schema_is_served_as_file(self):
+        out = StringIO()
+        call_command('build_openapi_schema', stdout=out)
+        self.assertIn('swagger.json', out.getvalue())
+
+        response = self.client.get(reverse('schema-json', kwargs={'format': '.json'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        schema = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(schema['info']['title'], 'Ecommerce API')
+        self.assertIn('/category/list/', schema['paths'])
+
+        response = self.client.get(reverse('schema-json', kwargs={'format': '.yaml'}))
+        self.assertEqual(response['Content-Type'], 'application/yaml')
+
+    def test_falls_back_to_live_schema(self):
+        response = self.client.get(reverse('schema-json', kwargs={'format': '.json'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['info']['title'], 'Ecommerce API')
+
+    def test_ui_pages_load_the_prebuilt_spec(self):
+        for name in ('schema-swagger-ui', 'schema-redoc'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, '/swagger.json')
+
+
+class ImportTimeTest(TestCase):
+    def test_parse_importtime(self):
+        output = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:       120 |        120 |     django.utils',
+            'import time:       300 |        420 |   django',
+            'import time:        50 |         50 | products.models',
+        ])
+        self.assertEqual(parse_importtime(output), {'django': 420, 'products': 50})
+
+    def test_doc_tooling_is_not_imported_at_startup(self):
+        code = (
+            'import sys, django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns; '
+            'print("drf_yasg" in sys.modules)'
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'ecommerce_api.settings'}
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
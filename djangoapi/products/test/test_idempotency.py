@@ -0,0 +1,100 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from products.models import Category, IdempotencyKey, PriceHistory, Product, Review, Supplier
+
+
+class IdempotencyTest(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        Category.objects.create(name='categoria teste')
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.data = {
+            'name': 'Produto Teste', 'description': 'Descrição', 'price': '37.99',
+            'sku': 'TESTE01', 'category_name': 'categoria teste', 'supplier': self.supplier.pk,
+        }
+
+    def create(self, data=None, key='chave-1'):
+        return self.client.post(reverse('product-create'), data or self.data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response(self):
+        first = self.create()
+        second = self.create()
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual(PriceHistory.objects.count(), 1)
+
+    def test_client_errors_are_replayed(self):
+        first = self.create({**self.data, 'category_name': 'inexistente'})
+        self.assertEqual(first.status_code, status.HTTP_404_NOT_FOUND)
+        second = self.create({**self.data, 'category_name': 'inexistente'})
+        self.assertEqual(second.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+
+    def test_key_reused_with_other_payload(self):
+        self.create()
+        response = self.create({**self.data, 'sku': 'OUTRO'})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        self.create()
+        other = User.objects.create_user(username='outro', password='testpassword')
+        self.client.force_authenticate(user=other)
+        response = self.create({**self.data, 'sku': 'OUTRO'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Product.objects.count(), 2)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0.1)
+    def test_duplicate_waits_for_in_flight_request(self):
+        self.create()
+        IdempotencyKey.objects.update(status_code=None, response=None)
+        response = self.create()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_abandoned_and_expired_keys_run_again(self):
+        self.create()
+        Product.objects.all().delete()
+        IdempotencyKey.objects.update(status_code=None, created_at=timezone.now() - timedelta(hours=1))
+        self.assertFalse(self.create().has_header('Idempotent-Replayed'))
+        self.assertEqual(Product.objects.count(), 1)
+
+        Product.objects.all().delete()
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertFalse(self.create().has_header('Idempotent-Replayed'))
+        self.assertEqual(Product.objects.count(), 1)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('1 chave(s)', out.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_review_and_stock_update(self):
+        product = Product.objects.create(name='P', description='P', price='10.00', sku='PROD1', supplier=self.supplier)
+        for _ in range(2):
+            response = self.client.post(reverse('review-create'), {'product_sku': 'PROD1', 'rating': 5, 'comment': 'Bom'}, format='json', HTTP_IDEMPOTENCY_KEY='review-1')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Review.objects.filter(product=product).count(), 1)
+
+        for _ in range(2):
+            response = self.client.patch(reverse('stock-update', kwargs={'sku': 'PROD1'}), {'quantity': 7}, format='json', HTTP_IDEMPOTENCY_KEY='stock-1')
+            self.assertEqual(response.json()['quantity'], 7)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+    def test_without_header(self):
+        self.client.post(reverse('product-create'), self.data, format='json')
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -0,0 +1,137 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from products.jobs import Worker, enqueue, requeue, task
+from products.models import Job, Product, Supplier, SupplierRollup
+
+calls = []
+
+
+@task('test.record')
+def record(progress, value=None):
+    calls.append(value)
+    return {'value': value}
+
+
+@task('test.steps')
+def steps(progress, total):
+    for done in range(1, total + 1):
+        progress(done, total)
+    return {'steps': total}
+
+
+@task('test.sleep')
+def sleep(progress, seconds):
+    time.sleep(seconds)
+
+
+@task('test.fail')
+def fail(progress):
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_BACKOFF_BASE=2, JOBS_MAX_ATTEMPTS=3)
+class JobTest(APITestCase):
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(name='test-worker')
+
+    def test_priority_then_age(self):
+        enqueue('test.record', {'value': 'low'})
+        enqueue('test.record', {'value': 'high'}, priority=5)
+        enqueue('test.record', {'value': 'later'}, run_at=timezone.now() + timedelta(hours=1))
+        enqueue('test.record', {'value': 'low2'})
+        self.assertEqual(self.worker.run(), 3)
+        self.assertEqual(calls, ['high', 'low', 'low2'])
+
+    def test_result_progress_and_timing(self):
+        job = enqueue('test.steps', {'total': 4})
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.worker), (Job.DONE, 1, 'test-worker'))
+        self.assertEqual((job.progress, job.progress_total, job.result), (4, 4, {'steps': 4}))
+        self.assertLessEqual(job.created_at, job.started_at)
+        self.assertLessEqual(job.started_at, job.finished_at)
+        self.assertIsNotNone(job.duration)
+
+        user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('job-detail', kwargs={'pk': job.pk}))
+        self.assertEqual(response.json()['status'], 'done')
+        self.assertEqual(response.json()['progress'], 4)
+        self.assertEqual(self.client.get(reverse('job-detail', kwargs={'pk': job.pk + 1})).status_code, 404)
+
+    def test_deduplication(self):
+        first = enqueue('test.record', {'value': 1}, dedupe_key='record')
+        self.assertEqual(enqueue('test.record', {'value': 2}, dedupe_key='record').pk, first.pk)
+        self.worker.run()
+        self.assertEqual(calls, [1])
+        # Once finished, the key is free again.
+        self.assertNotEqual(enqueue('test.record', {'value': 3}, dedupe_key='record').pk, first.pk)
+
+    def test_retry_with_backoff_then_fail(self):
+        job = enqueue('test.fail')
+        self.assertTrue(self.worker.run_once())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreater(job.available_at, timezone.now())
+        self.assertFalse(self.worker.run_once())
+
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(available_at=timezone.now())
+            self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+
+        self.assertEqual(requeue(Job.objects.all()), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 0))
+
+    def test_expired_lease_is_reclaimed(self):
+        job = enqueue('test.record', {'value': 'x'}, max_attempts=2)
+        claimed = self.worker.claim()
+        self.assertIsNone(Worker().claim())
+
+        Job.objects.filter(pk=job.pk).update(available_at=timezone.now() - timedelta(seconds=1))
+        Worker(name='other').run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.worker), (Job.DONE, 2, 'other'))
+
+        # The first worker lost its lease: its late result is dropped.
+        self.worker.execute(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.worker, 'other')
+        self.assertEqual(calls, ['x', 'x'])
+
+    @override_settings(JOBS_LEASE_SECONDS=0.15)
+    def test_lease_renewed_while_task_runs(self):
+        job = enqueue('test.sleep', {'seconds': 0.3})
+        # The heartbeat thread has its own connection, which can't see this test's transaction.
+        with mock.patch.object(Worker, 'renew') as renew:
+            self.worker.run_once()
+        self.assertGreaterEqual(renew.call_count, 2)
+        self.assertEqual(renew.call_args.args[0].pk, job.pk)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+    def test_commands_run_maintenance_tasks(self):
+        supplier = Supplier.objects.create(name='Fornecedor Teste')
+        Product.objects.create(name='Produto', description='Produto', price='10.00', sku='PROD1', supplier=supplier)
+        SupplierRollup.objects.filter(pk=supplier.pk).update(product_count=7)
+
+        out = StringIO()
+        call_command('enqueue_job', 'reconcile_rollups', '--dedupe-key', 'rollups', stdout=out)
+        call_command('enqueue_job', 'reconcile_rollups', '--dedupe-key', 'rollups', stdout=out)
+        self.assertEqual(Job.objects.count(), 1)
+
+        call_command('run_workers', '--processes', '1', '--interval', '0', stdout=out)
+        self.assertIn('1 job(s) executado(s)', out.getvalue())
+        self.assertEqual(Job.objects.get().result, {'corrected': 1})
+        self.assertEqual(SupplierRollup.objects.get(pk=supplier.pk).product_count, 1)
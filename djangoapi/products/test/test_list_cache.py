@@ -0,0 +1,93 @@
+import zlib
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from django.contrib.auth.models import User
+from products.list_cache import cache_key
+from products.metrics import registry
+from products.models import Category, Product, Supplier
+
+
+class ListCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_product('PROD1')
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpassword'))
+        self.url = reverse('product-list')
+
+    def create_product(self, sku):
+        Product.objects.create(name=sku, description=sku, price='10.00', sku=sku, supplier=self.supplier)
+
+    def results(self, name='product-list'):
+        return {result: registry.counters.get(('cache_requests_total', (('cache', name), ('result', result))), 0)
+                for result in ('hit', 'miss', 'stale', 'refresh')}
+
+    def key(self, params=None):
+        return cache_key('product-list', Request(APIRequestFactory().get(self.url, params)))
+
+    def test_hits_are_served_from_cache(self):
+        first = self.client.get(self.url, {'fields': 'sku,price'})
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {'fields': ' sku, price '})
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.json(), [{'price': '10.00', 'sku': 'PROD1'}])
+        self.assertEqual(self.results(), {'hit': 1, 'miss': 1, 'stale': 0, 'refresh': 0})
+
+        self.client.get(self.url, {'page_size': 5, 'page': 1})
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'page': 1, 'page_size': 5})
+        self.assertEqual(self.key({'page': 1, 'page_size': 5}), self.key({'page_size': 5, 'page': 1}))
+        self.assertNotEqual(self.key({'page': 1}), self.key({'page': 2}))
+
+    def test_entries_are_compressed(self):
+        self.client.get(self.url)
+        fresh_until, version, payload = cache.get(self.key())
+        self.assertIn(b'"sku":"PROD1"', zlib.decompress(payload))
+
+    def test_stale_served_while_another_worker_refreshes(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_product('PROD2')
+        key = self.key()
+
+        cache.add(key + ':lock', 1)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual([row['sku'] for row in response.json()], ['PROD1'])
+
+        cache.delete(key + ':lock')
+        response = self.client.get(self.url)
+        self.assertEqual([row['sku'] for row in response.json()], ['PROD1', 'PROD2'])
+        self.assertEqual(self.results(), {'hit': 0, 'miss': 1, 'stale': 1, 'refresh': 1})
+        self.assertIsNone(cache.get(key + ':lock'))
+        self.assertIn(('cache_refresh_duration_seconds', (('cache', 'product-list'),)), registry.histograms)
+
+    @override_settings(LIST_CACHE_SOFT_TTL=0)
+    def test_soft_ttl(self):
+        self.client.get(self.url)
+        Product.objects.filter(sku='PROD1').update(name='Renomeado')
+        self.assertEqual(self.client.get(self.url).json()[0]['name'], 'Renomeado')
+        self.assertEqual(self.results()['refresh'], 1)
+
+    @override_settings(LIST_CACHE_LOCK_TIMEOUT=0.1)
+    def test_miss_waits_for_the_refreshing_request(self):
+        response = self.client.get(self.url)
+        key = self.key()
+        cache.delete(key)
+        cache.add(key + ':lock', 1)
+        # Nobody fills the entry, so the request computes the list itself.
+        self.assertEqual(self.client.get(self.url).json(), response.json())
+
+    def test_category_list(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='livros')
+        self.assertEqual([row['name'] for row in self.client.get(reverse('category-list')).json()], ['livros'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='jogos')
+        self.assertEqual(len(self.client.get(reverse('category-list')).json()), 2)
+        self.assertEqual(self.results('category-list')['refresh'], 1)
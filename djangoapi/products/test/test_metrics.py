@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+from pathlib import Path
+import orjson
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from products.metrics import Registry, registry
+from products.test.test_views import mocked_product_create, mocked_user
+
+
+class MetricsViewTest(APITestCase):
+    def setUp(self):
+        registry.reset()
+        self.user = mocked_user()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            mocked_product_create()
+        self.url = reverse('metrics')
+
+    def test_metrics_records_requests(self):
+        self.client.get(reverse('product-list'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('http_requests_total{view="product-list",method="GET",status="200"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{view="product-list",method="GET"} 1', body)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertRegex(body, r'db_queries_total\{view="product-list",method="GET"\} [1-9]')
+
+    @override_settings(METRICS_TOKEN='segredo')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class RegistryMultiProcessTest(APITestCase):
+    def test_collect_merges_worker_files(self):
+        metrics_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, metrics_dir, ignore_errors=True)
+        labels = (('view', 'product-list'), ('method', 'GET'))
+        other_worker = Registry()
+        other_worker.inc('db_queries_total', labels, 3)
+        other_worker.observe('http_request_duration_seconds', labels, 0.2)
+        (metrics_dir / 'metrics-99999.json').write_bytes(orjson.dumps(other_worker.snapshot()))
+
+        with override_settings(METRICS_DIR=str(metrics_dir)):
+            local = Registry()
+            local.inc('db_queries_total', labels, 2)
+            local.observe('http_request_duration_seconds', labels, 0.01)
+            body = local.render()
+
+        self.assertIn('db_queries_total{view="product-list",method="GET"} 5', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="product-list",method="GET",le="0.01"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="product-list",method="GET",le="0.25"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{view="product-list",method="GET"} 2', body)
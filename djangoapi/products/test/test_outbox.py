@@ -0,0 +1,143 @@
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from products.models import ChangeLog, OutboxEvent, PriceHistory, Product, ProductStock, Supplier
+from products.outbox import Dispatcher, requeue
+from products.repricing import reprice
+from django.contrib.auth.models import User
+
+
+class Receiver(ThreadingHTTPServer):
+    """Local stand-in for a downstream system."""
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ReceiverHandler)
+        self.batches = []
+        self.status = 200
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/events'
+
+
+class ReceiverHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.batches.append((self.headers.get('Authorization'), body))
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.receiver = Receiver()
+        threading.Thread(target=self.receiver.serve_forever, daemon=True).start()
+        self.addCleanup(self.receiver.server_close)
+        self.addCleanup(self.receiver.shutdown)
+
+        destinations = {
+            'pricing': {'url': self.receiver.url, 'events': ['price.changed'], 'headers': {'Authorization': 'Bearer t'}},
+            'stock': {'url': self.receiver.url, 'events': ['stock.changed']},
+        }
+        patcher = override_settings(OUTBOX_DESTINATIONS=destinations, OUTBOX_BACKOFF_BASE=2, OUTBOX_MAX_ATTEMPTS=2)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.product = Product.objects.create(name='Produto', description='Produto', price='10.00', sku='PROD1', supplier=self.supplier)
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+
+    def change_price(self, price):
+        product = Product.objects.get(pk=self.product.pk)
+        product.price = price
+        product.save()
+
+    def test_events_written_with_the_change(self):
+        self.assertEqual(list(OutboxEvent.objects.values_list('destination', 'event_type')), [('stock', 'stock.changed')])
+        self.change_price('12.00')
+        event = OutboxEvent.objects.get(event_type='price.changed')
+        self.assertEqual(event.destination, 'pricing')
+        self.assertEqual(event.payload['sku'], 'PROD1')
+        self.assertEqual((event.payload['old_price'], event.payload['new_price']), ('10.00', '12.00'))
+
+        reprice(Product.objects.all(), 'delta', '1', 'cents', self.user)
+        self.assertEqual(OutboxEvent.objects.filter(event_type='price.changed').count(), 2)
+
+    def test_dispatch_batches_per_destination(self):
+        self.change_price('12.00')
+        self.change_price('13.00')
+        out = StringIO()
+        call_command('dispatch_outbox', stdout=out)
+        self.assertIn('3 evento(s)', out.getvalue())
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        batches = {body['events'][0]['type']: (auth, body['events']) for auth, body in self.receiver.batches}
+        self.assertEqual(len(self.receiver.batches), 2)
+        auth, events = batches['price.changed']
+        self.assertEqual(auth, 'Bearer t')
+        self.assertEqual([event['payload']['new_price'] for event in events], ['12.00', '13.00'])
+        self.assertIsNone(batches['stock.changed'][0])
+
+    def test_failures_back_off_then_fail(self):
+        self.receiver.status = 503
+        dispatcher = Dispatcher()
+        self.assertEqual(dispatcher.dispatch_once(), (1, 0))
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.available_at, timezone.now())
+        self.assertIn('503', event.last_error)
+        self.assertEqual(dispatcher.dispatch_once(), (0, 0))
+
+        OutboxEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        dispatcher.dispatch_once()
+        event.refresh_from_db()
+        self.assertIsNotNone(event.failed_at)
+        self.assertEqual(dispatcher.dispatch_once(), (0, 0))
+
+        self.receiver.status = 200
+        requeue(OutboxEvent.objects.all())
+        self.assertEqual(dispatcher.dispatch_once(), (1, 1))
+
+    def test_claimed_events_are_leased(self):
+        events = Dispatcher().claim()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(Dispatcher().claim(), [])
+
+    @override_settings(OUTBOX_DESTINATIONS={})
+    def test_no_destinations(self):
+        OutboxEvent.objects.all().delete()
+        stock = ProductStock.objects.get(product=self.product)
+        stock.quantity = 3
+        stock.save()
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class OutboxAtomicityTest(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.product = Product.objects.create(name='Produto', description='Produto', price='10.00', sku='PROD1', supplier=self.supplier)
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+    def test_write_rolls_back_when_the_event_cannot_be_queued(self):
+        changes = ChangeLog.objects.count()
+        with mock.patch('products.outbox.publish', side_effect=RuntimeError('outbox indisponível')):
+            with self.assertRaises(RuntimeError):
+                self.client.patch(reverse('product-update', kwargs={'sku': 'PROD1'}), {'price': '12.00'}, format='json')
+            with self.assertRaises(RuntimeError):
+                self.client.patch(reverse('stock-update', kwargs={'sku': 'PROD1'}), {'quantity': 5}, format='json')
+
+        self.assertEqual(Product.objects.get(pk=self.product.pk).price, 10)
+        self.assertEqual(ProductStock.objects.get(product=self.product).quantity, 0)
+        self.assertFalse(PriceHistory.objects.exists())
+        self.assertEqual(ChangeLog.objects.count(), changes)
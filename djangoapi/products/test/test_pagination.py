@@ -0,0 +1,70 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from products.models import Product, Supplier
+from products.pagination import ApproximateCountPaginator, estimate_count
+
+
+def create_products(count):
+    supplier = Supplier.objects.create(name='Fornecedor Teste')
+    for i in range(count):
+        Product.objects.create(name=f'Produto {i}', description='', price='1.00', sku=f'PROD{i}', supplier=supplier)
+
+
+class ApproximateCountPaginatorTest(TestCase):
+    def setUp(self):
+        create_products(3)
+
+    def test_exact_count_without_estimate(self):
+        self.assertIsNone(estimate_count(Product.objects.all()))
+        paginator = ApproximateCountPaginator(Product.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.count_is_estimate)
+
+    @override_settings(APPROXIMATE_COUNT_THRESHOLD=1000)
+    def test_uses_estimate_above_threshold(self):
+        with mock.patch('products.pagination.estimate_count', return_value=5000000):
+            paginator = ApproximateCountPaginator(Product.objects.order_by('pk'), 2)
+            with self.assertNumQueries(0):
+                self.assertEqual(paginator.count, 5000000)
+            self.assertTrue(paginator.count_is_estimate)
+        with mock.patch('products.pagination.estimate_count', return_value=999):
+            self.assertEqual(ApproximateCountPaginator(Product.objects.order_by('pk'), 2).count, 3)
+
+
+class PaginatedListTest(APITestCase):
+    def setUp(self):
+        create_products(3)
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpassword'))
+
+    def test_page_requested(self):
+        response = self.client.get(reverse('product-list'), {'page_size': 2, 'fields': 'sku'})
+        body = response.json()
+        self.assertEqual(body['count'], 3)
+        self.assertFalse(body['count_is_estimate'])
+        self.assertEqual(body['results'], [{'sku': 'PROD0'}, {'sku': 'PROD1'}])
+        self.assertIn('page=2', body['next'])
+
+        body = self.client.get(reverse('stock-list'), {'page': 2, 'page_size': 2}).json()
+        self.assertEqual(body['results'], [{'product_sku': 'PROD2', 'quantity': 0}])
+
+    def test_plain_list_without_page(self):
+        self.assertEqual(len(self.client.get(reverse('product-list')).json()), 3)
+
+
+class AdminTest(TestCase):
+    def setUp(self):
+        create_products(3)
+        self.client.force_login(User.objects.create_superuser(username='admin', password='admin'))
+
+    def test_changelist_search(self):
+        response = self.client.get(reverse('admin:products_product_changelist'), {'q': 'PROD1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list), [Product.objects.get(sku='PROD1')])
+
+        response = self.client.get(reverse('admin:products_product_changelist'), {'q': 'Produto'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        for name in ('review', 'pricehistory'):
+            self.assertEqual(self.client.get(reverse(f'admin:products_{name}_changelist'), {'q': 'PROD1'}).status_code, 200)
@@ -0,0 +1,53 @@
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from django.core import signing
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from products.middleware import ProfilingMiddleware
+from products.test.test_views import mocked_product_create, mocked_user
+
+
+class ProfilingMiddlewareTest(APITestCase):
+    def setUp(self):
+        self.profiling_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.profiling_dir, ignore_errors=True)
+        override = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.profiling_dir, PROFILING_MAX_FILES=2)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = mocked_user()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            mocked_product_create()
+        self.url = reverse('product-list')
+        self.token = signing.TimestampSigner(salt=ProfilingMiddleware.signer_salt).sign('profile')
+
+    def test_signed_header_captures_profile_and_queries(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE=self.token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        capture_id = response['X-Profile-Id']
+        self.assertTrue((self.profiling_dir / f'{capture_id}.prof').exists())
+        capture = json.loads((self.profiling_dir / f'{capture_id}.json').read_text())
+        self.assertEqual(capture['view'], 'product-list')
+        self.assertTrue(any('products_product' in query['sql'] for query in capture['queries']))
+
+    def test_unsigned_header_is_ignored(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE='invalido')
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(list(self.profiling_dir.iterdir()), [])
+
+    def test_rotation_and_report(self):
+        for _ in range(3):
+            self.client.get(self.url, HTTP_X_PROFILE=self.token)
+        self.assertEqual(len(list(self.profiling_dir.glob('*.json'))), 2)
+        self.assertEqual(len(list(self.profiling_dir.glob('*.prof'))), 2)
+
+        out = io.StringIO()
+        call_command('profiling_report', stdout=out)
+        self.assertIn('product-list', out.getvalue())
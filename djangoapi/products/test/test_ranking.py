@@ -0,0 +1,85 @@
+from io import StringIO
+from unittest import skipUnless
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from products.deletion import soft_delete
+from products.models import Category, Product, ProductRating, Review, Supplier
+from products.ranking import bayesian_score
+
+
+class RankingTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.root = Category.objects.create(name='tecnologia')
+        self.child = Category.objects.create(name='celulares', parent=self.root)
+        self.other = Category.objects.create(name='livros')
+        self.users = [User.objects.create_user(username=f'user{i}', password='testpassword') for i in range(5)]
+        self.client.force_authenticate(user=self.users[0])
+
+    def create_product(self, sku, category, ratings=()):
+        product = Product.objects.create(name=sku, description=sku, price='10.00', sku=sku, supplier=self.supplier, category=category)
+        for user, rating in zip(self.users, ratings):
+            Review.objects.create(product=product, user=user, rating=rating)
+        return product
+
+    def top(self, **params):
+        return self.client.get(reverse('product-top'), params)
+
+    def skus(self, **params):
+        return [row['sku'] for row in self.top(**params).json()['results']]
+
+    def test_score_follows_reviews(self):
+        product = self.create_product('PROD1', self.root, [10])
+        self.assertAlmostEqual(Product.objects.get(pk=product.pk).rating_score, bayesian_score(10, 1))
+        review = Review.objects.create(product=product, user=self.users[1], rating=2)
+        self.assertAlmostEqual(Product.objects.get(pk=product.pk).rating_score, bayesian_score(6, 2))
+        ProductRating.objects.filter(product=product).delete()
+        self.assertIsNone(Product.objects.get(pk=product.pk).rating_score)
+        self.assertTrue(review.pk)
+
+    def test_leaderboard_over_subcategories(self):
+        self.create_product('UMA10', self.root, [10])
+        self.create_product('MUITAS9', self.child, [9, 9, 9, 9, 9])
+        self.create_product('MEDIA', self.child, [5, 6])
+        self.create_product('SEMNOTA', self.root)
+        self.create_product('LIVRO', self.other, [10, 10, 10])
+
+        response = self.top(category='Tecnologia')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['category'], 'tecnologia')
+        self.assertEqual([row['sku'] for row in response.json()['results']], ['MUITAS9', 'UMA10', 'MEDIA'])
+        first = response.json()['results'][0]
+        self.assertEqual((first['average_rating'], first['ratings_count'], first['category']), ('9.00', 5, self.child.pk))
+        self.assertEqual(self.skus(category='celulares'), ['MUITAS9', 'MEDIA'])
+        self.assertEqual(self.skus(category='tecnologia', limit=1), ['MUITAS9'])
+
+        soft_delete(Product.objects.get(sku='MUITAS9'))
+        self.assertEqual(self.skus(category='tecnologia'), ['UMA10', 'MEDIA'])
+
+    def test_validation(self):
+        self.assertEqual(self.top().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.top(category='inexistente').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.top(category='livros', limit='x').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_scores(self):
+        product = self.create_product('PROD1', self.root, [8, 4])
+        expected = Product.objects.get(pk=product.pk).rating_score
+        Product.objects.update(rating_score=None)
+        out = StringIO()
+        call_command('rebuild_ranking_scores', stdout=out)
+        self.assertAlmostEqual(Product.objects.get(pk=product.pk).rating_score, expected)
+
+    @skipUnless(connection.vendor == 'sqlite', 'plan text is SQLite-specific')
+    def test_reads_in_index_order(self):
+        plan = (
+            Product.objects.filter(category=self.root, rating_score__isnull=False)
+            .order_by('-rating_score', 'id')[:10].explain()
+        )
+        self.assertIn('product_top_rated_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,89 @@
+import numpy as np
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from products.deletion import soft_delete
+from products.models import Product, RelatedProduct, Review, Supplier
+from products.recommendations import similar_products
+
+
+class SimilarProductsTest(TestCase):
+    def reviews(self):
+        rng = np.random.default_rng(0)
+        size = 5000
+        return rng.integers(0, 300, size), rng.integers(0, 200, size), rng.integers(0, 11, size)
+
+    def collect(self, memory_mb, k=5):
+        chunks = list(similar_products(*self.reviews(), k, memory_mb))
+        return len(chunks), {
+            (product, rank): (related, round(score, 5))
+            for chunk in chunks for product, related, score, rank in zip(*(part.tolist() for part in chunk))
+        }
+
+    def test_chunking_does_not_change_the_result(self):
+        chunks, whole = self.collect(memory_mb=64)
+        self.assertEqual(chunks, 1)
+        # A budget of about 2000 similarities per chunk.
+        with mock.patch('products.recommendations.BYTES_PER_ENTRY', 64 * 1024 * 1024 // 2000):
+            chunks, chunked = self.collect(memory_mb=64)
+        self.assertGreater(chunks, 5)
+        self.assertEqual(chunked, whole)
+
+    def test_top_k_is_ordered_and_excludes_itself(self):
+        _, result = self.collect(memory_mb=64, k=3)
+        for (product, rank), (related, score) in result.items():
+            self.assertNotEqual(product, related)
+            if rank:
+                self.assertLessEqual(score, result[(product, rank - 1)][1])
+        self.assertEqual(max(rank for _, rank in result), 2)
+
+
+class RelatedProductsTest(APITestCase):
+    def setUp(self):
+        supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.products = {
+            sku: Product.objects.create(name=sku, description=sku, price='10.00', sku=sku, supplier=supplier)
+            for sku in ('PROD1', 'PROD2', 'PROD3', 'PROD4')
+        }
+        users = [User.objects.create_user(username=f'user{i}', password='testpassword') for i in range(3)]
+        for user, sku, rating in [
+            (users[0], 'PROD1', 5), (users[0], 'PROD2', 5), (users[0], 'PROD3', 1),
+            (users[1], 'PROD1', 4), (users[1], 'PROD2', 4),
+            (users[2], 'PROD3', 0), (users[2], 'PROD4', 3),
+        ]:
+            Review.objects.create(product=self.products[sku], user=user, rating=rating)
+        self.client.force_authenticate(user=users[0])
+
+    def related(self, sku, **params):
+        return self.client.get(reverse('product-related', kwargs={'sku': sku}), params)
+
+    def test_build_and_serve(self):
+        out = StringIO()
+        call_command('build_related_products', stdout=out)
+        self.assertIn('relação(ões) gravada(s)', out.getvalue())
+
+        with self.assertNumQueries(1):
+            response = self.related('PROD1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['sku'] for row in response.json()['results']], ['PROD2', 'PROD3'])
+        self.assertEqual(response.json()['results'][0]['price'], '10.00')
+        self.assertEqual([row['sku'] for row in self.related('PROD3').json()['results']], ['PROD1', 'PROD2', 'PROD4'])
+        self.assertEqual(len(self.related('PROD3', limit=1).json()['results']), 1)
+
+        # Rebuilding replaces the table rather than appending to it.
+        count = RelatedProduct.objects.count()
+        call_command('build_related_products', stdout=StringIO())
+        self.assertEqual(RelatedProduct.objects.count(), count)
+
+    def test_deleted_and_unknown_products(self):
+        call_command('build_related_products', stdout=StringIO())
+        soft_delete(self.products['PROD2'])
+        self.assertEqual([row['sku'] for row in self.related('PROD1').json()['results']], ['PROD3'])
+        self.assertEqual(self.related('PROD2').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.related('NAOEXISTE').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.related('PROD1', limit='x').status_code, status.HTTP_400_BAD_REQUEST)
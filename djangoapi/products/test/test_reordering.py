@@ -0,0 +1,124 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from products.models import Category, OutboxEvent, Product, ProductStock, Supplier
+
+
+class ReorderingTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.acme = Supplier.objects.create(name='Acme')
+        self.globex = Supplier.objects.create(name='Globex')
+        self.tools = Category.objects.create(name='tools', reorder_level=10)
+        self.drills = Category.objects.create(name='drills', parent=self.tools)
+        self.saws = Category.objects.create(name='saws', parent=self.tools, reorder_level=3)
+
+    def create_product(self, sku, category, supplier, quantity):
+        product = Product.objects.create(name=sku, description=sku, price='10.00', sku=sku, supplier=supplier, category=category)
+        self.set_quantity(product, quantity)
+        return product
+
+    def set_quantity(self, product, quantity):
+        stock = ProductStock.objects.get(product=product)
+        stock.quantity = quantity
+        stock.save()
+
+    def level(self, product):
+        return ProductStock.objects.get(product=product).reorder_level
+
+    def test_level_is_inherited_and_overridden(self):
+        drill = self.create_product('DRILL1', self.drills, self.acme, 5)
+        saw = self.create_product('SAW1', self.saws, self.acme, 5)
+        loose = self.create_product('LOOSE1', None, self.acme, 5)
+        self.assertEqual((self.level(drill), self.level(saw), self.level(loose)), (10, 3, 0))
+
+        response = self.client.patch(reverse('stock-update', kwargs={'sku': 'SAW1'}), {'reorder_threshold': 8}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'product_sku': 'SAW1', 'quantity': 5})
+        self.assertEqual(self.level(saw), 8)
+
+        self.client.patch(reverse('stock-update', kwargs={'sku': 'SAW1'}), {'reorder_threshold': None}, format='json')
+        self.assertEqual(self.level(saw), 3)
+
+        with override_settings(REORDER_LEVEL_DEFAULT=4):
+            self.assertEqual(self.level(self.create_product('LOOSE2', None, self.acme, 5)), 4)
+
+    def test_category_changes_refresh_levels(self):
+        drill = self.create_product('DRILL1', self.drills, self.acme, 5)
+        pinned = self.create_product('DRILL2', self.drills, self.acme, 5)
+        stock = ProductStock.objects.get(product=pinned)
+        stock.reorder_threshold = 1
+        stock.save()
+
+        self.tools.reorder_level = 2
+        self.tools.save()
+        self.assertEqual((self.level(drill), self.level(pinned)), (2, 1))
+
+        self.drills.parent = self.saws
+        self.drills.save()
+        self.assertEqual(self.level(drill), 3)
+
+        drill.category = self.tools
+        drill.save()
+        self.assertEqual(self.level(drill), 2)
+
+        self.tools.delete()
+        self.assertEqual(self.level(drill), 0)
+
+    def test_low_stock_grouped_by_supplier(self):
+        self.create_product('DRILL1', self.drills, self.acme, 5)
+        self.create_product('DRILL2', self.drills, self.acme, 10)
+        self.create_product('SAW1', self.saws, self.globex, 1)
+        self.create_product('SAW2', self.saws, self.acme, 2)
+
+        response = self.client.get(reverse('stock-low'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'count': 3,
+            'results': [
+                {'supplier': self.acme.pk, 'supplier_name': 'Acme', 'items': [
+                    {'sku': 'DRILL1', 'name': 'DRILL1', 'quantity': 5, 'reorder_level': 10, 'shortfall': 5},
+                    {'sku': 'SAW2', 'name': 'SAW2', 'quantity': 2, 'reorder_level': 3, 'shortfall': 1},
+                ]},
+                {'supplier': self.globex.pk, 'supplier_name': 'Globex', 'items': [
+                    {'sku': 'SAW1', 'name': 'SAW1', 'quantity': 1, 'reorder_level': 3, 'shortfall': 2},
+                ]},
+            ],
+        })
+        self.assertEqual(self.client.get(reverse('stock-low'), {'category': 'saws'}).json()['count'], 2)
+        self.assertEqual(self.client.get(reverse('stock-low'), {'supplier': self.globex.pk}).json()['count'], 1)
+        self.assertEqual(self.client.get(reverse('stock-low'), {'category': 'nope'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(OUTBOX_DESTINATIONS={'purchasing': {'url': 'http://purchasing.invalid/', 'events': ['reorder.requested']}})
+    def test_command_emits_each_shortage_once(self):
+        drill = self.create_product('DRILL1', self.drills, self.acme, 5)
+        self.create_product('SAW1', self.saws, self.globex, 1)
+
+        out = StringIO()
+        call_command('emit_reorder_batches', stdout=out)
+        self.assertIn('2 lote(s)', out.getvalue())
+        events = OutboxEvent.objects.filter(event_type='reorder.requested').order_by('id')
+        self.assertEqual([event.payload['supplier_name'] for event in events.all()], ['Acme', 'Globex'])
+        self.assertEqual(events[0].payload['items'][0]['sku'], 'DRILL1')
+
+        call_command('emit_reorder_batches', stdout=StringIO())
+        self.assertEqual(events.count(), 2)
+
+        # Restocking clears the request, so a later shortage is emitted again.
+        self.set_quantity(drill, 20)
+        self.set_quantity(drill, 1)
+        call_command('emit_reorder_batches', stdout=StringIO())
+        self.assertEqual(events.count(), 3)
+
+    def test_scan_uses_partial_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN format is backend specific')
+        from products.reordering import low_stock
+        plan = low_stock().explain()
+        self.assertIn('stock_low_idx', plan)
@@ -0,0 +1,114 @@
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from products.models import Category, PriceHistory, Product, ProductStock, Supplier, SupplierRollup
+from products.repricing import RepriceError, reprice, update_prices
+from products.versioning import get_version
+
+
+class RepricingTest(APITestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+            self.other_supplier = Supplier.objects.create(name='Outro Fornecedor')
+            self.root = Category.objects.create(name='tecnologia')
+            self.child = Category.objects.create(name='celulares', parent=self.root)
+            self.books = Category.objects.create(name='livros')
+            self.products = {
+                sku: Product.objects.create(name=sku, description=sku, price=price, sku=sku, supplier=supplier, category=category)
+                for sku, price, supplier, category in [
+                    ('PROD1', '10.00', self.supplier, self.root),
+                    ('PROD2', '20.99', self.supplier, self.child),
+                    ('PROD3', '5.50', self.other_supplier, self.books),
+                ]
+            }
+            stock = ProductStock.objects.get(product__sku='PROD2')
+            stock.quantity = 3
+            stock.save()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+    def prices(self):
+        return dict(Product.objects.values_list('sku', 'price'))
+
+    def post(self, data):
+        return self.client.post(reverse('product-reprice'), data, format='json')
+
+    def test_percent_on_category_subtree(self):
+        version = get_version('catalog')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post({'category': 'tecnologia', 'operation': 'percent', 'value': '20'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'updated': 2, 'missing': []})
+        self.assertEqual(self.prices(), {'PROD1': Decimal('12.00'), 'PROD2': Decimal('25.19'), 'PROD3': Decimal('5.50')})
+        self.assertEqual(
+            set(PriceHistory.objects.values_list('product__sku', 'old_price', 'new_price', 'user')),
+            {('PROD1', Decimal('10.00'), Decimal('12.00'), self.user.pk), ('PROD2', Decimal('20.99'), Decimal('25.19'), self.user.pk)},
+        )
+        self.assertGreater(get_version('catalog'), version)
+        self.assertEqual(SupplierRollup.objects.get(pk=self.supplier.pk).stock_value, Decimal('75.57'))
+
+    def test_supplier_delta_and_rounding(self):
+        self.post({'supplier': self.supplier.pk, 'operation': 'delta', 'value': '-0.5', 'rounding': 'ending_99'})
+        self.assertEqual(self.prices(), {'PROD1': Decimal('9.99'), 'PROD2': Decimal('20.99'), 'PROD3': Decimal('5.50')})
+        self.assertEqual(PriceHistory.objects.count(), 1)
+
+        self.post({'supplier': self.other_supplier.pk, 'operation': 'percent', 'value': '10', 'rounding': 'integer'})
+        self.assertEqual(self.prices()['PROD3'], Decimal('6.00'))
+
+    def test_set_by_skus(self):
+        response = self.post({'skus': ['PROD1', 'PROD3', 'NAOEXISTE'], 'operation': 'set', 'value': '7'})
+        self.assertEqual(response.json(), {'updated': 2, 'missing': ['NAOEXISTE']})
+        self.assertEqual(self.prices(), {'PROD1': Decimal('7.00'), 'PROD2': Decimal('20.99'), 'PROD3': Decimal('7.00')})
+
+    def test_prices_never_go_negative(self):
+        self.post({'skus': ['PROD3'], 'operation': 'delta', 'value': '-100'})
+        self.assertEqual(self.prices()['PROD3'], Decimal('0.00'))
+
+    def test_validation(self):
+        self.assertEqual(self.post({'operation': 'set', 'value': '1'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post({'supplier': self.supplier.pk, 'skus': ['PROD1'], 'operation': 'set', 'value': '1'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post({'supplier': self.supplier.pk, 'operation': 'percent', 'value': '-100'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post({'category': 'inexistente', 'operation': 'set', 'value': '1'}).status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertRaises(RepriceError):
+            reprice(Product.objects.all(), 'set', '100000000', 'cents', self.user)
+        self.assertEqual(self.prices()['PROD1'], Decimal('10.00'))
+
+    def test_set_based_queries(self):
+        Product.objects.bulk_create([
+            Product(name=f'P{i}', description='', price='1.00', sku=f'BULK{i}', supplier=self.supplier, category=self.books)
+            for i in range(50)
+        ])
+        with self.assertNumQueries(7):
+            updated = reprice(Product.objects.filter(category=self.books), 'percent', '10', 'cents', self.user)
+        self.assertEqual(updated, 51)
+
+    def test_postgresql_update_statement(self):
+        # The selection reprice() compiles, run through the PostgreSQL branch with a fake cursor.
+        with mock.patch('products.repricing.update_prices', return_value=[]) as selected:
+            reprice(Product.objects.filter(supplier=self.supplier), 'percent', '20', 'cents', self.user)
+        _, sql, params = selected.call_args.args
+
+        postgresql = mock.MagicMock(vendor='postgresql', ops=connection.ops)
+        cursor = postgresql.cursor.return_value.__enter__.return_value
+        row = (1, 'PROD1', self.supplier.pk, self.root.pk, Decimal('10.00'), Decimal('12.00'), 0)
+        cursor.fetchall.return_value = [row]
+        self.assertEqual(update_prices(postgresql, sql, params), [row])
+
+        cursor.execute.assert_called_once()
+        statement, bound = cursor.execute.call_args.args
+        self.assertEqual(statement, (
+            f'WITH changes AS ({sql}) UPDATE "products_product" SET price = changes.new_price '
+            'FROM changes WHERE "products_product".id = changes.id '
+            'RETURNING changes.id, changes.sku, changes.supplier_id, changes.category_id, '
+            'changes.price, "products_product".price, changes.quantity'
+        ))
+        # Values are bound once, inside the CTE, never inlined into the UPDATE.
+        self.assertIs(bound, params)
+        self.assertEqual(statement.count('%s'), len(params))
+        self.assertIn(self.supplier.pk, params)
+        self.assertEqual(self.prices()['PROD1'], Decimal('10.00'))
@@ -0,0 +1,105 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from products.models import Category, CategoryRollup, Product, ProductRating, ProductStock, Review, Supplier, SupplierRollup
+from products.rollups import reconcile_rollups
+
+
+class RollupTest(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.root = Category.objects.create(name='Tecnologia')
+        self.child = Category.objects.create(name='Celulares', parent=self.root)
+        self.product = Product.objects.create(
+            name='Produto Teste 1', description='Produto Teste 1', price='10.00',
+            sku='PROD1', supplier=self.supplier, category=self.child)
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+    def assertRollup(self, model, pk, **expected):
+        row = model.objects.values(*expected).get(pk=pk)
+        self.assertEqual(row, {key: type(row[key])(value) for key, value in expected.items()})
+
+    def set_quantity(self, quantity):
+        stock = ProductStock.objects.get(product=self.product)
+        stock.quantity = quantity
+        stock.save()
+
+    def test_stock_and_price_changes(self):
+        self.set_quantity(5)
+        self.assertRollup(SupplierRollup, self.supplier.pk, product_count=1, units_in_stock=5, stock_value=Decimal('50.00'))
+
+        product = Product.objects.get(pk=self.product.pk)
+        product.price = Decimal('12.50')
+        product.save()
+        for category in (self.child, self.root):
+            self.assertRollup(CategoryRollup, category.pk, product_count=1, units_in_stock=5, stock_value=Decimal('62.50'))
+
+        product.delete()
+        self.assertRollup(SupplierRollup, self.supplier.pk, product_count=0, units_in_stock=0, stock_value=0)
+        self.assertRollup(CategoryRollup, self.root.pk, product_count=0, units_in_stock=0, stock_value=0)
+
+    def test_ratings(self):
+        Review.objects.create(product=self.product, user=self.user, rating=4, comment='Bom')
+        Review.objects.create(product=self.product, user=self.user, rating=5, comment='Ótimo')
+        self.assertRollup(SupplierRollup, self.supplier.pk, rating_total=Decimal('4.50'), rated_products=1)
+
+        ProductRating.objects.filter(product=self.product).delete()
+        self.assertRollup(CategoryRollup, self.root.pk, rating_total=0, rated_products=0)
+
+    def test_product_and_category_moves(self):
+        other = Category.objects.create(name='Livros')
+        self.set_quantity(2)
+
+        product = Product.objects.get(pk=self.product.pk)
+        product.category = other
+        product.save()
+        self.assertRollup(CategoryRollup, self.root.pk, product_count=0, units_in_stock=0)
+        self.assertRollup(CategoryRollup, other.pk, product_count=1, units_in_stock=2)
+
+        self.child.parent = other
+        self.child.save()
+        product.category = self.child
+        product.save()
+        self.assertRollup(CategoryRollup, other.pk, product_count=1, units_in_stock=2)
+        self.assertRollup(CategoryRollup, self.root.pk, product_count=0, units_in_stock=0)
+
+    def test_reconcile_fixes_drift(self):
+        self.set_quantity(3)
+        self.assertEqual(reconcile_rollups(), 0)
+
+        SupplierRollup.objects.filter(pk=self.supplier.pk).update(units_in_stock=99)
+        CategoryRollup.objects.filter(pk=self.root.pk).delete()
+        out = StringIO()
+        call_command('reconcile_rollups', stdout=out)
+        self.assertIn('2 resumo(s)', out.getvalue())
+        self.assertRollup(SupplierRollup, self.supplier.pk, units_in_stock=3)
+        self.assertRollup(CategoryRollup, self.root.pk, product_count=1, units_in_stock=3, stock_value=Decimal('30.00'))
+
+    def test_summary_endpoints(self):
+        self.set_quantity(4)
+        Review.objects.create(product=self.product, user=self.user, rating=3, comment='Ok')
+
+        response = self.client.get(reverse('supplier-summary', kwargs={'pk': self.supplier.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'supplier': self.supplier.pk, 'product_count': 1, 'units_in_stock': 4,
+            'stock_value': '40.00', 'average_rating': '3.00',
+        })
+
+        response = self.client.get(reverse('category-summary', kwargs={'name': 'tecnologia'}))
+        self.assertEqual(response.json()['units_in_stock'], 4)
+
+        empty = Category.objects.create(name='Vazia')
+        response = self.client.get(reverse('category-summary', kwargs={'name': 'vazia'}))
+        self.assertEqual(response.json(), {
+            'category': empty.pk, 'product_count': 0, 'units_in_stock': 0,
+            'stock_value': '0.00', 'average_rating': None,
+        })
+
+        self.assertEqual(self.client.get(reverse('category-summary', kwargs={'name': 'inexistente'})).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('supplier-summary', kwargs={'pk': 9999})).status_code, status.HTTP_404_NOT_FOUND)
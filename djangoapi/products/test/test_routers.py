@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from products.middleware import ReplicaRoutingMiddleware
+from products.models import CacheVersion, ChangeLog, Product
+from products.routers import ReplicaRouter, lag_monitor, replica_reads
+
+
+@override_settings(REPLICA_ALIASES=['replica_1'], REPLICA_STICKY_SECONDS=5, REPLICA_MAX_LAG_SECONDS=2)
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.addCleanup(lag_monitor.reset)
+        # The sticky flag needs a cache shared between workers.
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        shared_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }})
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        # Pretend replica_1 was just measured as up to date.
+        lag_monitor.lags['replica_1'] = (float('inf'), 0.0)
+
+    def route(self, request):
+        middleware = ReplicaRoutingMiddleware(lambda request: self.router.db_for_read(Product))
+        return middleware(request)
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+
+    def test_safe_request_reads_from_replica(self):
+        self.assertEqual(self.route(self.factory.get('/product/list/', HTTP_AUTHORIZATION='Bearer a')), 'replica_1')
+
+    def test_client_sticks_to_primary_after_write(self):
+        self.route(self.factory.patch('/stock/update/SKU1/', HTTP_AUTHORIZATION='Bearer writer'))
+        self.assertEqual(self.route(self.factory.get('/stock/list/', HTTP_AUTHORIZATION='Bearer writer')), 'default')
+        self.assertEqual(self.route(self.factory.get('/stock/list/', HTTP_AUTHORIZATION='Bearer other')), 'replica_1')
+
+    def test_process_local_cache_is_refused(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaRoutingMiddleware(lambda request: None)
+
+    def test_versions_and_feed_read_from_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Product), 'replica_1')
+            self.assertEqual(self.router.db_for_read(CacheVersion), 'default')
+            self.assertEqual(self.router.db_for_read(ChangeLog), 'default')
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        lag_monitor.lags['replica_1'] = (float('inf'), 30.0)
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_only_primary_is_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'products'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'products'))
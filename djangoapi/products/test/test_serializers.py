@@ -0,0 +1,49 @@
+import io
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from products.models import *
+from products.parsers import ORJSONParser
+from products.renderers import ORJSONRenderer
+from products.serializers import *
+
+
+class ORJSONRendererTest(TestCase):
+    def test_render_matches_json_renderer(self):
+        data = {'price': Decimal('10.50'), 'date': timezone.now(), 'name': 'Eletrônicos', 'items': [1, None]}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_render_none(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_parse(self):
+        stream = io.BytesIO('{"name": "Eletrônicos", "price": "10.50"}'.encode())
+        self.assertEqual(ORJSONParser().parse(stream), {'name': 'Eletrônicos', 'price': '10.50'})
+
+
+class ValuesSerializerTest(TestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.parent = Category.objects.create(name='Tecnologia')
+        self.category = Category.objects.create(name='Eletronicos', parent=self.parent)
+        self.product = Product.objects.create(
+            name='Produto Teste',
+            description='Descrição do produto',
+            price='10.5',
+            sku='TESTE01',
+            supplier=self.supplier,
+            category=self.category)
+
+    def test_product_read_serializer_matches_model_serializer(self):
+        self.product.refresh_from_db()
+        data = ProductReadSerializer().serialize(Product.objects.all())
+        self.assertEqual(data, [ProductSerializer(self.product).data])
+
+    def test_stock_read_serializer_matches_model_serializer(self):
+        data = ProductStockReadSerializer().serialize(ProductStock.objects.all())
+        self.assertEqual(data, ProductStockSerializer(ProductStock.objects.all(), many=True).data)
+
+    def test_category_read_serializer_matches_model_serializer(self):
+        data = CategoryReadSerializer().serialize(Category.objects.order_by('id'))
+        self.assertEqual(data, CategorySerializer(Category.objects.order_by('id'), many=True).data)
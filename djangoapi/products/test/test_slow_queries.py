@@ -0,0 +1,82 @@
+from unittest import mock
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from products.models import SlowQuery
+from products.slow_queries import ExplainRateLimiter, explain, fingerprint, is_read_only, normalize_sql
+from products.test.test_views import mocked_product_create, mocked_user
+
+
+class NormalizeSqlTest(SimpleTestCase):
+    def test_equivalent_queries_share_fingerprint(self):
+        first = normalize_sql("SELECT * FROM t WHERE sku = 'A1' AND id IN (%s, %s) LIMIT 21")
+        second = normalize_sql("SELECT *  FROM t WHERE sku = 'B2' AND id IN (%s, %s, %s) LIMIT 5")
+        self.assertEqual(first, "SELECT * FROM t WHERE sku = ? AND id IN (...) LIMIT ?")
+        self.assertEqual(fingerprint(first), fingerprint(second))
+
+    @override_settings(SLOW_QUERY_EXPLAINS_PER_MINUTE=2, SLOW_QUERY_FINGERPRINT_INTERVAL=60)
+    def test_rate_limiter(self):
+        limiter = ExplainRateLimiter()
+        self.assertTrue(limiter.allow('a', now=0))
+        self.assertFalse(limiter.allow('a', now=1))
+        self.assertTrue(limiter.allow('b', now=2))
+        self.assertFalse(limiter.allow('c', now=3))
+        self.assertTrue(limiter.allow('a', now=120))
+
+
+class ExplainTest(TestCase):
+    REPRICE = (
+        'WITH changes AS (SELECT id, price * 2 AS new_price FROM products_product WHERE supplier_id = %s FOR UPDATE) '
+        'UPDATE products_product SET price = changes.new_price FROM changes WHERE products_product.id = changes.id '
+        'RETURNING changes.id'
+    )
+
+    def test_only_plain_selects_are_analyzed(self):
+        self.assertTrue(is_read_only('SELECT * FROM products_product WHERE id = %s'))
+        self.assertTrue(is_read_only('WITH recent AS (SELECT 1) SELECT * FROM recent'))
+        self.assertFalse(is_read_only(self.REPRICE))
+        self.assertFalse(is_read_only('WITH gone AS (DELETE FROM products_product RETURNING id) SELECT * FROM gone'))
+        self.assertFalse(is_read_only('SELECT * FROM products_product FOR UPDATE'))
+        self.assertFalse(is_read_only('SELECT * FROM products_product FOR KEY SHARE'))
+
+        default, cursor = connections['default'], mock.MagicMock()
+        with mock.patch.object(default, 'vendor', 'postgresql'), mock.patch.object(default, 'cursor', return_value=cursor):
+            explain('default', self.REPRICE, [1])
+            explain('default', 'SELECT * FROM products_product', [])
+        executed = [call.args[0] for call in cursor.__enter__.return_value.execute.call_args_list]
+        self.assertEqual([sql for sql in executed if sql.startswith('EXPLAIN')], ['EXPLAIN ' + self.REPRICE, 'EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM products_product'])
+
+    def test_explained_statement_is_rolled_back(self):
+        product = mocked_product_create()[0]
+        default = connections['default']
+        real_cursor = default.cursor
+
+        def execute(sql, params=None):
+            with real_cursor() as cursor:
+                if sql.startswith('EXPLAIN'):
+                    # What EXPLAIN ANALYZE of the writable CTE does on PostgreSQL.
+                    sql, params = 'UPDATE products_product SET price = price * 2', None
+                cursor.execute(sql, params)
+
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.execute.side_effect = execute
+        with mock.patch.object(default, 'cursor', return_value=cursor):
+            explain('default', self.REPRICE, [1])
+        product.refresh_from_db()
+        self.assertEqual(str(product.price), '10.99')
+
+
+class SlowQueryMiddlewareTest(APITestCase):
+    def setUp(self):
+        self.user = mocked_user()
+        self.client.force_authenticate(user=self.user)
+        mocked_product_create()
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0.000001)
+    def test_slow_queries_stored_with_plan(self):
+        self.client.get(reverse('product-list'))
+        slow_query = SlowQuery.objects.filter(view='product-list', sql__contains='products_product').first()
+        self.assertIsNotNone(slow_query)
+        self.assertIn('SCAN', slow_query.plan)
+        self.assertEqual(len(slow_query.fingerprint), 16)
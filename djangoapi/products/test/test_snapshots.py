@@ -0,0 +1,85 @@
+import gzip
+import shutil
+import tempfile
+from pathlib import Path
+import orjson
+from django.db.models import F
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from products.models import *
+from products import versioning
+from products.snapshots import publish_catalog_snapshot, read_manifest
+from products.test.test_views import mocked_product_create, mocked_user
+
+
+class CatalogSnapshotTest(APITestCase):
+    def setUp(self):
+        self.snapshot_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.snapshot_dir, ignore_errors=True)
+        override = override_settings(CATALOG_SNAPSHOT_DIR=self.snapshot_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = mocked_user()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product1, self.product2 = mocked_product_create()
+            ProductStock.objects.update_or_create(product=self.product1, defaults={'quantity': 7})
+        self.url = reverse('catalog-snapshot')
+
+    def test_publish_only_when_catalog_changes(self):
+        manifest, published = publish_catalog_snapshot()
+        self.assertTrue(published)
+        self.assertEqual(manifest['count'], 2)
+
+        _, published = publish_catalog_snapshot()
+        self.assertFalse(published)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product1.name = 'Produto Renomeado'
+            self.product1.save()
+        new_manifest, published = publish_catalog_snapshot()
+        self.assertTrue(published)
+        self.assertNotEqual(new_manifest['hash'], manifest['hash'])
+
+    def test_version_is_shared_between_processes(self):
+        publish_catalog_snapshot()
+        # A publisher in a fresh process sees the same version.
+        versioning._versions.clear()
+        self.assertFalse(publish_catalog_snapshot()[1])
+
+        # A change committed by another process.
+        Product.objects.filter(pk=self.product1.pk).update(name='Produto Renomeado')
+        CacheVersion.objects.filter(pk='catalog').update(version=F('version') + 1)
+        manifest, published = publish_catalog_snapshot()
+        self.assertTrue(published)
+        self.assertEqual(manifest['version'], CacheVersion.objects.get(pk='catalog').version)
+
+    def test_snapshot_served_gzip(self):
+        publish_catalog_snapshot()
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        items = orjson.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual({item['sku']: item['stock'] for item in items}, {'PROD1': 7, 'PROD2': 0})
+
+    def test_snapshot_ndjson_identity(self):
+        publish_catalog_snapshot()
+        response = self.client.get(self.url, {'variant': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 2)
+
+    def test_snapshot_not_modified(self):
+        publish_catalog_snapshot()
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_snapshot_not_published(self):
+        self.assertIsNone(read_manifest())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
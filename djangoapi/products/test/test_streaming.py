@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import AccessToken
+from products.models import Product, ProductStock, Supplier
+from products.streaming import ChangeFeedChannel, LocalChannel, StockBroker, broker
+
+
+class Recorder:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, sku, quantity):
+        self.published.append((sku, quantity))
+
+    def has_subscribers(self):
+        return True
+
+
+class StockBrokerTest(TestCase):
+    async def test_fan_out_and_coalescing(self):
+        stock_broker = StockBroker()
+        stock_broker.channel = LocalChannel()
+        first = stock_broker.subscribe(['PROD1', 'PROD2'])
+        second = stock_broker.subscribe(['PROD2'])
+
+        thread = threading.Thread(target=lambda: [stock_broker.publish('PROD2', quantity) for quantity in (1, 2, 3)])
+        thread.start()
+        thread.join()
+        self.assertEqual(await first.next(1), {'PROD2': 3})
+        self.assertEqual(await second.next(1), {'PROD2': 3})
+        self.assertEqual(await first.next(0.01), {})
+
+        first.close()
+        second.close()
+        self.assertFalse(stock_broker.has_subscribers())
+
+
+@override_settings(STOCK_STREAM_CHANNEL='products.streaming.LocalChannel')
+class StockStreamViewTest(TestCase):
+    def setUp(self):
+        broker.channel = None
+        self.addCleanup(setattr, broker, 'channel', None)
+        self.addCleanup(broker.subscribers.clear)
+        supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.product = Product.objects.create(name='Produto', description='Produto', price='10.00', sku='PROD1', supplier=supplier)
+        self.token = str(AccessToken.for_user(User.objects.create_user(username='testuser', password='testpassword')))
+
+    async def test_streams_snapshot_then_changes(self):
+        response = await self.async_client.get(reverse('stock-stream'), {'skus': 'PROD1,NAOEXISTE', 'token': self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+
+        self.assertEqual(
+            await anext(events),
+            b'event: snapshot\ndata: {"results":[{"sku":"PROD1","quantity":0}],"missing":["NAOEXISTE"]}\n\n',
+        )
+        broker.publish('PROD1', 0)
+        broker.publish('PROD1', 7)
+        self.assertEqual(await anext(events), b'event: stock\ndata: {"sku":"PROD1","quantity":7}\n\n')
+
+        # A client disconnect cancels the task consuming the stream.
+        waiting = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertFalse(broker.has_subscribers())
+
+    @override_settings(STOCK_STREAM_HEARTBEAT=0.01)
+    async def test_heartbeat(self):
+        response = await self.async_client.get(reverse('stock-stream'), {'skus': 'PROD1'}, headers={'Authorization': f'Bearer {self.token}'})
+        events = aiter(response.streaming_content)
+        await anext(events)
+        self.assertEqual(await anext(events), b': ping\n\n')
+
+    async def test_rejects_missing_token_and_skus(self):
+        response = await self.async_client.get(reverse('stock-stream'), {'skus': 'PROD1'})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(reverse('stock-stream'), {'token': self.token})
+        self.assertEqual(response.status_code, 400)
+
+    def test_refused_under_wsgi(self):
+        response = self.client.get(reverse('stock-stream'), {'skus': 'PROD1', 'token': self.token})
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(broker.has_subscribers())
+
+    def test_saves_are_published_on_commit(self):
+        recorder = Recorder()
+        channel = LocalChannel()
+        channel.start(recorder)
+        broker.channel = channel
+        stock = ProductStock.objects.get(product=self.product)
+        stock.quantity = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.save()
+        self.assertEqual(recorder.published, [('PROD1', 5)])
+
+
+class ChangeFeedChannelTest(TestCase):
+    async def test_polls_stock_entries(self):
+        supplier = await Supplier.objects.acreate(name='Fornecedor Teste')
+        product = await Product.objects.acreate(name='Produto', description='Produto', price='10.00', sku='PROD1', supplier=supplier)
+        channel = ChangeFeedChannel()
+        recorder = Recorder()
+        await channel.poll(recorder)
+
+        def update_stock():
+            stock = ProductStock.objects.get(product=product)
+            stock.quantity = 9
+            stock.save()
+            product.price = '11.00'
+            product.save()
+        await sync_to_async(update_stock)()
+
+        await channel.poll(recorder)
+        self.assertEqual(recorder.published, [('PROD1', 9)])
+        await channel.poll(recorder)
+        self.assertEqual(len(recorder.published), 1)
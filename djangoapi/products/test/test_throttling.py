@@ -0,0 +1,53 @@
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from products.middleware import LoadSheddingMiddleware
+from products.test.test_views import mocked_user
+from products.throttling import local_store
+
+
+class TokenBucketThrottleTest(APITestCase):
+    def setUp(self):
+        local_store.clear()
+        self.addCleanup(local_store.clear)
+        self.user = mocked_user()
+        self.client.force_authenticate(user=self.user)
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'user': '20/min', 'endpoint': '20/min'}})
+    def test_expensive_endpoint_costs_more_tokens(self):
+        url = reverse('product-list')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'user': '100/min', 'endpoint': '2/min'}})
+    def test_endpoint_bucket_is_per_endpoint(self):
+        url = reverse('supplier-detail', kwargs={'pk': 1})
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(reverse('category-list')).status_code, status.HTTP_200_OK)
+
+
+class LoadSheddingMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/product/list/')
+
+    @override_settings(LOAD_SHEDDING_MAX_CONCURRENCY=1)
+    def test_sheds_over_concurrency_limit(self):
+        responses = []
+        middleware = LoadSheddingMiddleware(lambda request: responses.append(middleware(request)) or 'ok')
+        self.assertEqual(middleware(self.request), 'ok')
+        self.assertEqual(responses[0].status_code, 503)
+        self.assertEqual(responses[0]['Retry-After'], '2')
+
+    @override_settings(LOAD_SHEDDING_DB_LATENCY_MS=100)
+    def test_sheds_on_db_latency_and_recovers(self):
+        middleware = LoadSheddingMiddleware(lambda request: 'ok')
+        middleware.db_latency = 1.0
+        self.assertEqual(middleware(self.request).status_code, 503)
+        middleware.db_latency_updated -= 60
+        self.assertEqual(middleware(self.request), 'ok')
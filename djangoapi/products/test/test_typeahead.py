@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from products.models import Product, Supplier
+from products.typeahead import TypeaheadIndex, typeahead_index, words
+
+
+class TypeaheadTest(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Fornecedor Teste')
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        for sku, name in [('CAD-001', 'Cadeira Ergonômica'), ('CAD-002', 'Cadeira de Escritório'), ('MES-001', 'Mesa Cadenciada'), ('ABC-9', 'Cabo USB-C')]:
+            self.create_product(sku, name)
+        typeahead_index.rebuild()
+
+    def create_product(self, sku, name):
+        return Product.objects.create(name=name, description=name, price='10.00', sku=sku, supplier=self.supplier)
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('product-typeahead'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['sku'] for item in response.json()]
+
+    def test_words_are_normalised(self):
+        self.assertEqual(words('Cadeira  ERGONÔMICA, cadeira'), ['cadeira', 'ergonomica'])
+
+    def test_prefix_lookup(self):
+        self.assertEqual(self.search('cad-00'), ['CAD-001', 'CAD-002'])
+        self.assertEqual(self.search('cad'), ['CAD-001', 'CAD-002', 'MES-001'])
+        self.assertEqual(self.search('ergo'), ['CAD-001'])
+        self.assertEqual(self.search('cad escr'), ['CAD-002'])
+        self.assertEqual(self.search('usb c'), ['ABC-9'])
+        self.assertEqual(self.search('cad', limit=1), ['CAD-001'])
+        self.assertEqual(self.search(''), [])
+        self.assertEqual(self.search('xyz'), [])
+
+    @override_settings(TYPEAHEAD_SYNC_INTERVAL=60)
+    def test_lookup_does_not_query_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            typeahead_index.search('cad', 10)
+        self.assertEqual(len(queries), 0)
+
+    def test_signals_update_the_local_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self.create_product('SOF-1', 'Sofá Retrátil')
+        self.assertEqual(self.search('sofa'), ['SOF-1'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Poltrona'
+            product.save()
+        self.assertEqual(self.search('sofa'), [])
+        self.assertEqual(self.search('polt'), ['SOF-1'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('product-delete', kwargs={'sku': 'SOF-1'}))
+        self.assertEqual(self.search('polt'), [])
+
+    @override_settings(TYPEAHEAD_SYNC_INTERVAL=0)
+    def test_other_workers_catch_up_from_the_change_feed(self):
+        worker = TypeaheadIndex()
+        worker.rebuild()
+        product = self.create_product('SOF-1', 'Sofá')
+        product.sku = 'SOF-2'
+        product.save()
+        Product.objects.get(sku='CAD-001').delete()
+
+        self.assertEqual(worker.search('sof', 10), [('SOF-2', 'Sofá')])
+        self.assertEqual([sku for sku, _ in worker.search('cad', 10)], ['CAD-002', 'MES-001'])
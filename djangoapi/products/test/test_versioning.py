@@ -0,0 +1,29 @@
+from unittest import mock
+from django.db import transaction
+from django.test import TestCase
+from products import versioning
+from products.models import Category
+from products.versioning import bump_version_on_commit, get_version
+
+
+class BumpOnCommitTest(TestCase):
+    def test_bumped_once_per_transaction(self):
+        with mock.patch.object(versioning, 'bump_version') as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                for name in ('livros', 'jogos', 'filmes'):
+                    Category.objects.create(name=name)
+                bump_version_on_commit('catalog')
+                bump.assert_not_called()
+        self.assertEqual(bump.call_args_list, [mock.call('catalog'), mock.call('category')])
+
+    def test_rolled_back_changes_are_not_bumped(self):
+        version = get_version('category')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Category.objects.create(name='livros')
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(get_version('category'), version)
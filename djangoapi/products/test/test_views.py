@@ -1,4 +1,6 @@
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
 from products.models import *
@@ -74,6 +76,19 @@ class ProductListViewTest(APITestCase):
         self.assertIn('TESTE02', skus)
         self.assertIn('TESTE03', skus)
 
+    def test_list_products_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'sku,name,price'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data[0]), {'sku', 'name', 'price'})
+        product_query = [q['sql'] for q in queries if 'products_product' in q['sql']][-1]
+        self.assertNotIn('description', product_query)
+
+    def test_list_products_invalid_fields(self):
+        response = self.client.get(self.url, {'fields': 'sku,senha'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {"error": "Campos inválidos: senha."})
+
 class ProductDetailViewTest(APITestCase):
     def setUp(self):
         self.user = mocked_user()
@@ -102,6 +117,41 @@ class ProductDetailViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data, {"error": "Produto não encontrado."})
 
+class ProductBatchViewTest(APITestCase):
+    def setUp(self):
+        self.user = mocked_user()
+        self.client.force_authenticate(user=self.user)
+        self.product1, self.product2 = mocked_product_create()
+        ProductStock.objects.update_or_create(product=self.product1, defaults={'quantity': 5})
+        Review.objects.create(product=self.product1, rating=8, user=self.user)
+        self.url = reverse('product-batch')
+
+    def test_batch_lookup_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'skus': 'PROD2,PROD1,INEXISTENTE'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['sku'] for item in response.data['results']], ['PROD2', 'PROD1'])
+        self.assertEqual(response.data['missing'], ['INEXISTENTE'])
+        product1 = response.data['results'][1]
+        self.assertEqual(product1['stock'], 5)
+        self.assertEqual(product1['average_rating'], '8.00')
+        self.assertEqual(product1['category_name'], 'categoria teste')
+
+    def test_batch_lookup_post(self):
+        response = self.client.post(self.url, {'skus': ['PROD1']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['missing'], [])
+
+    def test_batch_lookup_too_many_skus(self):
+        skus = ','.join(f'SKU{i}' for i in range(101))
+        response = self.client.get(self.url, {'skus': skus})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_lookup_without_skus(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 class ProductUpdateViewTest(APITestCase):
     def setUp(self):
         self.user = mocked_user()
@@ -319,6 +369,11 @@ class SupplierDetailViewTest(APITestCase):
         expected_data = SupplierSerializer(self.supplier).data
         self.assertEqual(response.data, expected_data)
 
+    def test_supplier_detail_sparse_fields(self):
+        response = self.client.get(self.url, {'fields': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'name': self.supplier.name})
+
     def test_supplier_detail_not_found(self):
         url = reverse('supplier-detail', kwargs={'pk': 999999})
         response = self.client.get(url)
@@ -398,6 +453,13 @@ class StockListViewTest(APITestCase):
         expected_data = ProductStockSerializer(ProductStock.objects.all(), many=True).data
         self.assertEqual(response.data, expected_data)
 
+    def test_list_product_stocks_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'quantity'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(item['quantity'] for item in response.data), [100, 200])
+        self.assertNotIn('JOIN', queries[-1]['sql'])
+
 class StockDetailViewTest(APITestCase):
     def setUp(self):
         self.user = mocked_user()
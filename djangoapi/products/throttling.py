@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LocalBucketStore:
+    """
+    Token buckets kept in this process. Exact, lock-protected, and bounded
+    to ``max_entries`` buckets (least recently used are dropped, which only
+    ever hands a client a full bucket back).
+    """
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, key, cost, capacity, refill_rate, now):
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_entries:
+                self.buckets.popitem(last=False)
+        return allowed, tokens
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Token buckets kept in the Django cache so every worker shares them.
+    The read-modify-write is not atomic; concurrent requests of the same
+    client can overshoot the bucket by a few tokens, which is fine for
+    protecting the database.
+    """
+    key_prefix = 'throttle:'
+
+    def consume(self, key, cost, capacity, refill_rate, now):
+        key = self.key_prefix + key
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        cache.set(key, (tokens, now), timeout=int(capacity / refill_rate) + 1)
+        return allowed, tokens
+
+
+local_store = LocalBucketStore()
+cache_store = CacheBucketStore()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle. The scope rate ('600/min') gives both the bucket
+    size and the refill speed. Each request takes as many tokens as its
+    endpoint weighs in THROTTLE_COSTS (or the view's ``throttle_cost``),
+    so expensive list endpoints drain the bucket faster than detail hits.
+    """
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_store(self):
+        return cache_store if settings.THROTTLE_STORE == 'cache' else local_store
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def get_endpoint(self, request):
+        match = request.resolver_match
+        return match.url_name if match else request.path
+
+    def get_cost(self, request, view):
+        cost = getattr(view, 'throttle_cost', None)
+        if cost is None:
+            cost = settings.THROTTLE_COSTS.get(self.get_endpoint(request), 1)
+        return cost
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        cost = min(self.get_cost(request, view), self.num_requests)
+        refill_rate = self.num_requests / self.duration
+        allowed, tokens = self.get_store().consume(key, cost, self.num_requests, refill_rate, self.timer())
+        self.wait_seconds = 0 if allowed else (cost - tokens) / refill_rate
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        return f'{self.scope}:{self.get_ident_key(request)}'
+
+
+class EndpointTokenBucketThrottle(TokenBucketThrottle):
+    scope = 'endpoint'
+
+    def get_cache_key(self, request, view):
+        return f'{self.scope}:{self.get_ident_key(request)}:{self.get_endpoint(request)}'
@@ -0,0 +1,220 @@
+"""
+In-process prefix index for product/typeahead/.
+
+Every worker keeps two sorted arrays. One holds the normalised SKUs, the
+other the words of every product name, lowercased and without accents. Each
+entry sits next to its product id in a parallel array. A prefix query is a
+bisect into the arrays plus a short scan, so it never reaches the database.
+The index is built from one values_list() query, either when the worker
+starts (see ecommerce_api/wsgi.py) or on the first lookup.
+
+It stays fresh in two ways. Product save/delete signals apply changes to
+the index of the worker that made them once the transaction commits. Other
+workers replay the "product" entries of the change feed at most every
+TYPEAHEAD_SYNC_INTERVAL seconds, so they catch up within that interval. The
+index is rebuilt if it falls further behind than the change log retention.
+
+Memory per worker grows linearly with the catalogue: one entry per SKU plus
+at most TYPEAHEAD_MAX_WORDS words per name, each cut to
+TYPEAHEAD_MAX_WORD_LENGTH characters.
+"""
+import logging
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from . import changes
+from .metrics import record_cache
+from .models import Product
+
+logger = logging.getLogger('api_requests_logger')
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+# Index entries examined per lookup before giving up on finding ``limit``
+# matches for a multi-word query.
+SCAN_LIMIT = 250
+
+
+def normalize(text):
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+
+
+def words(text):
+    """Distinct normalised words of ``text`` in order, as stored in the index."""
+    result = []
+    for word in WORD_RE.findall(normalize(text)):
+        word = word[:settings.TYPEAHEAD_MAX_WORD_LENGTH]
+        if word not in result:
+            result.append(word)
+    return result[:settings.TYPEAHEAD_MAX_WORDS]
+
+
+class SortedIndex:
+    """Sorted keys with a parallel array of product ids; a key may repeat."""
+    def __init__(self, entries=()):
+        entries = sorted(entries)
+        self.keys = [sys.intern(key) for key, _ in entries]
+        self.ids = array('q', [product_id for _, product_id in entries])
+
+    def add(self, key, product_id):
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, sys.intern(key))
+        self.ids.insert(position, product_id)
+
+    def remove(self, key, product_id):
+        for position in range(bisect_left(self.keys, key), bisect_right(self.keys, key)):
+            if self.ids[position] == product_id:
+                del self.keys[position]
+                del self.ids[position]
+                return
+
+    def prefixed(self, prefix):
+        """Product ids whose key starts with ``prefix``, in key order."""
+        keys, ids = self.keys, self.ids
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            yield ids[position]
+            position += 1
+
+
+class TypeaheadIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.products = {}
+        self.skus = SortedIndex()
+        self.names = SortedIndex()
+        self.cursor = None
+        self.last_sync = 0.0
+
+    def rebuild(self):
+        # Take the feed position first: changes made while the table is read
+        # are replayed on the next sync, and replaying is idempotent.
+        cursor = changes.head()
+        products = {pk: (sku, name) for pk, sku, name in Product.objects.values_list('id', 'sku', 'name')}
+        skus = SortedIndex((normalize(sku), pk) for pk, (sku, _) in products.items())
+        names = SortedIndex((word, pk) for pk, (_, name) in products.items() for word in words(name))
+        with self.lock:
+            self.products, self.skus, self.names = products, skus, names
+            self.cursor = cursor
+            self.last_sync = time.monotonic()
+        record_cache('typeahead', 'miss')
+
+    def sync(self):
+        """Build the index, or replay the change feed if TYPEAHEAD_SYNC_INTERVAL has passed."""
+        if self.cursor is None:
+            self.rebuild()
+            return
+        if time.monotonic() - self.last_sync < settings.TYPEAHEAD_SYNC_INTERVAL:
+            return
+        self.last_sync = time.monotonic()
+        if changes.is_expired(self.cursor):
+            self.rebuild()
+            return
+        head = changes.head()
+        entries = changes.visible().filter(kind='product', id__gt=self.cursor, id__lte=head).order_by('id')
+        for product_id, sku, deleted, data in entries.values_list('product_id', 'sku', 'deleted', 'data'):
+            if deleted:
+                self.remove(product_id)
+            else:
+                self.add(product_id, sku, data.get('name', ''))
+        self.cursor = head
+        record_cache('typeahead', 'refresh')
+
+    def add(self, product_id, sku, name):
+        if self.cursor is None:
+            # Not built yet; the first lookup loads the product anyway.
+            return
+        with self.lock:
+            self._remove(product_id)
+            self.products[product_id] = (sku, name)
+            self.skus.add(normalize(sku), product_id)
+            for word in words(name):
+                self.names.add(word, product_id)
+
+    def remove(self, product_id):
+        with self.lock:
+            self._remove(product_id)
+
+    def _remove(self, product_id):
+        current = self.products.pop(product_id, None)
+        if current is None:
+            return
+        sku, name = current
+        self.skus.remove(normalize(sku), product_id)
+        for word in words(name):
+            self.names.remove(word, product_id)
+
+    def search(self, query, limit):
+        """
+        Up to ``limit`` (sku, name) pairs: SKUs starting with ``query`` first,
+        then names with a word starting with each word of ``query``.
+        """
+        self.sync()
+        terms = words(query)
+        if not terms or limit <= 0:
+            return []
+        # The longest term narrows the scan the most; the others are checked per product.
+        terms.sort(key=len, reverse=True)
+        first, rest = terms[0], terms[1:]
+        with self.lock:
+            products = self.products
+            found = []
+            for product_id in self.skus.prefixed(normalize(query.strip())):
+                if len(found) == limit:
+                    break
+                found.append(product_id)
+            scanned = 0
+            for product_id in self.names.prefixed(first):
+                if len(found) == limit or scanned == SCAN_LIMIT:
+                    break
+                scanned += 1
+                if product_id in found:
+                    continue
+                if rest:
+                    name_words = words(products[product_id][1])
+                    if not all(any(word.startswith(term) for word in name_words) for term in rest):
+                        continue
+                found.append(product_id)
+            return [products[product_id] for product_id in found]
+
+
+typeahead_index = TypeaheadIndex()
+
+
+# Signal handlers (wired in products/signals.py)
+
+def product_saved(instance):
+    product_id, sku, name = instance.pk, instance.sku, instance.name
+    if instance.deleted_at is None:
+        transaction.on_commit(lambda: typeahead_index.add(product_id, sku, name))
+    else:
+        product_removed(product_id)
+
+
+def product_removed(product_id):
+    transaction.on_commit(lambda: typeahead_index.remove(product_id))
+
+
+def warm_up():
+    """Build the index when a worker starts (wsgi.py) instead of on its first lookup."""
+    if not settings.TYPEAHEAD_WARM_ON_START:
+        return
+    try:
+        typeahead_index.rebuild()
+    except DatabaseError as exc:
+        # Not migrated yet, or the database is down: build lazily later.
+        logger.warning(f"Typeahead: índice não carregado na inicialização: {exc}")
+    finally:
+        # A preloading server forks after this; children must open their own connections.
+        connections.close_all()
@@ -0,0 +1,102 @@
+"""
+Version counters that tell every worker when its in-process caches are stale.
+
+Each namespace ('catalog', 'category') is a CacheVersion row, so every
+worker and management command sees the same counter whatever cache backend
+is configured. A worker remembers the value it read for
+VERSION_CHECK_INTERVAL seconds, so a cache lookup costs at most one query
+per namespace per interval and changes made by other workers show up within
+that interval.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import CacheVersion
+
+_lock = threading.Lock()
+
+# namespace -> (version, time.monotonic() it was read)
+_versions = {}
+
+
+def _initial_version():
+    # Seeded from the clock so a counter row that was lost never restarts
+    # at a value that older cache entries were keyed with.
+    return int(time.time() * 1000)
+
+
+def _remember(namespace, version):
+    with _lock:
+        _versions[namespace] = (version, time.monotonic())
+    return version
+
+
+def read_version(namespace):
+    """The committed version, read from the database."""
+    version = CacheVersion.objects.filter(pk=namespace).values_list('version', flat=True).first()
+    if version is None:
+        version = CacheVersion.objects.get_or_create(namespace=namespace, defaults={'version': _initial_version()})[0].version
+    return _remember(namespace, version)
+
+
+def get_version(namespace):
+    remembered = _versions.get(namespace)
+    if remembered is not None and time.monotonic() - remembered[1] < settings.VERSION_CHECK_INTERVAL:
+        return remembered[0]
+    return read_version(namespace)
+
+
+def bump_version(namespace):
+    with transaction.atomic():
+        if not CacheVersion.objects.filter(pk=namespace).update(version=F('version') + 1):
+            CacheVersion.objects.get_or_create(namespace=namespace, defaults={'version': _initial_version()})
+            CacheVersion.objects.filter(pk=namespace).update(version=F('version') + 1)
+        version = CacheVersion.objects.filter(pk=namespace).values_list('version', flat=True).get()
+    return _remember(namespace, version)
+
+
+class _PendingBumps:
+    """Namespaces to bump once the current transaction commits."""
+    def __init__(self):
+        self.namespaces = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        for namespace in sorted(self.namespaces):
+            bump_version(namespace)
+
+
+def _pending(connection):
+    pending = getattr(connection, 'pending_version_bumps', None)
+    # Callbacks of rolled back savepoints are dropped from run_on_commit.
+    if pending is None or pending.done or not any(func is pending for _, func, _ in connection.run_on_commit):
+        return None
+    return pending
+
+
+def is_pending(namespace):
+    """True inside a transaction that changed ``namespace`` and has not committed yet."""
+    pending = _pending(transaction.get_connection())
+    return pending is not None and namespace in pending.namespaces
+
+
+def bump_version_on_commit(namespace):
+    """
+    Bump ``namespace`` when the current transaction commits, once however
+    many saves in it ask for it. Nothing changes, here or in the shared row,
+    if it rolls back.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        bump_version(namespace)
+        return
+    pending = _pending(connection)
+    if pending is None:
+        pending = connection.pending_version_bumps = _PendingBumps()
+        transaction.on_commit(pending)
+    pending.namespaces.add(namespace)
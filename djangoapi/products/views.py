@@ -2,26 +2,65 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .models import Product, ProductStock, Review, Supplier, Category, PriceHistory, ProductRating
+from .models import SupplierRollup, CategoryRollup, RelatedProduct, Job
 from .serializers import ProductSerializer, ProductStockSerializer, ReviewSerializer, CategorySerializer, SupplierSerializer
-from django.core.exceptions import ObjectDoesNotExist
-from rest_framework.permissions import IsAuthenticated
+from .serializers import ProductReadSerializer, ProductStockReadSerializer, CategoryReadSerializer, SupplierReadSerializer
+from .serializers import ProductBatchSerializer, SupplierRollupSerializer, CategoryRollupSerializer
+from .serializers import RepriceSerializer, ChangeLogSerializer, RelatedProductReadSerializer, TopProductSerializer
+from .serializers import LowStockSerializer, JobSerializer
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.views import View
+import orjson
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from .streaming import broker
+from django.utils.cache import patch_vary_headers
+from .snapshots import ENCODINGS, VARIANTS, read_manifest, snapshot_dir
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from .metrics import registry
+from .category_cache import category_cache
+from .rollups import empty_rollup
+from .idempotency import idempotent
+from .repricing import RepriceError, reprice
+from . import changes
+from .pagination import ApproximatePageNumberPagination
+from .deletion import soft_delete
+from .list_cache import ListCache, category_list_cache, product_list_cache
+from .ranking import top_products
+from .reordering import group_by_supplier, low_stock
+from .typeahead import typeahead_index
+
+def paginated_data(request, queryset, serializer, view):
+    # Unpaginated unless the client asks for a page, so existing clients keep the plain list.
+    paginator = ApproximatePageNumberPagination()
+    if not paginator.is_requested(request):
+        return serializer.serialize(queryset)
+    rows = paginator.paginate_queryset(serializer.values(queryset.order_by('pk')), request, view)
+    return paginator.get_paginated_response(serializer.represent(rows)).data
+
+def paginated_response(request, queryset, serializer, view):
+    return Response(paginated_data(request, queryset, serializer, view))
 
 #Views Product
 class ProductCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         data = request.data.copy()
         category_name = data.get('category_name', "sem categoria").lower()
 
-        try:
-            if category_name:
-                category = Category.objects.get(name=category_name)
-            else:
-                category, _ = Category.objects.get_or_create(name="sem categoria")
-            data['category'] = category.pk
-        except ObjectDoesNotExist:
-            return Response({"error": f"Categoria '{category_name}' não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+        if category_name:
+            category_id = category_cache.get_id(category_name)
+            if category_id is None:
+                return Response({"error": f"Categoria '{category_name}' não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            category_id = Category.objects.get_or_create(name="sem categoria")[0].pk
+        data['category'] = category_id
 
         serializer = ProductSerializer(data=data)
         if serializer.is_valid():
@@ -45,22 +84,101 @@ class ProductListView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, format=None):
         products = Product.objects.all()
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        serializer = ProductReadSerializer.from_request(request)
+        return Response(product_list_cache.get(request, lambda: paginated_data(request, products, serializer, self)))
 
 class ProductDetailView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, sku, format=None):
         try:
-            product = Product.objects.get(sku=sku)
-            serializer = ProductSerializer(product)
-            return Response(serializer.data)
+            serializer = ProductReadSerializer.from_request(request)
+            return Response(serializer.serialize_one(Product.objects.filter(sku=sku)))
         except Product.DoesNotExist:
             return Response({"error": "Produto não encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
+class ProductBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        skus = request.query_params.get('skus', '').split(',')
+        return self.lookup(skus)
+
+    def post(self, request, format=None):
+        skus = request.data.get('skus', [])
+        if not isinstance(skus, list):
+            return Response({"error": "O campo 'skus' deve ser uma lista."}, status=status.HTTP_400_BAD_REQUEST)
+        return self.lookup(skus)
+
+    def lookup(self, skus):
+        skus = list(dict.fromkeys(str(sku).strip() for sku in skus if str(sku).strip()))
+        if not skus:
+            return Response({"error": "Informe ao menos um SKU."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(skus) > settings.PRODUCT_BATCH_MAX_SKUS:
+            return Response({"error": f"Máximo de {settings.PRODUCT_BATCH_MAX_SKUS} SKUs por consulta."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = ProductBatchSerializer().serialize(Product.objects.filter(sku__in=skus))
+        found = {row['sku']: row for row in rows}
+        return Response({
+            "results": [found[sku] for sku in skus if sku in found],
+            "missing": [sku for sku in skus if sku not in found],
+        })
+
+class RelatedProductsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, sku, format=None):
+        try:
+            limit = min(int(request.query_params.get('limit', settings.RELATED_PRODUCTS_K)), settings.RELATED_PRODUCTS_K)
+        except ValueError:
+            return Response({"error": "Parâmetro 'limit' deve ser um inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One query on the (product, rank) index; deleted neighbours are skipped until the next rebuild.
+        related = RelatedProduct.objects.filter(
+            product__sku=sku, product__deleted_at__isnull=True, related__deleted_at__isnull=True,
+        ).order_by('rank')[:max(limit, 0)]
+        rows = RelatedProductReadSerializer().serialize(related)
+        if not rows and not Product.objects.filter(sku=sku).exists():
+            return Response({"error": "Produto não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"sku": sku, "results": rows})
+
+class TopProductsView(APIView):
+    permission_classes = [IsAuthenticated]
+    cache = ListCache('product-top', 'catalog')
+
+    def get(self, request, format=None):
+        category_name = request.query_params.get('category')
+        if not category_name:
+            return Response({"error": "Informe a categoria."}, status=status.HTTP_400_BAD_REQUEST)
+        category_id = category_cache.get_id(category_name)
+        if category_id is None:
+            return Response({"error": f"Categoria '{category_name}' não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = min(int(request.query_params.get('limit', settings.TOP_PRODUCTS_LIMIT)), settings.TOP_PRODUCTS_MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "Parâmetro 'limit' deve ser um inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = TopProductSerializer()
+        def leaderboard():
+            rows = top_products(category_cache.descendants(category_id), max(limit, 0), serializer)
+            return {"category": category_name.lower(), "results": serializer.represent(rows)}
+        return Response(self.cache.get(request, leaderboard))
+
+class ProductTypeaheadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        try:
+            limit = min(int(request.query_params.get('limit', settings.TYPEAHEAD_LIMIT)), settings.TYPEAHEAD_MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "Parâmetro 'limit' deve ser um inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+        matches = typeahead_index.search(request.query_params.get('q', ''), limit)
+        return Response([{"sku": sku, "name": name} for sku, name in matches])
+
 class ProductUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
+    @transaction.atomic
     def patch(self, request, sku, format=None):
         try:
             product = Product.objects.get(sku=sku)
@@ -69,11 +187,10 @@ class ProductUpdateView(APIView):
         
         category_name = request.data.get('category_name')
         if category_name is not None:
-            try:
-                category = Category.objects.get(name=category_name.lower())
-                product.category = category
-            except Category.DoesNotExist:
+            category_id = category_cache.get_id(category_name)
+            if category_id is None:
                 return Response({"error": f"Categoria '{category_name}' não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+            product.category_id = category_id
 
         data = request.data.copy()
         data.pop('category_name', None)
@@ -88,6 +205,38 @@ class ProductUpdateView(APIView):
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class ProductRepriceView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request, format=None):
+        serializer = RepriceSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        missing = []
+        if 'category' in data:
+            category_id = category_cache.get_id(data['category'])
+            if category_id is None:
+                return Response({"error": f"Categoria '{data['category']}' não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+            products = Product.objects.filter(category_id__in=category_cache.descendants(category_id))
+        elif 'supplier' in data:
+            if not Supplier.objects.filter(pk=data['supplier']).exists():
+                return Response({"error": "Fornecedor não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+            products = Product.objects.filter(supplier_id=data['supplier'])
+        else:
+            skus = list(dict.fromkeys(data['skus']))
+            products = Product.objects.filter(sku__in=skus)
+            found = set(products.values_list('sku', flat=True))
+            missing = [sku for sku in skus if sku not in found]
+
+        try:
+            updated = reprice(products, data['operation'], data['value'], data['rounding'], request.user)
+        except RepriceError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"updated": updated, "missing": missing}, status=status.HTTP_200_OK)
+
 class ProductDeleteView(APIView):
     permission_classes = [IsAuthenticated]
     def delete(self, request, sku, format=None):
@@ -95,7 +244,7 @@ class ProductDeleteView(APIView):
             product = Product.objects.get(sku=sku)
             if ProductStock.objects.filter(product=product, quantity__gt=0).exists():
                 return Response({"error": "Não é possível deletar produtos com saldo."}, status=status.HTTP_400_BAD_REQUEST)
-            product.delete()
+            soft_delete(product)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Product.DoesNotExist:
             return Response({"error": "Produto não encontrado."}, status=status.HTTP_404_NOT_FOUND)
@@ -105,26 +254,26 @@ class CategoryListView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
         categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        serializer = CategoryReadSerializer.from_request(request)
+        return Response(category_list_cache.get(request, lambda: serializer.serialize(categories)))
 
 class CategoryCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         data = request.data.copy()
         name = data.get('name', '').lower()
         
-        if Category.objects.filter(name=name).exists():
+        if category_cache.get_id(name) is not None:
             return Response({"error": f"A categoria '{name}' já existe."}, status=status.HTTP_400_BAD_REQUEST)
         
         parent_name = data.get('parent_name', '').lower()
         if parent_name:
-            try:
-                parent = Category.objects.get(name=parent_name)
-                data['parent'] = parent.id
-            except Category.DoesNotExist:
+            parent_id = category_cache.get_id(parent_name)
+            if parent_id is None:
                 return Response({"error": f"Categoria pai '{parent_name}' não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+            data['parent'] = parent_id
         else:
             data.pop('parent_name', None)
 
@@ -139,15 +288,15 @@ class CategoryDetailView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, name, format=None):
         try:
-            category = Category.objects.get(name=name)
-            serializer = CategorySerializer(category)
-            return Response(serializer.data)
+            serializer = CategoryReadSerializer.from_request(request)
+            return Response(serializer.serialize_one(Category.objects.filter(name=name)))
         except Category.DoesNotExist:
             return Response({"error": "Categoria não encontrada."}, status=status.HTTP_404_NOT_FOUND)
 
 class CategoryUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @transaction.atomic
     def patch(self, request, name, format=None):
         try:
             category = Category.objects.get(name=name.lower())
@@ -162,6 +311,7 @@ class CategoryUpdateView(APIView):
 
 class CategoryDeleteView(APIView):
     permission_classes = [IsAuthenticated]
+    @transaction.atomic
     def delete(self, request, name, format=None):
         try:
             category = Category.objects.get(name=name)
@@ -172,17 +322,29 @@ class CategoryDeleteView(APIView):
         except Category.DoesNotExist:
             return Response({"error": "Categoria não encontrada."}, status=status.HTTP_404_NOT_FOUND)
 
+class CategorySummaryView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request, name, format=None):
+        category_id = category_cache.get_id(name)
+        if category_id is None:
+            return Response({"error": "Categoria não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+        serializer = CategoryRollupSerializer()
+        try:
+            return Response(serializer.serialize_one(CategoryRollup.objects.filter(pk=category_id)))
+        except CategoryRollup.DoesNotExist:
+            return Response(serializer.to_representation(empty_rollup(category=category_id)))
+
 #Views Supplier
 class SupplierListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
         suppliers = Supplier.objects.all()
-        serializer = SupplierSerializer(suppliers, many=True)
-        return Response(serializer.data)
+        return Response(SupplierReadSerializer.from_request(request).serialize(suppliers))
 
 class SupplierCreateView(APIView):
     permission_classes = [IsAuthenticated]
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         serializer = SupplierSerializer(data=request.data)
         if serializer.is_valid():
@@ -194,14 +356,14 @@ class SupplierDetailView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, pk, *args, **kwargs):
         try:
-            supplier = Supplier.objects.get(pk=pk)
-            serializer = SupplierSerializer(supplier)
-            return Response(serializer.data)
+            serializer = SupplierReadSerializer.from_request(request)
+            return Response(serializer.serialize_one(Supplier.objects.filter(pk=pk)))
         except Supplier.DoesNotExist:
             return Response({"error": "Fornecedor não encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
 class SupplierUpdateView(APIView):
     permission_classes = [IsAuthenticated]
+    @transaction.atomic
     def patch(self, request, pk, *args, **kwargs):
         try:
             supplier = Supplier.objects.get(pk=pk)
@@ -216,6 +378,7 @@ class SupplierUpdateView(APIView):
     
 class SupplierDeleteView(APIView):
     permission_classes = [IsAuthenticated]
+    @transaction.atomic
     def delete(self, request, pk, *args, **kwargs):
         try:
             supplier = Supplier.objects.get(pk=pk)
@@ -227,13 +390,42 @@ class SupplierDeleteView(APIView):
         except Supplier.DoesNotExist:
             return Response({"error": "Fornecedor não encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
+class SupplierSummaryView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request, pk, format=None):
+        serializer = SupplierRollupSerializer()
+        try:
+            return Response(serializer.serialize_one(SupplierRollup.objects.filter(pk=pk)))
+        except SupplierRollup.DoesNotExist:
+            if not Supplier.objects.filter(pk=pk).exists():
+                return Response({"error": "Fornecedor não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+            return Response(serializer.to_representation(empty_rollup(supplier=int(pk))))
+
 #Views Stock
 class StockListView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, format=None):
         product_stocks = ProductStock.objects.all()
-        serializer = ProductStockSerializer(product_stocks, many=True)
-        return Response(serializer.data)
+        return paginated_response(request, product_stocks, ProductStockReadSerializer.from_request(request), self)
+
+class LowStockView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request, format=None):
+        stocks = low_stock()
+        supplier = request.query_params.get('supplier')
+        if supplier is not None:
+            if not supplier.isdigit():
+                return Response({"error": "Parâmetro 'supplier' deve ser um inteiro."}, status=status.HTTP_400_BAD_REQUEST)
+            stocks = stocks.filter(product__supplier_id=supplier)
+        category_name = request.query_params.get('category')
+        if category_name is not None:
+            category_id = category_cache.get_id(category_name)
+            if category_id is None:
+                return Response({"error": f"Categoria '{category_name}' não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+            stocks = stocks.filter(product__category_id__in=category_cache.descendants(category_id))
+
+        rows = LowStockSerializer().serialize(stocks.order_by('product__supplier', 'product__sku'))
+        return Response({"count": len(rows), "results": group_by_supplier(rows)})
 
 class StockDetailView(APIView):
     permission_classes = [IsAuthenticated]
@@ -250,6 +442,8 @@ class StockDetailView(APIView):
 class StockUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
+    @transaction.atomic
     def patch(self, request, sku, format=None):
         product = Product.objects.filter(sku=sku).first()
         if not product:
@@ -257,6 +451,8 @@ class StockUpdateView(APIView):
         
         product_stock, created = ProductStock.objects.get_or_create(product=product)
         data = {'quantity': request.data.get('quantity')}
+        if 'reorder_threshold' in request.data:
+            data = {key: request.data[key] for key in ('quantity', 'reorder_threshold') if key in request.data}
         serializer = ProductStockSerializer(product_stock, data=data, partial=True)
 
         if serializer.is_valid():
@@ -267,6 +463,8 @@ class StockUpdateView(APIView):
 #Views Review
 class ReviewCreateView(APIView):
     permission_classes = [IsAuthenticated]
+    @idempotent
+    @transaction.atomic
     def post(self, request, format=None):
         serializer = ReviewSerializer(data=request.data)
 
@@ -292,4 +490,161 @@ class ProductRatingDetailView(APIView):
         except Product.DoesNotExist:
             return Response({"error": "Produto não encontrado."}, status=status.HTTP_404_NOT_FOUND)
         except ProductRating.DoesNotExist:
-            return Response({"error": "Avaliação do produto não encontrada."}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({"error": "Avaliação do produto não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+
+#Views Job
+class JobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, format=None):
+        rows = JobSerializer().serialize(Job.objects.filter(pk=pk))
+        if not rows:
+            return Response({"error": "Job não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(rows[0])
+
+#Views Change Feed
+class ChangeFeedView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        since = request.query_params.get('since')
+        if since is None:
+            return Response({"results": [], "next": str(changes.head()), "has_more": False})
+        try:
+            since = int(since)
+            limit = min(int(request.query_params.get('limit', settings.CHANGE_FEED_PAGE_SIZE)), settings.CHANGE_FEED_PAGE_SIZE)
+        except ValueError:
+            return Response({"error": "Parâmetros 'since' e 'limit' devem ser inteiros."}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or limit < 1:
+            return Response({"error": "Parâmetros 'since' e 'limit' devem ser positivos."}, status=status.HTTP_400_BAD_REQUEST)
+        if changes.is_expired(since):
+            return Response({"error": "Token expirado; sincronize novamente a partir do catálogo completo."}, status=status.HTTP_410_GONE)
+
+        rows = ChangeLogSerializer().serialize(changes.visible().filter(id__gt=since).order_by('id')[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return Response({
+            "results": rows,
+            "next": str(rows[-1]['id'] if rows else since),
+            "has_more": has_more,
+        })
+
+#Views Stock Stream
+class StockStreamView(View):
+    """
+    Server-Sent Events stream of stock quantities for ?skus=a,b,c.
+
+    A plain async Django view (DRF views are sync): under ASGI an idle
+    subscriber is just a coroutine waiting on its Subscription. EventSource
+    cannot send headers, so the JWT may also come as ?token=.
+
+    It needs an ASGI server (e.g. uvicorn ecommerce_api.asgi:application).
+    Under WSGI (runserver, gunicorn's sync workers) Django consumes the whole
+    stream before sending anything, which never happens, so the endpoint
+    answers 501 there instead of holding a worker thread forever.
+    """
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "Stream disponível apenas com servidor ASGI."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        header = request.headers.get('Authorization', '')
+        raw_token = header[7:] if header.startswith('Bearer ') else request.GET.get('token', '')
+        try:
+            JWTAuthentication().get_validated_token(raw_token)
+        except InvalidToken:
+            return JsonResponse({"error": "Token inválido ou ausente."}, status=status.HTTP_401_UNAUTHORIZED)
+
+        skus = list(dict.fromkeys(sku.strip() for sku in request.GET.get('skus', '').split(',') if sku.strip()))
+        if not skus:
+            return JsonResponse({"error": "Informe ao menos um SKU."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(skus) > settings.STOCK_STREAM_MAX_SKUS:
+            return JsonResponse({"error": f"Máximo de {settings.STOCK_STREAM_MAX_SKUS} SKUs por conexão."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Subscribe before reading the current values so no change falls in between.
+        subscription = broker.subscribe(skus)
+        quantities = ProductStock.objects.filter(product__sku__in=skus).values_list('product__sku', 'quantity')
+        snapshot = {sku: quantity async for sku, quantity in quantities}
+
+        response = StreamingHttpResponse(self.events(subscription, snapshot, skus), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, subscription, snapshot, skus):
+        try:
+            yield self.event('snapshot', {
+                "results": [{"sku": sku, "quantity": snapshot[sku]} for sku in skus if sku in snapshot],
+                "missing": [sku for sku in skus if sku not in snapshot],
+            })
+            sent = dict(snapshot)
+            while True:
+                pending = await subscription.next(settings.STOCK_STREAM_HEARTBEAT)
+                if not pending:
+                    yield b': ping\n\n'
+                for sku, quantity in pending.items():
+                    if sent.get(sku) != quantity:
+                        sent[sku] = quantity
+                        yield self.event('stock', {"sku": sku, "quantity": quantity})
+        finally:
+            subscription.close()
+
+    @staticmethod
+    def event(name, data):
+        return b'event: ' + name.encode() + b'\ndata: ' + orjson.dumps(data) + b'\n\n'
+
+#Views Catalog Snapshot
+class CatalogSnapshotView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        manifest = read_manifest()
+        if manifest is None:
+            return Response({"error": "Snapshot do catálogo ainda não foi gerado."}, status=status.HTTP_404_NOT_FOUND)
+
+        variant = request.query_params.get('variant', 'json')
+        if variant not in VARIANTS:
+            return Response({"error": f"Formato '{variant}' inválido. Use json ou ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+        files = manifest['files'][variant]
+        encoding = self.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), files)
+        entry = files[encoding]
+        etag = f'"{manifest["hash"]}-{variant}-{encoding}"'
+
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        elif settings.CATALOG_SNAPSHOT_SENDFILE_HEADER:
+            response = HttpResponse(content_type=VARIANTS[variant])
+            response[settings.CATALOG_SNAPSHOT_SENDFILE_HEADER] = settings.CATALOG_SNAPSHOT_SENDFILE_PREFIX + entry['name']
+        else:
+            response = FileResponse(open(snapshot_dir() / entry['name'], 'rb'), content_type=VARIANTS[variant])
+
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['X-Catalog-Count'] = manifest['count']
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def choose_encoding(self, accept_encoding, files):
+        accepted = set()
+        for item in accept_encoding.split(','):
+            coding, _, params = item.strip().partition(';')
+            if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(coding.strip().lower())
+
+        for encoding in ENCODINGS:
+            if encoding in files and (encoding in accepted or encoding == 'identity'):
+                return encoding
+        return 'identity'
+
+#Views Metrics
+class MetricsView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []
+
+    def get(self, request, format=None):
+        token = settings.METRICS_TOKEN
+        if token and request.META.get('HTTP_AUTHORIZATION') != f'Bearer {token}':
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
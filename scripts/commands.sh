@@ -11,6 +11,7 @@ done
 echo "✅ Postgres Database Started Successfully ($POSTGRES_HOST:$POSTGRES_PORT)"
 
 python manage.py collectstatic --noinput
+python manage.py build_openapi_schema
 python manage.py makemigrations --noinput
 python manage.py migrate --noinput
 python manage.py runserver 0.0.0.0:8000
\ No newline at end of file